@@ -0,0 +1,126 @@
+"""Benchmark client for kernel_server.py.
+
+Opens several concurrent connections to a running server, sends the
+same prediction request repeatedly on each of them and reports the
+throughput and latency percentiles, e.g.
+
+    python benchmark_client.py --x xin --y yin --num_folds 10 --xout ./data/xout
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import numpy as np
+from local_linear import parse_file
+from kernel_server import STREAM_LIMIT
+
+def process_inputs() -> dict:
+    """Processes inputs from command line for further processing.
+
+    Returns:
+        Dictionary that maps parser command line arguments (key) to
+        the parameters (values) inputted by the user.
+    """
+    parser = argparse.ArgumentParser(
+        prog = "benchmark_client",
+        description = "Measure requests/sec and latency of kernel_server"
+    )
+    parser.add_argument("--x", required = True, help = "Get x-coords filename")
+    parser.add_argument("--y", required = True, help = "Get y-coords filename")
+    parser.add_argument("--num_folds",
+        required = True,
+        type = int,
+        help = "Number of Folds used for Cross Validation")
+    parser.add_argument("--xout",
+        required = False,
+        help = "Optional file param that contains x values for evaluation")
+    parser.add_argument("--socket",
+        required = False,
+        default = "./kernel.sock",
+        help = "Path of the Unix socket the server listens on")
+    parser.add_argument("--port",
+        required = False,
+        type = int,
+        help = "Optional TCP port on localhost the server listens on")
+    parser.add_argument("--clients",
+        required = False,
+        type = int,
+        default = 16,
+        help = "Number of concurrent connections")
+    parser.add_argument("--requests",
+        required = False,
+        type = int,
+        default = 100,
+        help = "Number of requests sent by each connection")
+    return vars(parser.parse_args())
+
+async def open_connection(args: dict):
+    """Connects to the server over a Unix socket or localhost"""
+    if args["port"] is not None:
+        return await asyncio.open_connection("127.0.0.1", args["port"],
+            limit = STREAM_LIMIT)
+    return await asyncio.open_unix_connection(args["socket"],
+        limit = STREAM_LIMIT)
+
+async def send_request(reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    payload: bytes) -> dict:
+    """Sends an encoded request and waits for its response"""
+    writer.write(payload)
+    await writer.drain()
+    response = json.loads(await reader.readline())
+    if "error" in response:
+        raise ValueError(response["error"])
+    return response
+
+async def run_client(args: dict, payload: bytes) -> "list[float]":
+    """Sends all requests of one connection, recording their latencies"""
+    reader, writer = await open_connection(args)
+    latencies = []
+    for _ in range(args["requests"]):
+        start = time.perf_counter()
+        await send_request(reader, writer, payload)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+    return latencies
+
+async def benchmark(args: dict) -> None:
+    """Warms up the server's cache, then runs all clients concurrently"""
+    request = {
+        "x": parse_file(args["x"]),
+        "y": parse_file(args["y"]),
+        "num_folds": args["num_folds"],
+        "xout": parse_file(args["xout"])
+    }
+    payload = json.dumps(request).encode() + b"\n"
+
+    # First request trains the model, so it is timed separately
+    reader, writer = await open_connection(args)
+    start = time.perf_counter()
+    await send_request(reader, writer, payload)
+    cold_latency = time.perf_counter() - start
+    writer.close()
+
+    start = time.perf_counter()
+    client_latencies = await asyncio.gather(*(
+        run_client(args, payload) for _ in range(args["clients"])))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.concatenate(client_latencies) * 1000
+    line_separator = "---------------------------------------------------"
+    print(line_separator)
+    print("Cold request (training) latency (ms):", cold_latency * 1000)
+    print("Requests sent:", latencies.size)
+    print("Requests/sec:", latencies.size / elapsed)
+    print("p50 latency (ms):", np.percentile(latencies, 50))
+    print("p99 latency (ms):", np.percentile(latencies, 99))
+    print(line_separator)
+
+def execute():
+    """Overall function that runs the benchmark"""
+    args = process_inputs()
+    asyncio.run(benchmark(args))
+
+if __name__ == '__main__':
+    execute()
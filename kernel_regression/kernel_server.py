@@ -0,0 +1,204 @@
+"""Long-running prediction server for the Gaussian Kernel.
+
+Trained kernels are kept in an LRU cache keyed by a hash of their
+inputs, so repeated calls skip interpreter startup, file parsing and
+cross validation. Clients connect over a local Unix socket (or TCP)
+and exchange newline-delimited JSON, one request per line:
+
+    {"x": [...], "y": [...], "num_folds": 10, "xout": [...]}
+
+xout is optional; without it, the leave-one-out predictions at x are
+returned. Responses look like
+
+    {"y": [...], "h": 0.1, "cached": true, "unsupported_idx": []}
+
+or {"error": "..."} if the request could not be served.
+"""
+
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import json
+import weakref
+from model.gaussian_kernel import GaussianKernel
+from model.model_cache import ModelCache
+
+# Requests carry whole datasets, so lines can be much longer than 64 KiB
+STREAM_LIMIT = 2 ** 28
+
+def process_inputs() -> dict:
+    """Processes inputs from command line for further processing.
+
+    Returns:
+        Dictionary that maps parser command line arguments (key) to
+        the parameters (values) inputted by the user.
+    """
+    parser = argparse.ArgumentParser(
+        prog = "kernel_server",
+        description = "Serve Gaussian Kernel predictions with a model cache"
+    )
+    parser.add_argument("--socket",
+        required = False,
+        default = "./kernel.sock",
+        help = "Path of the Unix socket to listen on")
+    parser.add_argument("--port",
+        required = False,
+        type = int,
+        help = "Optional TCP port on localhost to listen on instead")
+    parser.add_argument("--cache_size",
+        required = False,
+        type = int,
+        default = 32,
+        help = "Maximum number of trained kernels kept in memory")
+    parser.add_argument("--workers",
+        required = False,
+        type = int,
+        default = 4,
+        help = "Number of threads used to train and predict")
+    return vars(parser.parse_args())
+
+class KernelServer:
+    """asyncio server that answers kernel prediction requests.
+
+    Training and prediction run in a thread pool so that the event
+    loop keeps accepting clients. Clients asking for the same inputs
+    while they are being trained share a single training run.
+
+    Attributes:
+        cache: LRU cache of trained kernels
+    """
+
+    def __init__(self, cache_size: int = 32, n_workers: int = 4) -> None:
+        self.cache = ModelCache(cache_size)
+        self._executor = ThreadPoolExecutor(max_workers = n_workers)
+        # cache key -> future of a kernel that is still being trained
+        self._training = {}
+        # predict() mutates the kernel, so one prediction at a time
+        self._locks = weakref.WeakKeyDictionary()
+
+    async def get_model(self, request: dict) -> "tuple[GaussianKernel, bool]":
+        """Gets a trained kernel for the request, training it if needed
+
+        Args:
+            request: decoded request containing at least x and y
+
+        Returns:
+            Tuple of the trained kernel and whether it was cached
+        """
+        x_raw = request["x"]
+        y_raw = request["y"]
+        num_folds = request.get("num_folds", 10)
+        use_float32 = request.get("float32", False)
+        key = ModelCache.hash_inputs(x_raw, y_raw, num_folds, use_float32)
+        kernel = self.cache.get(key)
+        if kernel is not None:
+            return kernel, True
+
+        if key not in self._training:
+            kernel = GaussianKernel(x_raw, y_raw, num_folds,
+                use_float32 = use_float32)
+            self._training[key] = asyncio.ensure_future(
+                self._train(key, kernel))
+        kernel = await asyncio.shield(self._training[key])
+        return kernel, False
+
+    async def _train(self, key: str, kernel: GaussianKernel) -> GaussianKernel:
+        """Trains the kernel in the thread pool and caches it"""
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self._executor, kernel.train)
+            self.cache.put(key, kernel)
+            return kernel
+        finally:
+            del self._training[key]
+
+    async def predict(self, request: dict) -> dict:
+        """Answers a single prediction request
+
+        Args:
+            request: decoded request, see module docstring
+
+        Returns:
+            Response dictionary, see module docstring
+        """
+        kernel, is_cached = await self.get_model(request)
+        lock = self._locks.setdefault(kernel, asyncio.Lock())
+        loop = asyncio.get_running_loop()
+        async with lock:
+            y_pred = await loop.run_in_executor(
+                self._executor, kernel.predict, request.get("xout"))
+            unsupported_idx = kernel.unsupported_idx
+        return {
+            "y": y_pred,
+            "h": kernel.optimal_h,
+            "cached": is_cached,
+            "unsupported_idx": unsupported_idx
+        }
+
+    async def handle_client(self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter) -> None:
+        """Serves all the requests sent over one connection"""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    response = await self.predict(json.loads(line))
+                # No request should bring down the connection, whatever
+                # it fails with, so every failure is sent back instead
+                except Exception as err: # pylint: disable=broad-except
+                    response = {"error": f"{type(err).__name__}: {err}"}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self,
+        socket_path: str = None,
+        port: int = None) -> asyncio.AbstractServer:
+        """Starts listening on a Unix socket, or on localhost if port given
+
+        Args:
+            socket_path: path of the Unix socket
+            port: TCP port on localhost
+
+        Returns:
+            The started asyncio server
+        """
+        if port is not None:
+            return await asyncio.start_server(self.handle_client,
+                host = "127.0.0.1", port = port, limit = STREAM_LIMIT)
+        return await asyncio.start_unix_server(self.handle_client,
+            path = socket_path, limit = STREAM_LIMIT)
+
+    def shutdown(self) -> None:
+        """Stops the worker threads"""
+        self._executor.shutdown(wait = False)
+
+async def serve(args: dict) -> None:
+    """Runs the server until it is interrupted"""
+    kernel_server = KernelServer(args["cache_size"], args["workers"])
+    server = await kernel_server.start(args["socket"], args["port"])
+    address = f"127.0.0.1:{args['port']}" if args["port"] is not None \
+        else args["socket"]
+    print(f"Serving Gaussian Kernel predictions on {address}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        kernel_server.shutdown()
+
+def execute():
+    """Overall function that runs the prediction server"""
+    args = process_inputs()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("Server stopped.")
+
+if __name__ == '__main__':
+    execute()
@@ -1,8 +1,8 @@
 import argparse
 import os
 from typing import Optional
-import matplotlib.pyplot as plt
 from model.gaussian_kernel import GaussianKernel
+from plotting import bin_scatter, load_pyplot, save_figure
 
 def process_inputs() -> dict:
     """Processes inputs from command line for further processing.
@@ -34,6 +34,14 @@ def process_inputs() -> dict:
     parser.add_argument("--xout",
         required = False,
         help = "Optional file param that contains x values for evaluation")
+    parser.add_argument("--float32",
+        required = False,
+        action = "store_true",
+        help = "Optional Flag to compute kernel weights in float32")
+    parser.add_argument("--plot_async",
+        required = False,
+        action = "store_true",
+        help = "Optional Flag to save the graph in a background worker")
 
     return vars(parser.parse_args())
 
@@ -79,15 +87,20 @@ def plot_graph(x_raw: "list[float]",
     y_raw: "list[float]",
     x_pred: "list[float]",
     y_pred: "list[float]",
-    is_plot: bool):
+    is_plot: bool,
+    background: bool = False):
     """Creates the scatterplot of y against x using matplotlib.pyplot.
 
+    Large inputs are binned on a grid before plotting, so that each
+    occupied cell is drawn as a single point.
+
     Args:
         x_raw: list of x input data used to determine optimal h
         y_raw: list of y input data used to determine optimal h
         x_pred: list of x data predicted using linear kernel regression
         y_pred: list of y data predicted using linear kernel regression
         is_plot: Flag of Whether graph should be plotted or not
+        background: Flag of whether graph is saved by a background worker
 
     Returns:
         A graph of the corresponding scatter plot, stored in
@@ -95,6 +108,10 @@ def plot_graph(x_raw: "list[float]",
     """
     # Plot Scatter Plot of Predicted Graph
     if is_plot:
+        plt = load_pyplot()
+        fig = plt.figure()
+        x_raw, y_raw = bin_scatter(x_raw, y_raw)
+        x_pred, y_pred = bin_scatter(x_pred, y_pred)
         plt.scatter(x = x_raw, y = y_raw,
             color = 'skyblue', s = 30, alpha = 0.5,
             marker = 'x', label = "data")
@@ -103,8 +120,7 @@ def plot_graph(x_raw: "list[float]",
             color = 'red', s = 30, alpha = 0.3,
             marker = '.', label="prediction")
         plt.legend()
-        plt.savefig('./output/graph.png')
-        plt.show()
+        save_figure(plt, fig, './output/graph.png', background)
 
 def post_process(filename: str, pred_y: "list[float]"):
     """Produces the output file of predicted y.
@@ -135,17 +151,31 @@ def execute():
     x_to_predict = parse_file(args["xout"])
 
     # Instantiate Kernel, train it and predict if applicable
-    kernel = GaussianKernel(x_raw, y_raw, args["num_folds"])
+    kernel = GaussianKernel(x_raw, y_raw, args["num_folds"],
+        use_float32 = args["float32"])
     final_y_pred = kernel.train_and_predict(x_to_predict)
-    # Produce Output Directory and Graph
-    post_process(args["output"], final_y_pred)
-    # Plot the graph, if boolean parameter is given
+    # Report bandwidths whose held-out points had no support in the CV
+    if kernel.cv_unsupported:
+        counts = ", ".join(f"{n} at h = {h:g}"
+            for h, n in kernel.cv_unsupported.items())
+        print(f"Warning: held-out points without effective support "
+            f"during cross validation: {counts}")
+    # Report points whose kernel weights all underflow at optimal h
+    if kernel.unsupported_idx:
+        x_eval = x_raw if not x_to_predict else x_to_predict
+        unsupported_x = [x_eval[i] for i in kernel.unsupported_idx]
+        print(f"Warning: {len(unsupported_x)} points have no effective "
+            f"support at h = {kernel.optimal_h}: {unsupported_x}")
+    # Plot the graph first, so a background save overlaps the output
     is_plot = args["plot"]
     plot_graph(x_raw,
         y_raw,
         x_raw if not x_to_predict else x_to_predict,
         final_y_pred,
-        is_plot)
+        is_plot,
+        args["plot_async"])
+    # Produce Output Directory
+    post_process(args["output"], final_y_pred)
 
 if __name__ == '__main__':
     # Process Command Line Inputs
@@ -1,6 +1,6 @@
 from functools import reduce
-import math
 from typing import Optional
+import numpy as np
 from model.data_store import DataStore
 
 class GaussianKernel(DataStore):
@@ -17,10 +17,23 @@ class GaussianKernel(DataStore):
         y_train: list of y values used as the training set
         x_eval: list of x values to be evaluated at by training data
         y_eval: list of y values to be predicted by training data
+        dtype: numpy precision used to build the kernel weight matrices
+        unsupported_idx: indexes of x_eval too far from every x_train
+            for the last bandwidth used, i.e. with no effective support
+        cv_unsupported: number of held-out points without effective
+            support for each bandwidth of the cross validation, summed
+            over the folds, for the bandwidths where there are any
     """
 
-    def __init__(self, x_raw = None, y_raw = None, num_folds = 10):
+    def __init__(self,
+        x_raw = None,
+        y_raw = None,
+        num_folds = 10,
+        use_float32: bool = False):
         super().__init__(x_raw, y_raw, num_folds)
+        # float32 halves the memory traffic of the weight matrices,
+        # while every reduction below is still accumulated in float64
+        self.dtype = np.float32 if use_float32 else np.float64
         # Attributes to find h
         self.bandwidths = [(i + 1) * 0.1 for i in range(20)]
         self.optimal_h = None
@@ -31,64 +44,77 @@ class GaussianKernel(DataStore):
         # To find the MSE and find optimal h
         self.y_train = []
         self.y_eval = []
+        self.unsupported_idx = []
+        self.cv_unsupported = {}
 
+    def _get_weights(self,
+        h: float,
+        exclude_self: bool = False) -> "tuple[np.ndarray, np.ndarray]":
+        """Builds the normalizable kernel weights of x_eval against x_train
 
-    def _calc_kernel(self, x1: float, x2: float, h: float) -> float:
-        """Calculates the Gaussian Kernel based on given formula
-
-        The given formula is e ** (- (x1 - x2) ** 2 / h). This
-        is the basis of the Gaussian Kernel.
+        The exponents - (x1 - x2) ** 2 / h of each x_eval are shifted
+        by their maximum before exponentiating (as in log-sum-exp), so
+        the largest weight of every row is exactly 1 and the row sum
+        can never underflow to 0, however small h is. The matrix is
+        computed in place in the kernel's dtype. A row without any
+        weight, when its only x_train is excluded, is not shifted.
 
         Args:
-            x1: first x value
-            x2: second x value
             h: bandwidth used for calculation
+            exclude_self: if True, x_eval is x_train and each point gets
+                a weight of 0 against itself (leave-one-out)
 
         Returns:
-            Calculated kernel, in float
+            Tuple of the shifted weight matrix of shape
+            (len(x_eval), len(x_train)) and the unshifted maximum
+            exponent of each x_eval
         """
-        x_delta = (x1 - x2) ** 2
-        return math.exp(- x_delta / h)
-
-    def _find_total_weight(self, x_ev: float, h: float) -> float:
-        """Finds sum of kernels of x to be predicted against all training x
-
-        This function uses what was defined in calc_kernel to find
-        total weight, thereby minimizing code repetition
-
-        Args:
-            x_ev: input to predict y at x_ev
-            h: bandwidth used to find total weight
-
-        Returns:
-            Sum of the total kernel of a x against training x
-        """
-        total_weight = 0
-        for x_tr in self.x_train:
-            total_weight += self._calc_kernel(x_ev, x_tr, h)
-        return total_weight
-
-
-    def _get_y_pred(self, h: float) -> "list[float]":
-        """Gets predicted y iteratively, using kernel formula
+        x_ev = np.asarray(self.x_eval, dtype = self.dtype)
+        x_tr = np.asarray(self.x_train, dtype = self.dtype)
+        weights = np.subtract.outer(x_ev, x_tr)
+        np.square(weights, out = weights)
+        weights *= self.dtype(-1 / h)
+        if exclude_self:
+            np.fill_diagonal(weights, -np.inf)
+        max_exponent = weights.max(axis = 1)
+        # A row whose only weight is excluded stays at 0, unshifted
+        weights -= np.where(np.isfinite(max_exponent), max_exponent,
+            0)[:, np.newaxis]
+        np.exp(weights, out = weights)
+        return weights, max_exponent
+
+    def _get_y_pred(self,
+        h: float,
+        exclude_self: bool = False) -> "list[float]":
+        """Gets predicted y for every x_eval at once, using kernel formula
+
+        x_eval whose unshifted weights would all underflow to 0 have no
+        effective support from x_train. They are still predicted from
+        the shifted weights, but their indexes are stored in
+        self.unsupported_idx so that they can be reported. x_eval
+        without any weight, left out of a single x_train, are
+        unsupported and predicted as NaN.
 
         Args:
             h: bandwidth used to predict y
+            exclude_self: if True, x_eval is x_train and each point is
+                left out of its own prediction (leave-one-out)
 
         Returns:
             list of float of predicted y values
         """
-        y_preds = []
-        for x_ev in self.x_eval:
-            # find total weight of kernel
-            total_weight = self._find_total_weight(x_ev, h)
-            y_pred = 0
-            # calculate y_pred based on weight
-            for i, x_tr in enumerate(self.x_train):
-                y_pred += self._calc_kernel(x_ev,
-                    x_tr, h) * self.y_train[i] / total_weight
-            y_preds.append(y_pred)
-        return y_preds
+        weights, max_exponent = self._get_weights(h, exclude_self)
+        min_exponent = np.log(np.finfo(self.dtype).tiny)
+        self.unsupported_idx = np.flatnonzero(
+            max_exponent < min_exponent).tolist()
+        # Weight sums are accumulated in float64 in both precisions
+        total_weight = weights.sum(axis = 1, dtype = np.float64)
+        weights *= np.asarray(self.y_train, dtype = self.dtype)
+        weighted_y = weights.sum(axis = 1, dtype = np.float64)
+        y_pred = np.full(len(total_weight), np.nan)
+        np.divide(weighted_y, total_weight, out = y_pred,
+            where = total_weight > 0)
+        return y_pred.tolist()
 
     def _get_mse(self, y_preds: "list[float]")-> float:
         """Method used to find MSE between predicted y and actual y
@@ -128,10 +154,15 @@ class GaussianKernel(DataStore):
         - collect optimal h within the fold with minimum MSE
         3. Find globally optimal h across all folds
         4. Store this value as self.optimal_h
+
+        The held-out points without effective support for a bandwidth
+        are counted in self.cv_unsupported, since their MSE comes from
+        the nearest training points only.
         """
         self.split()
         n_folds = len(self.folds_idx)
         optimal_h_for_fold = []
+        self.cv_unsupported = {}
         for i in range(n_folds):
             local_fold = []
             # Get appropriate train test split
@@ -146,6 +177,9 @@ class GaussianKernel(DataStore):
             # begin evaluation of h for different folds
             for h in self.bandwidths:
                 y_pred_fold = self._get_y_pred(h)
+                if self.unsupported_idx:
+                    self.cv_unsupported[h] = self.cv_unsupported.get(h, 0) \
+                        + len(self.unsupported_idx)
                 mse = self._get_mse(y_pred_fold)
                 local_fold.append((h, mse))
 
@@ -175,16 +209,11 @@ class GaussianKernel(DataStore):
             self.x_eval = x_to_predict
             return self._get_y_pred(self.optimal_h)
 
-        n_pts = len(self.x_raw)
-        output = []
-        for i in range(n_pts):
-            self.x_eval = [self.x_raw[i]]
-            self.x_train = [self.x_raw[j] for j in range(n_pts) if j != i]
-            self.y_train = [self.y_raw[j] for j in range(n_pts) if j != i]
-            # y_pred is now just a singleton list
-            y_pred = self._get_y_pred(self.optimal_h)
-            output.append(y_pred[0])
-        return output
+        # Otherwise predict each xin from all the other points
+        self.x_train = self.x_raw
+        self.y_train = self.y_raw
+        self.x_eval = self.x_raw
+        return self._get_y_pred(self.optimal_h, exclude_self = True)
 
     def train_and_predict(self, x_to_predict):
         """Overall function that runs kernel. See train
@@ -0,0 +1,84 @@
+from collections import OrderedDict
+import hashlib
+from typing import Optional
+import numpy as np
+from model.gaussian_kernel import GaussianKernel
+
+class ModelCache:
+    """Least-recently-used cache of trained Gaussian Kernels.
+
+    Kernels are keyed by a hash of the inputs they were trained on,
+    so that a long-running process only cross-validates h once for
+    every distinct (x, y, num_folds, precision) combination.
+
+    Attributes:
+        max_size: maximum number of trained kernels kept in memory
+        hits: number of lookups that found a trained kernel
+        misses: number of lookups that did not
+    """
+
+    def __init__(self, max_size: int = 32) -> None:
+        if max_size < 1:
+            raise ValueError("Cache needs to hold at least 1 model.")
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._models = OrderedDict()
+
+    @staticmethod
+    def hash_inputs(x_raw: "list[float]",
+        y_raw: "list[float]",
+        num_folds: int,
+        use_float32: bool = False) -> str:
+        """Hashes the training inputs of a kernel into a cache key
+
+        Args:
+            x_raw: list of x input data
+            y_raw: list of y input data
+            num_folds: number of folds used for cross validation
+            use_float32: whether the kernel computes in float32
+
+        Returns:
+            Hex digest that identifies the trained kernel
+        """
+        digest = hashlib.sha256()
+        digest.update(np.asarray(x_raw, dtype = np.float64).tobytes())
+        digest.update(b"|")
+        digest.update(np.asarray(y_raw, dtype = np.float64).tobytes())
+        digest.update(f"|{num_folds}|{use_float32}".encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[GaussianKernel]:
+        """Gets a trained kernel and marks it as most recently used
+
+        Args:
+            key: cache key given by hash_inputs
+
+        Returns:
+            The trained kernel, or None if it is not cached
+        """
+        kernel = self._models.get(key)
+        if kernel is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._models.move_to_end(key)
+        return kernel
+
+    def put(self, key: str, kernel: GaussianKernel) -> None:
+        """Stores a trained kernel, evicting the least recently used one
+
+        Args:
+            key: cache key given by hash_inputs
+            kernel: kernel whose optimal h has been found
+        """
+        self._models[key] = kernel
+        self._models.move_to_end(key)
+        while len(self._models) > self.max_size:
+            self._models.popitem(last = False)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._models
+
+    def __len__(self) -> int:
+        return len(self._models)
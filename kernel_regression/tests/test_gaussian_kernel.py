@@ -1,59 +1,36 @@
 from random import uniform, randint
 import math
+import warnings
 from model.gaussian_kernel import GaussianKernel
 
 # Disabling this method so that we can perform unit tests
 # pylint: disable=protected-access
 
-def test_calc_kernel():
-    # Init kernel with dummy variables so exception
-    # does not occur. However, calc_kernel is static,
-    # so dummy values don't matter
-    dummy_data = [0, 0]
-    dummy_folds = 2
-    raw_data = GaussianKernel(dummy_data, dummy_data, dummy_folds)
-
-    for _ in range(100):
-        test_x1 = uniform(-1000, 1000)
-        test_x2 = uniform(-1000, 1000)
-        test_h = uniform(0.1, 3)
-
-        # Actual Value
-        actual_kernel = raw_data._calc_kernel(test_x1, test_x2, test_h)
-
-        # Expected value
-        x_delta = (test_x1 - test_x2) ** 2
-        expected_kernel = math.exp(- x_delta / test_h)
-
-        # Testing that they are equivalent, modulo floating pt error
-        assert abs(expected_kernel - actual_kernel) < 10 ** -6
-
-def test_find_total_weight():
-    # Populate test x to evaluate
+def test_get_weights_matches_kernel():
+    # Shifted weights, scaled back by their maximum, are the kernels
+    # e ** (- (x1 - x2) ** 2 / h) of every x_eval against x_train
     for _ in range(100):
-        test_x_ev = uniform(-10, 10)
         test_h = uniform(0.1, 3)
-        # Populate test data
         n_data = randint(2, 1000)
-        n_folds = randint(2, n_data)
         test_x_train = [uniform(-10, 10) for _ in range(n_data)]
+        test_x_ev = [uniform(-10, 10) for _ in range(randint(1, 10))]
         # Y dummy as it's not important to the test
         dummy_y = [0 for _ in range(n_data)]
-        raw_data = GaussianKernel(test_x_train, dummy_y, n_folds)
-        # Can only test find_total_weight by populating x_train directly
+        raw_data = GaussianKernel(test_x_train, dummy_y, 2)
         raw_data.x_train = test_x_train
+        raw_data.x_eval = test_x_ev
 
-        #Actual value
-        actual_weight = raw_data._find_total_weight(test_x_ev, test_h)
-
-        #Expected value
-        expected_weight = 0
-        for x_tr in raw_data.x_train:
-            x_delta = (test_x_ev - x_tr) ** 2
-            expected_weight += math.exp(- x_delta / test_h)
-
-        # Testing that they are equivalent, modulo floating pt error
-        assert abs(expected_weight - actual_weight) < 10 ** -6
+        weights, max_exponent = raw_data._get_weights(test_h)
+        for i, x_ev in enumerate(test_x_ev):
+            expected_weight = 0
+            for j, x_tr in enumerate(test_x_train):
+                expected_kernel = math.exp(- (x_ev - x_tr) ** 2 / test_h)
+                actual_kernel = weights[i, j] * math.exp(max_exponent[i])
+                assert abs(expected_kernel - actual_kernel) < 10 ** -6
+                expected_weight += expected_kernel
+            # Total weight of x_eval, modulo floating pt error
+            actual_weight = weights[i].sum() * math.exp(max_exponent[i])
+            assert abs(expected_weight - actual_weight) < 10 ** -6
 
 def test_find_best_mse():
     # Init kernel with dummy variables so exception
@@ -76,3 +53,79 @@ def test_find_best_mse():
         test_args = list(zip(test_h, test_mse))
         actual_val = raw_data._find_best_mse(test_args)
         assert actual_val == expected_val
+
+def test_float32_matches_float64():
+    # float32 weights with float64 sums should stay close to float64
+    for _ in range(20):
+        n_data = randint(10, 500)
+        test_x = [uniform(-3, 3) for _ in range(n_data)]
+        test_y = [uniform(-3, 3) for _ in range(n_data)]
+        test_h = uniform(0.1, 3)
+        kernels = []
+        for use_float32 in (False, True):
+            kernel = GaussianKernel(test_x, test_y, 2,
+                use_float32 = use_float32)
+            kernel.x_train = kernel.x_eval = test_x
+            kernel.y_train = test_y
+            kernels.append(kernel._get_y_pred(test_h, exclude_self = True))
+
+        for y_64, y_32 in zip(*kernels):
+            assert abs(y_64 - y_32) < 10 ** -4
+
+def test_leave_one_out_prediction():
+    # Each xin should be predicted from all other points only
+    test_x = [uniform(-3, 3) for _ in range(50)]
+    test_y = [uniform(-3, 3) for _ in range(50)]
+    test_h = uniform(0.1, 3)
+    kernel = GaussianKernel(test_x, test_y, 2)
+    kernel.optimal_h = test_h
+    actual_y = kernel.predict(None)
+
+    for i, x_ev in enumerate(test_x):
+        total_weight, weighted_y = 0, 0
+        for j, x_tr in enumerate(test_x):
+            if i != j:
+                weight = math.exp(- (x_ev - x_tr) ** 2 / test_h)
+                total_weight += weight
+                weighted_y += weight * test_y[j]
+        assert abs(weighted_y / total_weight - actual_y[i]) < 10 ** -6
+
+def test_small_bandwidth_reports_unsupported():
+    # Weights of far away points underflow, but never produce NaN
+    test_x = [uniform(-1, 1) for _ in range(100)]
+    test_y = [uniform(-1, 1) for _ in range(100)]
+    raw_data = GaussianKernel(test_x, test_y, 2)
+    raw_data.optimal_h = 10 ** -4
+    far_x = [uniform(5, 10) for _ in range(10)]
+    y_preds = raw_data.predict(far_x)
+
+    assert not any(math.isnan(y_pred) for y_pred in y_preds)
+    assert raw_data.unsupported_idx == list(range(10))
+    # Far points to the right are predicted by the rightmost x
+    y_rightmost = test_y[test_x.index(max(test_x))]
+    for y_pred in y_preds:
+        assert abs(y_pred - y_rightmost) < 10 ** -6
+
+def test_train_reports_unsupported_bandwidths():
+    # A point far from all others has no support when it is held out
+    # at a tiny bandwidth, but still has some at a wide one
+    test_x = [uniform(-1, 1) for _ in range(20)] + [50.0]
+    test_y = [uniform(-1, 1) for _ in range(21)]
+    raw_data = GaussianKernel(test_x, test_y, 3)
+    raw_data.bandwidths = [10 ** -4, 10 ** 4]
+    raw_data.train()
+    assert list(raw_data.cv_unsupported) == [10 ** -4]
+    assert raw_data.cv_unsupported[10 ** -4] >= 1
+
+def test_leave_one_out_of_single_point():
+    # The only weight is excluded, which must not be shifted into NaN
+    raw_data = GaussianKernel([0, 0], [0, 0], 2)
+    raw_data.x_train = raw_data.x_eval = [1.0]
+    raw_data.y_train = [2.0]
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        weights, _ = raw_data._get_weights(0.5, exclude_self = True)
+        y_preds = raw_data._get_y_pred(0.5, exclude_self = True)
+    assert weights.tolist() == [[0.0]]
+    assert raw_data.unsupported_idx == [0]
+    assert math.isnan(y_preds[0])
@@ -0,0 +1,88 @@
+import asyncio
+import json
+from random import uniform
+from model.gaussian_kernel import GaussianKernel
+from kernel_server import KernelServer, STREAM_LIMIT
+
+def test_server_caches_trained_model(tmp_path):
+    test_x = [uniform(-3, 3) for _ in range(200)]
+    test_y = [uniform(-3, 3) for _ in range(200)]
+    test_xout = [uniform(-3, 3) for _ in range(20)]
+    request = {"x": test_x, "y": test_y, "num_folds": 5, "xout": test_xout}
+    socket_path = str(tmp_path / "kernel.sock")
+
+    async def send_twice():
+        kernel_server = KernelServer(cache_size = 2)
+        server = await kernel_server.start(socket_path)
+        reader, writer = await asyncio.open_unix_connection(
+            socket_path, limit = STREAM_LIMIT)
+        responses = []
+        for _ in range(2):
+            writer.write(json.dumps(request).encode() + b"\n")
+            await writer.drain()
+            responses.append(json.loads(await reader.readline()))
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        kernel_server.shutdown()
+        return responses
+
+    cold, warm = asyncio.run(send_twice())
+    kernel = GaussianKernel(test_x, test_y, 5)
+    expected_y = kernel.train_and_predict(test_xout)
+
+    assert not cold["cached"]
+    assert warm["cached"]
+    for response in (cold, warm):
+        assert response["h"] == kernel.optimal_h
+        for actual, expected in zip(response["y"], expected_y):
+            assert abs(actual - expected) < 10 ** -6
+
+def test_server_reports_bad_request(tmp_path):
+    socket_path = str(tmp_path / "kernel.sock")
+
+    async def send_bad_request():
+        kernel_server = KernelServer()
+        server = await kernel_server.start(socket_path)
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        # Number of folds exceed number of data points
+        bad_request = {"x": [0, 1], "y": [0, 1], "num_folds": 10}
+        writer.write(json.dumps(bad_request).encode() + b"\n")
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        kernel_server.shutdown()
+        return response
+
+    response = asyncio.run(send_bad_request())
+    assert "Number of Folds exceed Number of Data Points" in response["error"]
+
+def test_server_survives_unexpected_errors(tmp_path, monkeypatch):
+    socket_path = str(tmp_path / "kernel.sock")
+
+    def failing_train(_kernel):
+        raise MemoryError("no memory left")
+
+    async def send_requests():
+        kernel_server = KernelServer()
+        server = await kernel_server.start(socket_path)
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        request = {"x": [0, 1, 2, 3], "y": [0, 1, 2, 3], "num_folds": 2}
+        responses = []
+        for _ in range(2):
+            writer.write(json.dumps(request).encode() + b"\n")
+            await writer.drain()
+            responses.append(json.loads(await reader.readline()))
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        kernel_server.shutdown()
+        return responses
+
+    monkeypatch.setattr(GaussianKernel, "train", failing_train)
+    first, second = asyncio.run(send_requests())
+    # The connection still serves the next request
+    for response in (first, second):
+        assert response["error"] == "MemoryError: no memory left"
@@ -0,0 +1,30 @@
+from random import uniform
+from model.gaussian_kernel import GaussianKernel
+from model.model_cache import ModelCache
+
+def test_hash_inputs():
+    test_x = [uniform(-10, 10) for _ in range(100)]
+    test_y = [uniform(-10, 10) for _ in range(100)]
+    key = ModelCache.hash_inputs(test_x, test_y, 10)
+    # Same inputs always map to the same model
+    assert key == ModelCache.hash_inputs(list(test_x), list(test_y), 10)
+    # Any change in the inputs maps to a different model
+    assert key != ModelCache.hash_inputs(test_x, test_y, 5)
+    assert key != ModelCache.hash_inputs(test_x, test_y, 10, True)
+    assert key != ModelCache.hash_inputs(test_y, test_x, 10)
+
+def test_lru_eviction():
+    dummy_data = [0, 0]
+    cache = ModelCache(max_size = 2)
+    kernels = [GaussianKernel(dummy_data, dummy_data, 2) for _ in range(3)]
+    cache.put("a", kernels[0])
+    cache.put("b", kernels[1])
+    # Using "a" makes "b" the least recently used model
+    assert cache.get("a") is kernels[0]
+    cache.put("c", kernels[2])
+
+    assert len(cache) == 2
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert cache.get("c") is kernels[2]
+    assert (cache.hits, cache.misses) == (2, 1)
@@ -0,0 +1,51 @@
+from random import randint, uniform
+import numpy as np
+from plotting import bin_scatter, lttb_indexes
+
+def test_lttb_keeps_endpoints_and_spikes():
+    for _ in range(20):
+        n_points = randint(1000, 20000)
+        n_out = randint(3, 500)
+        x = np.arange(n_points, dtype = float)
+        y = np.sin(x / 100)
+        # A single spike should always survive decimation
+        spike = randint(1, n_points - 2)
+        y[spike] = 100
+
+        kept = lttb_indexes(x, y, n_out)
+        assert len(kept) == n_out
+        assert kept[0] == 0 and kept[-1] == n_points - 1
+        assert np.all(np.diff(kept) > 0)
+        assert spike in kept
+
+def test_lttb_small_series_untouched():
+    x = np.arange(10, dtype = float)
+    assert np.array_equal(lttb_indexes(x, x, 100), np.arange(10))
+
+def test_bin_scatter():
+    n_points = 100000
+    x = [uniform(-3, 3) for _ in range(n_points)]
+    y = [uniform(-1, 1) for _ in range(n_points)]
+    x_binned, y_binned = bin_scatter(x, y, max_points = 400)
+    # At most one point per cell, all within the original cloud
+    assert len(x_binned) <= 400
+    assert min(x) <= x_binned.min() and x_binned.max() <= max(x)
+    assert min(y) <= y_binned.min() and y_binned.max() <= max(y)
+    # Small scatters are drawn as they are
+    x_small, y_small = bin_scatter(x[:100], y[:100], max_points = 400)
+    assert np.array_equal(x_small, x[:100])
+    assert np.array_equal(y_small, y[:100])
+
+def test_bin_scatter_drops_nan():
+    n_points = 8000
+    x = [uniform(-3, 3) for _ in range(n_points)]
+    y = [uniform(-1, 1) for _ in range(n_points)]
+    y[randint(0, n_points - 1)] = np.nan
+    x[randint(0, n_points - 1)] = np.inf
+    x_binned, y_binned = bin_scatter(x, y, max_points = 400)
+    assert 0 < len(x_binned) <= 400
+    assert np.all(np.isfinite(x_binned)) and np.all(np.isfinite(y_binned))
+    # Non-finite pairs are left out of small scatters too
+    x_small, y_small = bin_scatter([0, 1, 2], [1, np.nan, 3])
+    assert np.array_equal(x_small, [0, 2])
+    assert np.array_equal(y_small, [1, 3])
@@ -8,6 +8,7 @@ This is the main file for the execution of the backtesting strategy.
 from datetime import datetime, timedelta
 import argparse
 from tools.portfolio import Portfolio
+from tools.providers import PROVIDERS
 
 def process_inputs() -> dict:
     """Processes inputs from command line for further processing
@@ -57,6 +58,50 @@ def process_inputs() -> dict:
         required = True, type = int,
         help = "Indicates the percentage of stocks to go long (Rounded up)"
     )
+    parser.add_argument("--provider",
+        required = False, choices = PROVIDERS, default = "yfinance",
+        help = "<OPTIONAL> Source of market data: yfinance, local or synthetic"
+    )
+    parser.add_argument("--data_dir",
+        required = False, type = str,
+        help = "<OPTIONAL> Directory of <TICKER>.csv/.parquet files for local"
+    )
+    parser.add_argument("--seed",
+        required = False, type = int, default = 4228,
+        help = "<OPTIONAL> Seed of the generated prices for synthetic"
+    )
+    parser.add_argument("--record",
+        required = False, type = str,
+        help = "<OPTIONAL> Directory to record provider responses to"
+    )
+    parser.add_argument("--replay",
+        required = False, type = str,
+        help = "<OPTIONAL> Directory of recorded responses to serve offline"
+    )
+    parser.add_argument("--fetch_concurrency",
+        required = False, type = int, default = 8,
+        help = "<OPTIONAL> Maximum number of downloads in flight at once"
+    )
+    parser.add_argument("--fetch_rate",
+        required = False, type = float, default = 10.0,
+        help = "<OPTIONAL> Maximum number of downloads started per second"
+    )
+    parser.add_argument("--fetch_retries",
+        required = False, type = int, default = 3,
+        help = "<OPTIONAL> Number of retries of a failed download, with backoff"
+    )
+    parser.add_argument("--fetch_timeout",
+        required = False, type = float, default = 30.0,
+        help = "<OPTIONAL> Seconds after which a download attempt is abandoned"
+    )
+    parser.add_argument("--float32",
+        required = False, action = "store_true",
+        help = "<OPTIONAL> Store prices as float32 to halve their memory"
+    )
+    parser.add_argument("--plot_async",
+        required = False, action = "store_true",
+        help = "<OPTIONAL> Save the graph in a background worker"
+    )
 
     # Check for Argument Validity before returning
     dict_args = vars(parser.parse_args())
@@ -133,8 +178,9 @@ def execute():
     portfolio = Portfolio(args)
     # Strategize first then print stats
     portfolio.strategize()
-    portfolio.print_stats()
+    # Plot first, so that a background save overlaps the printing
     portfolio.plot_graph()
+    portfolio.print_stats()
 
 if __name__ == "__main__":
     execute()
@@ -5,8 +5,9 @@ Class."""
 
 from datetime import datetime, timedelta
 from math import ceil
-import yfinance as yf
+import numpy as np
 import pandas as pd
+from tools.async_fetcher import AsyncFetcher
 
 class Fetcher:
     """Class that fetches data about multiple tickers
@@ -23,6 +24,8 @@ class Fetcher:
         days1: number of days used to compute strategy 1 signal returns
         strat2: strategy 2's type ('R' for reversal, 'M' for momentum)
         days2: number of days used to compute strategy 2 signal returns
+        fetch_layer: AsyncFetcher that rate limits and retries downloads
+        price_dtype: dtype the adjusted close is stored as
         data: Raw financial information about ticker
         LINE_SEPARATOR: Constant in line separating for presentability
     """
@@ -37,6 +40,9 @@ class Fetcher:
         self.strat2 = args["strategy2_type"]
         self.days2 = args["days2"] if self.strat2 == "R" \
             else args["days2"] + 20
+        self.fetch_layer = AsyncFetcher.from_args(args)
+        self.price_dtype = np.float32 if args.get("float32", False) \
+            else np.float64
         self.data = self.setup_data(args["tickers"])
 
     def determine_period(self, days: int) -> int:
@@ -72,16 +78,31 @@ class Fetcher:
         start_retrieve = self.begin_date - \
             timedelta(days = self.determine_period(max_days))
         end_retrieve = self.end_date
-        # Initialize data for each ticker
+        # Download all tickers concurrently, then initialize their data
         print(self.LINE_SEPARATOR)
-        for ticker in tickers:
-            print(f"Retrieving yfinance data for {ticker}")
-            ticker_df = self.fetch_data(ticker, start_retrieve, end_retrieve)
+        print(f"Retrieving {self.fetch_layer.source} data for "
+            f"{len(tickers)} tickers")
+        # The fetch layer's event loop is stopped once all are fetched
+        with self.fetch_layer:
+            results = self.fetch_layer.fetch_many([(ticker, start_retrieve,
+                end_retrieve) for ticker in tickers])
+        fetched_bytes, kept_bytes = 0, 0
+        for i, ticker in enumerate(tickers):
+            ticker_df = self.check_fetched(ticker, results[i],
+                start_retrieve, end_retrieve)
+            # Raw bars are released as soon as they are processed
+            results[i] = None
+            fetched_bytes += ticker_df.memory_usage(deep = True).sum()
             processed_df = self.process_df(ticker_df)
-            last_trading_days = self.find_last_days(ticker, ticker_df)
+            kept_bytes += processed_df.memory_usage(deep = True).sum()
+            last_trading_days = self.find_last_days(ticker, processed_df)
             data[ticker]["df"] = processed_df
             data[ticker]["last_days"] = last_trading_days
         print("Raw data for all necessary tickers fetched")
+        print(f"Memory per ticker: "
+            f"{fetched_bytes / len(tickers) / 1024:.1f} KiB fetched, "
+            f"{kept_bytes / len(tickers) / 1024:.1f} KiB kept")
+        print(f"Downloads: {self.fetch_layer.stats}")
         print(self.LINE_SEPARATOR)
         return data
 
@@ -89,7 +110,10 @@ class Fetcher:
             start_retri: datetime,
             end_retri: datetime
         ) -> pd.DataFrame:
-        """Fetches relevant financial data from the yfinance tracker.
+        """Fetches relevant financial data from the selected provider.
+
+        The download goes through the fetch layer, so it is retried
+        on transient failures and counts towards the rate limit.
 
         Args:
             tickers: name of ticker being tracked
@@ -99,12 +123,31 @@ class Fetcher:
         Returns:
             Dataframe of financial data from the given ticker
         """
-        tracker = yf.Ticker(ticker)
+        with self.fetch_layer:
+            result = self.fetch_layer.fetch_many(
+                [(ticker, start_retri, end_retri)])[0]
+        return self.check_fetched(ticker, result, start_retri, end_retri)
+
+    def check_fetched(self, ticker: str,
+            result,
+            start_retri: datetime,
+            end_retri: datetime
+        ) -> pd.DataFrame:
+        """Checks the result of a download from the fetch layer
+
+        Args:
+            ticker: name of ticker being tracked
+            result: downloaded Dataframe, or the error the download raised
+            start_retri: date to start retrieving data from
+            end_retri: final date to retrieve data from
+
+        Returns:
+            Dataframe of financial data from the given ticker
+        """
         try:
-            df: pd.DataFrame = tracker.history(
-                start = start_retri,
-                end = end_retri
-            )[start_retri: end_retri]
+            if isinstance(result, BaseException):
+                raise result
+            df: pd.DataFrame = result[start_retri: end_retri]
             if len(df) == 0:
                 raise Exception(f"No data available for ticker {ticker}")
             return df
@@ -116,19 +159,25 @@ class Fetcher:
             raise err
 
     def process_df(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Adds the stocks adjusted for dividends column to df
+        """Computes the stocks adjusted for dividends, dropping the rest
+
+        Only the adjusted close is read afterwards, so the other columns
+        are dropped. Dividends are accumulated in float64 before the sum
+        is stored as price_dtype.
 
         Args:
             df: dataframe of data w/o stocks adjusted for dividends
 
         Returns:
-            dataframe of data with stocks adjusted for dividends
+            dataframe with only the stocks adjusted for dividends
         """
         # cumsum used for Culminative Dividends
-        df["Close_Adjusted"] = (
-            df["Close"] + df["Dividends"].cumsum()
-        )
-        return df
+        close_adjusted = df["Close"].to_numpy(dtype = np.float64, copy = True)
+        close_adjusted += np.cumsum(df["Dividends"].to_numpy())
+        return pd.DataFrame({
+            "Close_Adjusted": close_adjusted.astype(
+                self.price_dtype, copy = False)
+        }, index = df.index)
 
     def find_last_days(self, ticker: str, df: pd.DataFrame) -> "list":
         """Finds the last days of the month for each ticker
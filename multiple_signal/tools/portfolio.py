@@ -6,9 +6,8 @@ documnetation to occupy minimal space and minimize clutter.
 from functools import reduce
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.lines as mlines
 from tools.strategizer import Strategizer
+from tools.plotting import decimate_series, load_pyplot, save_figure
 
 class Portfolio(Strategizer):
     """Class that computes the relevant statistics of the portfolio.
@@ -19,10 +18,12 @@ class Portfolio(Strategizer):
 
     Attributes:
         YEAR_TO_TRADING_DAYS: constant set at 250.
+        plot_async: whether the graph is saved by a background worker
     """
     def __init__(self, args: dict) -> None:
         super().__init__(args)
         self.YEAR_TO_TRADING_DAYS = 250
+        self.plot_async = args.get("plot_async", False)
 
     def print_stats(self) -> None:
         """Overall function that prints relevant statistics relating to AUM
@@ -84,8 +85,8 @@ class Portfolio(Strategizer):
 
     def get_aum_return(self) -> float:
         """Returns total AUM returns over the period"""
-        init_aum = self.daily_aum_hist[0]
-        final_aum = self.daily_aum_hist[-1]
+        init_aum = self.daily_aum_hist.iloc[0]
+        final_aum = self.daily_aum_hist.iloc[-1]
         return (final_aum - init_aum) / init_aum
 
     def get_annualized_ror(self, total_aum_return: np.float64) -> np.float64:
@@ -96,11 +97,11 @@ class Portfolio(Strategizer):
 
     def get_init_aum(self) -> np.float64:
         """Returns Initial AUM (Same as inputted parameter)"""
-        return self.daily_aum_hist[0]
+        return self.daily_aum_hist.iloc[0]
 
     def get_final_aum(self) -> np.float64:
         """Returns Final AUM over the period"""
-        return self.daily_aum_hist[-1]
+        return self.daily_aum_hist.iloc[-1]
 
     def get_avg_daily_aum(self) -> np.float64:
         """Returns average daily AUM over the period"""
@@ -140,24 +141,28 @@ class Portfolio(Strategizer):
         This function takes both IC, AUM pandas series and
         plots them. However, some care is taken to re-scale the
         axis to make both graphs prominent and also implementing
-        appropriate legends.
+        appropriate legends. Long histories are decimated with LTTB
+        before being plotted.
         """
+        plt = load_pyplot()
+        # pylint: disable=import-outside-toplevel
+        import matplotlib.lines as mlines
         plt.style.use("fivethirtyeight")
         fig, ax = plt.subplots(figsize = (16, 10))
         # plot daily aum hist first
-        ax.plot(self.daily_aum_hist, color = "red")
+        ax.plot(decimate_series(self.daily_aum_hist), color = "red")
         ax.set_xlabel("Date by Year and Month", fontsize = 14)
         ax.set_ylabel("AUM over time", color = "red", fontsize = 14)
 
         # then plot culminative information coefficient
         ax2 = ax.twinx()
-        ax2.plot(self.cul_info_coef, color = "blue")
+        ax2.plot(decimate_series(self.cul_info_coef), color = "blue")
         ax2.set_ylabel("Culminative information coefficient",
             color = "blue", fontsize = 14)
 
         # make x labels slightly smaller to minimize overlap
         for tick in ax.xaxis.get_major_ticks():
-            tick.label.set_fontsize(10)
+            tick.label1.set_fontsize(10)
 
         # make legend via brute force
         reds_line = mlines.Line2D([], [],
@@ -167,8 +172,8 @@ class Portfolio(Strategizer):
         plt.legend(handles = [blue_line, reds_line])
 
         # Once done, save the figure
-        fig.savefig(
+        save_figure(plt, fig,
             "./graphs/plot_aum_and_ic.jpg",
+            self.plot_async,
             format = "jpeg",
         )
-        plt.show()
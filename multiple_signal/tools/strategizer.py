@@ -7,7 +7,6 @@ monthly IC, which is then converted to culminative IC.
 from datetime import datetime
 from math import ceil
 from functools import reduce
-from sklearn.linear_model import LinearRegression
 import pandas as pd
 import numpy as np
 from tools.fetcher import Fetcher
@@ -35,6 +34,9 @@ class Strategizer(Fetcher):
         self.n_top_tickers = self.find_n_top_tickers(args)
         self.cul_info_coef: pd.Series = None
         self.daily_aum_hist: pd.Series = None
+        # scikit-learn is slow to import, so only import it when needed
+        # pylint: disable=import-outside-toplevel
+        from sklearn.linear_model import LinearRegression
         self.sk_ols = LinearRegression()
         self.x_train = np.empty((0, 2))
         self.y_train = np.empty((0, 1))
@@ -246,9 +248,11 @@ class Strategizer(Fetcher):
         # Take second last entry because that's the entry to track
         for packet in top_tickers_hist[-2]:
             ticker_df = self.data[packet["ticker"]]["df"]
-            filter_df = ticker_df.loc[start:end, "Close_Adjusted"]
+            # AUM is tracked in float64, even if prices are float32
+            filter_df = ticker_df.loc[start:end, "Close_Adjusted"] \
+                .astype(float)
             # find AUM change for the asset
-            aum_change = filter_df / filter_df[0] * asset_per_ticker
+            aum_change = filter_df / filter_df.iloc[0] * asset_per_ticker
             aum_by_ticker.append(aum_change)
 
         # Pointwise addition of series in an array
@@ -256,7 +260,7 @@ class Strategizer(Fetcher):
         daily_aum.append(gross_aum_change)
 
         # Current AUM should be updated to the last trading day
-        self.curr_aum = gross_aum_change[-1]
+        self.curr_aum = gross_aum_change.iloc[-1]
         self.evaluate_ic(aum_by_ticker, end, monthly_ic)
 
     def evaluate_ic(self,
@@ -275,7 +279,7 @@ class Strategizer(Fetcher):
         """
         n_increase = 0
         for ticker_df in aum_by_ticker:
-            n_increase += 1 if ticker_df[-1] > ticker_df[0] else 0
+            n_increase += 1 if ticker_df.iloc[-1] > ticker_df.iloc[0] else 0
 
         ic = (n_increase / self.n_top_tickers * 2) - 1
         monthly_ic[day] = ic
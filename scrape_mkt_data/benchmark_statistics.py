@@ -0,0 +1,107 @@
+"""Benchmark of the statistics engine against the per-getter
+computation that Processor.generate_statistics used before.
+
+Runs on a synthetic multi-decade daily history, so no data is fetched:
+
+    python benchmark_statistics.py --years 40 --repeat 200
+"""
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from tools.processor import Processor
+from tools.statistics import compute_statistics
+
+def process_inputs() -> dict:
+    """Processes inputs from command line for further processing.
+
+    Returns:
+        Dictionary that maps parser command line arguments (key) to
+        the parameters (values) inputted by the user.
+    """
+    parser = argparse.ArgumentParser(
+        prog = "benchmark_statistics",
+        description = "Benchmark the statistics engine of the Processor"
+    )
+    parser.add_argument("--years",
+        required = False, type = int, default = 40,
+        help = "Years of daily history to generate"
+    )
+    parser.add_argument("--repeat",
+        required = False, type = int, default = 200,
+        help = "Number of times each computation is repeated"
+    )
+    return vars(parser.parse_args())
+
+def per_getter_statistics(processor: Processor, df: pd.DataFrame) -> dict:
+    """Computes the statistics with the Processor's atomic getters"""
+    # pylint: disable=protected-access
+    stock_hist = df["Stocks_Close_Adjusted"]
+    n_stocks = float(processor._initial_aum / stock_hist.iloc[0])
+    trading_days = processor._get_trading_days(df)
+    total_aum_returns = processor._get_aum_returns(stock_hist, n_stocks)
+    final_aum = processor._get_final_aum(total_aum_returns)
+    return {
+        "Start Date:": processor._get_start_date_adjusted(df),
+        "End Date: ": processor._get_end_date_adjusted(df),
+        "Total stock return (With Dividends):": \
+            processor._get_stock_returns(stock_hist),
+        "Total returns of AUM:": total_aum_returns,
+        "Annualized AUM returns:": processor._get_annual_aum_returns(
+            total_aum_returns, trading_days),
+        "Final AUM:": final_aum,
+        "Average AUM:": processor._get_average_aum(stock_hist, n_stocks),
+        "Maximum AUM:": processor._get_max_aum(stock_hist, n_stocks),
+        "PnL of AUM:": processor._get_aum_pnl(
+            processor._initial_aum, final_aum),
+        "Average daily returns:": \
+            processor._get_average_daily_return(stock_hist, n_stocks),
+        "Daily Standard Deviation:": \
+            processor._get_daily_aum_sd(stock_hist, n_stocks),
+        "Daily Sharpe Ratio:": \
+            processor._get_daily_sharpe_ratio(stock_hist, n_stocks)
+    }
+
+def time_it(func, repeat: int) -> float:
+    """Returns the average time of func() in milliseconds"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def execute():
+    """Overall function that runs the benchmark"""
+    args = process_inputs()
+    n_days = args["years"] * 250
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("1980/01/01", periods = n_days)
+    close = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.01, n_days)))
+    df = pd.DataFrame({
+        "Close": close,
+        "Dividends": np.where(rng.random(n_days) < 0.016, 0.2, 0)
+    }, index = dates)
+
+    processor = Processor({
+        "ticker": "SYNTHETIC",
+        "b": "19800101",
+        "e": None,
+        "initial_aum": 10000,
+        "plot": False
+    })
+    # pylint: disable=protected-access
+    df = processor._add_dividend_to_stock(df)
+    prices = df["Stocks_Close_Adjusted"]
+
+    per_getter_ms = time_it(
+        lambda: per_getter_statistics(processor, df), args["repeat"])
+    engine_ms = time_it(
+        lambda: compute_statistics(df.index, prices.to_numpy(), 10000),
+        args["repeat"])
+    print(f"{n_days} daily bars, averaged over {args['repeat']} runs")
+    print(f"Per-getter pandas statistics: {per_getter_ms:.3f} ms")
+    print(f"Statistics engine: {engine_ms:.3f} ms")
+    print(f"Speed-up: {per_getter_ms / engine_ms:.1f}x")
+
+if __name__ == '__main__':
+    execute()
@@ -6,6 +6,8 @@ This is the main file for the execution of the file to get prices.
 """
 
 import argparse
+from tools.batch import BatchProcessor
+from tools.providers import BARS_PER_DAY, PROVIDERS
 from tools.processor import Processor
 
 def process_inputs() -> dict:
@@ -20,11 +22,20 @@ def process_inputs() -> dict:
         prog = "get_prices",
         description= "Get Stocks Price data using yfinance API"
     )
-    parser.add_argument("--ticker",
+    # Either a single ticker, or a batch of tickers
+    tickers_group = parser.add_mutually_exclusive_group(required = True)
+    tickers_group.add_argument("--ticker",
         type = str,
-        required = True,
         help = "Ticker for Scraper to track"
     )
+    tickers_group.add_argument("--tickers",
+        nargs = "+",
+        help = "Batch mode: space-separated list of tickers to track"
+    )
+    tickers_group.add_argument("--tickers_file",
+        type = str,
+        help = "Batch mode: file of tickers separated by newlines or commas"
+    )
     parser.add_argument("--b",
         required = True,
         type = str,
@@ -45,13 +56,143 @@ def process_inputs() -> dict:
         action = "store_true",
         help = "Optional Flag that decides whether to plot graph"
     )
+    parser.add_argument("--float32",
+        required = False,
+        action = "store_true",
+        help = "Optional Flag to store prices as float32 to halve memory"
+    )
+    parser.add_argument("--rolling",
+        required = False,
+        nargs = "*",
+        type = int,
+        help = "Optional rolling windows in days for risk statistics "
+            "(default 20 60 250)"
+    )
+    parser.add_argument("--workers",
+        required = False,
+        type = int,
+        default = 8,
+        help = "Batch mode: number of tickers fetched concurrently"
+    )
+    parser.add_argument("--output",
+        required = False,
+        type = str,
+        help = "Batch mode: .csv or .parquet file to save the table to"
+    )
+    parser.add_argument("--provider",
+        required = False,
+        choices = PROVIDERS,
+        default = "yfinance",
+        help = "Source of market data: yfinance, local files or synthetic"
+    )
+    parser.add_argument("--data_dir",
+        required = False,
+        type = str,
+        help = "Directory of <TICKER>.csv/.parquet files for --provider local"
+    )
+    parser.add_argument("--seed",
+        required = False,
+        type = int,
+        default = 4228,
+        help = "Seed of the generated prices for --provider synthetic"
+    )
+    parser.add_argument("--record",
+        required = False,
+        type = str,
+        help = "Optional directory to record every provider response to"
+    )
+    parser.add_argument("--replay",
+        required = False,
+        type = str,
+        help = "Optional directory of recorded responses to serve offline"
+    )
+    parser.add_argument("--interval",
+        required = False,
+        choices = list(BARS_PER_DAY),
+        default = "1d",
+        help = "Length of the bars; intraday bars are streamed from --bar_dir"
+    )
+    parser.add_argument("--bar_dir",
+        required = False,
+        type = str,
+        default = "./bars",
+        help = "Directory to store intraday bars in, as memory-mapped chunks"
+    )
+    parser.add_argument("--cache_dir",
+        required = False,
+        type = str,
+        help = "Optional directory to cache fetched prices in"
+    )
+    parser.add_argument("--cache_ttl",
+        required = False,
+        type = float,
+        default = 12,
+        help = "Hours after which the most recent cached bars are refreshed"
+    )
+    parser.add_argument("--offline",
+        required = False,
+        action = "store_true",
+        help = "Optional Flag to only use cached prices (default ./cache)"
+    )
+    parser.add_argument("--fetch_concurrency",
+        required = False,
+        type = int,
+        default = 8,
+        help = "Maximum number of downloads in flight at once"
+    )
+    parser.add_argument("--fetch_rate",
+        required = False,
+        type = float,
+        default = 10.0,
+        help = "Maximum number of downloads started per second"
+    )
+    parser.add_argument("--fetch_retries",
+        required = False,
+        type = int,
+        default = 3,
+        help = "Number of retries of a failed download, with backoff"
+    )
+    parser.add_argument("--fetch_timeout",
+        required = False,
+        type = float,
+        default = 30.0,
+        help = "Seconds after which a download attempt is abandoned"
+    )
+    parser.add_argument("--state_dir",
+        required = False,
+        type = str,
+        help = "Optional directory to persist running statistics in, so that "
+            "later runs only process new bars"
+    )
+    parser.add_argument("--plot_async",
+        required = False,
+        action = "store_true",
+        help = "Optional Flag to save the graph in a background worker"
+    )
     return vars(parser.parse_args())
 
+def execute_batch(args: dict) -> None:
+    """Generates one combined table of statistics for many tickers"""
+    tickers = args["tickers"] if args["tickers"] is not None \
+        else BatchProcessor.read_tickers(args["tickers_file"])
+    batch = BatchProcessor(args, tickers, args["workers"])
+    table = batch.run()
+    print(table.to_string())
+    if args["output"] is not None:
+        batch.save(table, args["output"])
+    batch.print_summary(table)
+
 def execute():
     """Overall function which runs the whole algorithm."""
     args = process_inputs()
+    if args["ticker"] is None:
+        execute_batch(args)
+        return
     processor = Processor(args)
-    processor.generate_statistics()
+    try:
+        processor.generate_statistics()
+    finally:
+        processor.close()
 
 if __name__ == '__main__':
     execute()
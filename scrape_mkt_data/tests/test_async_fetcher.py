@@ -0,0 +1,132 @@
+from datetime import datetime
+import threading
+import time
+import json
+import pandas as pd
+import pytest
+from tools.async_fetcher import AsyncFetcher, TokenBucket
+from tools.providers import MissingDataError
+
+START = datetime(2020, 1, 2)
+END = datetime(2020, 2, 3)
+
+class FlakySource:
+    """Download that fails a given number of times before succeeding"""
+    def __init__(self, n_failures: int, delay: float = 0.0) -> None:
+        self.n_failures = n_failures
+        self.delay = delay
+        self.n_calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, ticker, start, end) -> pd.DataFrame:
+        with self._lock:
+            self.n_calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            should_fail = self.n_calls <= self.n_failures
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        if should_fail:
+            raise ConnectionError("Mock network failure")
+        return pd.DataFrame({"Close": [1.0, 2.0]}, index = [start, end])
+
+def test_retries_transient_failures():
+    source = FlakySource(n_failures = 2)
+    layer = AsyncFetcher(source, max_retries = 3, base_delay = 0.001)
+    df = layer.fetch_sync("MSFT", START, END)
+    assert list(df["Close"]) == [1.0, 2.0]
+    assert source.n_calls == 3
+    assert layer.stats.n_retries == 2
+    assert layer.stats.n_success == 1
+    assert layer.stats.n_failures == 0
+
+def test_gives_up_after_max_retries():
+    source = FlakySource(n_failures = 10)
+    layer = AsyncFetcher(source, max_retries = 2, base_delay = 0.001)
+    with pytest.raises(ConnectionError):
+        layer.fetch_sync("MSFT", START, END)
+    assert source.n_calls == 3
+    assert layer.stats.n_failures == 1
+
+def test_does_not_retry_bad_requests():
+    def download(ticker, start, end):
+        raise OverflowError("date value out of range")
+    layer = AsyncFetcher(download, max_retries = 3, base_delay = 0.001)
+    with pytest.raises(OverflowError):
+        layer.fetch_sync("MSFT", START, END)
+    assert layer.stats.n_retries == 0
+
+def test_timeout_is_retried():
+    source = FlakySource(n_failures = 0, delay = 0.2)
+    layer = AsyncFetcher(source, max_retries = 1, timeout = 0.01,
+        base_delay = 0.001)
+    with pytest.raises(TimeoutError):
+        layer.fetch_sync("MSFT", START, END)
+    assert layer.stats.n_timeouts == 2
+
+def test_fetch_many_limits_concurrency():
+    source = FlakySource(n_failures = 1, delay = 0.02)
+    layer = AsyncFetcher(source, max_concurrency = 3, rate = 1000,
+        base_delay = 0.001)
+    results = layer.fetch_many([(f"T{i}", START, END) for i in range(12)])
+    assert all(isinstance(df, pd.DataFrame) for df in results)
+    assert source.max_in_flight <= 3
+    assert layer.stats.n_success == 12
+    assert layer.stats.summary()["p50_latency_ms"] >= 20
+
+def test_fetch_many_keeps_errors():
+    def download(ticker, start, end):
+        if ticker == "BAD":
+            raise MissingDataError("No such ticker")
+        return pd.DataFrame({"Close": [1.0]})
+    layer = AsyncFetcher(download)
+    results = layer.fetch_many([("MSFT", START, END), ("BAD", START, END)])
+    assert isinstance(results[0], pd.DataFrame)
+    assert isinstance(results[1], ValueError)
+    assert layer.stats.n_retries == 0
+
+def test_token_bucket_rate():
+    layer = AsyncFetcher(FlakySource(n_failures = 0), max_concurrency = 1,
+        rate = 50)
+    start = time.perf_counter()
+    layer.fetch_many([(f"T{i}", START, END) for i in range(11)])
+    # Only the first request is served from the initial burst
+    assert time.perf_counter() - start >= 10 / 50 * 0.9
+
+def test_token_bucket_rejects_bad_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0, 1)
+
+def test_retries_empty_and_bad_responses():
+    calls = []
+    def download(ticker, start, end):
+        calls.append(ticker)
+        if len(calls) == 1:
+            raise json.JSONDecodeError("Expecting value", "", 0)
+        if len(calls) == 2:
+            return pd.DataFrame()
+        return pd.DataFrame({"Close": [1.0]})
+    layer = AsyncFetcher(download, max_retries = 3, base_delay = 0.001)
+    assert len(layer.fetch_sync("MSFT", START, END)) == 1
+    assert layer.stats.n_retries == 2
+
+    # An empty response is only retried once, then returned as it is
+    layer = AsyncFetcher(lambda *request: pd.DataFrame(), max_retries = 3,
+        base_delay = 0.001)
+    assert len(layer.fetch_sync("MSFT", START, END)) == 0
+    assert layer.stats.n_retries == 1 and layer.stats.n_empty == 1
+
+def test_timed_out_downloads_keep_their_slot():
+    source = FlakySource(n_failures = 0, delay = 0.1)
+    with AsyncFetcher(source, max_concurrency = 2, rate = 1000,
+        max_retries = 1, timeout = 0.01, base_delay = 0.001) as layer:
+        layer.fetch_many([(f"T{i}", START, END) for i in range(6)])
+        assert source.max_in_flight <= 2
+    # Closing stops the thread, and the layer can be used again
+    assert layer._thread is None # pylint: disable=W0212
+    source.delay = 0.0
+    assert len(layer.fetch_sync("MSFT", START, END)) == 2
+    layer.close()
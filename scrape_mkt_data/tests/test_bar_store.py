@@ -0,0 +1,175 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from tools.async_fetcher import AsyncFetcher
+from tools.bar_store import BarStore
+from tools.processor import Processor
+from tools.providers import SyntheticProvider
+from tools.running_state import RunningState
+from tools.statistics import compute_statistics
+
+def test_append_and_stream(tmp_path):
+    provider = SyntheticProvider(seed = 1, interval = "5m")
+    store = BarStore(str(tmp_path), "msft", "5m")
+    months = [datetime(2020, 1, 1), datetime(2020, 2, 1), datetime(2020, 3, 1)]
+    for first, last in zip(months[:-1], months[1:]):
+        store.append(provider("MSFT", first, last), first, last)
+    with pytest.raises(ValueError):
+        store.append(provider("MSFT", months[0], months[1]),
+            months[0], months[1])
+
+    # The index is reloaded, and the chunks are memory-mapped
+    store = BarStore(str(tmp_path), "MSFT", "5m")
+    assert (store.start, store.end) == (months[0], months[-1])
+    chunks = list(store.iter_chunks(datetime(2020, 1, 15), months[-1]))
+    assert len(chunks) == 2
+    assert isinstance(chunks[0][1].base, np.memmap)
+    expected = provider("MSFT", datetime(2020, 1, 15), months[-1])
+    dates = np.concatenate([chunk[0] for chunk in chunks])
+    assert store.n_rows > len(dates) == len(expected)
+    assert (dates == expected.index.values).all()
+    assert np.allclose(np.concatenate([chunk[1] for chunk in chunks]),
+        expected["Close"])
+
+    # Another dtype or source has its own chunks, and keeps these ones
+    other = BarStore(str(tmp_path), "MSFT", "5m", np.float32)
+    assert other.n_rows == 0
+    other.append(provider("MSFT", months[0], months[1]), months[0], months[1])
+    assert BarStore(str(tmp_path), "MSFT", "5m", source = "synthetic") \
+        .n_rows == 0
+    store = BarStore(str(tmp_path), "MSFT", "5m")
+    assert store.n_rows > other.n_rows > 0
+    assert (store.start, store.end) == (months[0], months[-1])
+
+def test_streamed_state_matches_full_history():
+    df = SyntheticProvider(seed = 2)("AAPL", datetime(2000, 1, 1),
+        datetime(2010, 1, 1))
+    chunks = [(part.index.values, part["Close"].to_numpy(),
+        part["Dividends"].to_numpy())
+        for _, part in df.groupby(df.index.to_period("M"))]
+    state = RunningState.from_chunks(datetime(2000, 1, 1), iter(chunks))
+    prices = df["Close"] + df["Dividends"].cumsum()
+    expected = compute_statistics(df.index, prices.to_numpy(), 10000)
+    actual = state.to_statistics(10000)
+    assert list(actual) == list(expected)
+    for key, value in expected.items():
+        if isinstance(value, str):
+            assert actual[key] == value
+        else:
+            assert np.isclose(actual[key], value, rtol = 1e-9)
+
+def test_processor_streams_intraday_bars(tmp_path):
+    input_args = {
+        "ticker": "MSFT",
+        "b": "20200102",
+        "e": "20200630",
+        "initial_aum": 10000,
+        "plot": False,
+        "provider": "synthetic",
+        "interval": "15m",
+        "bar_dir": str(tmp_path)
+    }
+    processor = Processor(input_args)
+    statistics = processor.stream_statistics()
+    assert statistics["Start Date:"] == "2020-01-02"
+    assert statistics["End Date: "] == "2020-06-30"
+    assert processor._fetch_layer.stats.n_requests == 6 # pylint: disable=W0212
+
+    # Bars of the 26 bars per day scale to the daily volatility of the path
+    daily = SyntheticProvider()("MSFT", datetime(2015, 1, 1),
+        datetime(2020, 7, 1))["Close"]
+    daily_sd = daily.pct_change().std()
+    assert 0.7 < statistics["Daily Standard Deviation:"] / daily_sd < 1.3
+
+    # The second run is served from the store
+    processor = Processor(input_args)
+    assert processor.stream_statistics() == statistics
+    assert processor._fetch_layer.stats.n_requests == 0 # pylint: disable=W0212
+
+    with pytest.raises(ValueError):
+        Processor(dict(input_args, rolling = []))
+
+def intraday_args(tmp_path, begin: str) -> dict:
+    return {
+        "ticker": "MSFT",
+        "b": begin,
+        "e": "20200630",
+        "initial_aum": 10000,
+        "plot": False,
+        "provider": "synthetic",
+        "interval": "15m",
+        "bar_dir": str(tmp_path)
+    }
+
+def test_prepend_keeps_stored_bars(tmp_path):
+    provider = SyntheticProvider(seed = 1, interval = "5m")
+    store = BarStore(str(tmp_path), "MSFT", "5m")
+    months = [datetime(2020, 1, 1), datetime(2020, 2, 1), datetime(2020, 3, 1)]
+    store.append(provider("MSFT", months[1], months[2]), months[1], months[2])
+    store.prepend(provider("MSFT", months[0], months[1]), months[0], months[1])
+    with pytest.raises(ValueError):
+        store.prepend(provider("MSFT", months[1], months[2]),
+            months[1], months[2])
+    store = BarStore(str(tmp_path), "MSFT", "5m")
+    assert (store.start, store.end) == (months[0], months[-1])
+    dates = np.concatenate([chunk[0] for chunk in
+        store.iter_chunks(months[0], months[-1])])
+    assert (dates == provider("MSFT", months[0], months[-1]).index.values) \
+        .all()
+
+def test_earlier_start_extends_store(tmp_path):
+    processor = Processor(intraday_args(tmp_path, "20200302"))
+    processor.stream_statistics()
+    n_chunks = len(BarStore(str(tmp_path), "MSFT", "15m",
+        source = "synthetic").chunks)
+
+    # Only the missing months (and the weekend before March 2nd) are
+    # downloaded, the rest is kept
+    processor = Processor(intraday_args(tmp_path, "20200102"))
+    statistics = processor.stream_statistics()
+    assert processor._fetch_layer.stats.n_requests == 3 # pylint: disable=W0212
+    assert len(BarStore(str(tmp_path), "MSFT", "15m",
+        source = "synthetic").chunks) == n_chunks + 2
+    assert statistics["Start Date:"] == "2020-01-02"
+
+def test_empty_months_are_not_stored(tmp_path):
+    provider = SyntheticProvider(interval = "15m")
+    def download(ticker, start, end):
+        # Like yfinance, which only serves recent intraday bars
+        bars = provider(ticker, start, end)
+        return bars[bars.index >= "2020-04-01"]
+
+    args = intraday_args(tmp_path, "20200102")
+    processor = Processor(args, AsyncFetcher(download, max_retries = 0))
+    statistics = processor.stream_statistics()
+    assert statistics["Start Date:"] == "2020-04-01"
+    store = BarStore(str(tmp_path), "MSFT", "15m", source = "download")
+    assert store.start == datetime(2020, 4, 1)
+
+    # The months before are downloaded again by the next run
+    fetch_layer = AsyncFetcher(download, max_retries = 0)
+    Processor(args, fetch_layer).stream_statistics()
+    assert fetch_layer.stats.n_requests == 3
+
+def test_minute_bars_downloaded_in_short_windows(tmp_path):
+    provider = SyntheticProvider(interval = "1m")
+    def download(ticker, start, end):
+        # Like yfinance, which serves at most 7 days of 1m bars at once
+        if end - start > timedelta(days = 7):
+            return provider(ticker, start, start)
+        return provider(ticker, start, end)
+
+    args = dict(intraday_args(tmp_path, "20200401"), e = "20200531",
+        interval = "1m")
+    fetch_layer = AsyncFetcher(download, max_retries = 0)
+    statistics = Processor(args, fetch_layer).stream_statistics()
+    assert statistics["Start Date:"] == "2020-04-01"
+    assert fetch_layer.stats.n_empty == 0
+    # Stored in one chunk per month all the same
+    store = BarStore(str(tmp_path), "MSFT", "1m", source = "download")
+    assert store.start == datetime(2020, 4, 1)
+    assert len(store.chunks) == 2
+    dates = np.concatenate([chunk[0] for chunk in
+        store.iter_chunks(store.start, store.end)])
+    assert (dates == provider("MSFT", store.start, store.end).index.values) \
+        .all()
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from tools.batch import BatchProcessor
+from tools.fetcher import Fetcher
+
+def mock_download(self, start: datetime, end: datetime) -> pd.DataFrame:
+    """Fake download that fails for the ticker BAD"""
+    # pylint: disable=W0212
+    if self._ticker == "BAD":
+        raise ConnectionError("Mock network failure")
+    dates = pd.bdate_range(start, end - timedelta(days = 1))
+    return pd.DataFrame({
+        "Close": np.linspace(100, 200, len(dates)),
+        "Dividends": np.zeros(len(dates))
+    }, index = dates)
+
+def test_batch_records_failures(monkeypatch, tmp_path):
+    monkeypatch.setattr(Fetcher, "_download", mock_download)
+    args = {
+        "b": "20200102",
+        "e": "20201231",
+        "initial_aum": 10000,
+        "plot": False
+    }
+    tickers = ["MSFT", "BAD", "AAPL"]
+    batch = BatchProcessor(args, tickers, n_workers = 2)
+    table = batch.run()
+
+    assert list(table.index) == tickers
+    assert "Mock network failure" in table.at["BAD", "Error"]
+    for ticker in ["MSFT", "AAPL"]:
+        assert pd.isna(table.at[ticker, "Error"])
+        assert abs(table.at[ticker, "Final AUM"] - 20000) <= 10 ** -6
+
+    output = tmp_path / "stats.csv"
+    batch.save(table, str(output))
+    assert list(pd.read_csv(output)["Ticker"]) == tickers
+
+def test_read_tickers(tmp_path):
+    tickers_file = tmp_path / "tickers.txt"
+    tickers_file.write_text("# Large caps\nMSFT, AAPL\n\nNVDA\n")
+    assert BatchProcessor.read_tickers(str(tickers_file)) == \
+        ["MSFT", "AAPL", "NVDA"]
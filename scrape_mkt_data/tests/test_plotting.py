@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+from tools.plotting import decimate_series, load_pyplot, save_figure
+
+def test_decimate_series_keeps_shape():
+    n_days = 30000
+    dates = pd.date_range("1950/01/01", freq = "D", periods = n_days)
+    aum_hist = pd.Series(np.linspace(100, 200, n_days), index = dates)
+    aum_hist.iloc[12345] = 1000
+
+    decimated = decimate_series(aum_hist, max_points = 1000)
+    assert len(decimated) == 1000
+    # Endpoints and the maximum are kept, with their dates
+    assert decimated.index[0] == dates[0]
+    assert decimated.index[-1] == dates[-1]
+    assert decimated.idxmax() == dates[12345]
+
+def test_decimate_short_series_untouched():
+    dates = pd.date_range("2021/05/10", freq = "D", periods = 3)
+    aum_hist = pd.Series([480, 700, 640], index = dates)
+    assert decimate_series(aum_hist) is aum_hist
+
+def test_background_save_closes_figure_first(tmp_path):
+    plt = load_pyplot()
+    fig, ax = plt.subplots()
+    ax.plot([1, 2, 3])
+    path = tmp_path / "graph.png"
+    done = save_figure(plt, fig, str(path), background = True)
+    # The figure is released by pyplot before the worker renders it
+    assert not plt.fignum_exists(fig.number)
+    done.result()
+    assert path.stat().st_size > 0
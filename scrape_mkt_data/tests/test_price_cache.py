@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from tools.price_cache import PriceCache
+
+class MockSource:
+    """Fake data source that records every requested date range"""
+    def __init__(self):
+        self.requests = []
+
+    def download(self, start: datetime, end: datetime) -> pd.DataFrame:
+        self.requests.append((start, end))
+        dates = pd.bdate_range(start, end - timedelta(days = 1), name = "Date")
+        close = np.arange(len(dates), dtype = float) + len(self.requests)
+        return pd.DataFrame({
+            "Close": close,
+            "Dividends": np.zeros(len(dates)),
+            "Volume": np.arange(len(dates))
+        }, index = dates)
+
+def test_warm_cache_makes_no_download(tmp_path):
+    source = MockSource()
+    cache = PriceCache(str(tmp_path))
+    start, end = datetime(2020, 1, 1), datetime(2021, 1, 1)
+    cold = cache.get("MSFT", start, end, source.download)
+    warm = cache.get("MSFT", start, end, source.download)
+
+    assert source.requests == [(start, end)]
+    pd.testing.assert_frame_equal(cold, warm, check_freq = False,
+        check_index_type = False)
+    # A new cache instance reads the same bars back from disk
+    cache = PriceCache(str(tmp_path))
+    reloaded = cache.get("MSFT", start, end, source.download)
+    assert len(source.requests) == 1
+    pd.testing.assert_frame_equal(cold, reloaded, check_freq = False,
+        check_index_type = False)
+
+def test_only_gaps_are_downloaded(tmp_path):
+    source = MockSource()
+    cache = PriceCache(str(tmp_path))
+    cache.get("MSFT", datetime(2020, 3, 1), datetime(2020, 6, 1),
+        source.download)
+    df = cache.get("MSFT", datetime(2020, 1, 1), datetime(2020, 9, 1),
+        source.download)
+
+    assert source.requests[1:] == [
+        (datetime(2020, 1, 1), datetime(2020, 3, 1)),
+        (datetime(2020, 6, 1), datetime(2020, 9, 1))
+    ]
+    assert df.index.is_monotonic_increasing
+    assert not df.index.duplicated().any()
+    assert len(df) == len(pd.bdate_range("2020-01-01", "2020-08-31"))
+
+def test_stale_cache_refreshes_recent_bars(tmp_path):
+    source = MockSource()
+    cache = PriceCache(str(tmp_path), ttl = timedelta(hours = 1))
+    end = datetime.now() + timedelta(days = 1)
+    start = end - timedelta(days = 60)
+    cache.get("MSFT", start, end, source.download)
+
+    # Pretend that the bars were fetched 2 days ago
+    meta_path = tmp_path / "MSFT.json"
+    meta = json.loads(meta_path.read_text())
+    fetched_at = datetime.now() - timedelta(days = 2)
+    meta["fetched_at"] = fetched_at.isoformat()
+    meta_path.write_text(json.dumps(meta))
+    cache.get("MSFT", start, end, source.download)
+
+    refresh_start, _ = source.requests[-1]
+    assert len(source.requests) == 2
+    assert refresh_start == fetched_at - timedelta(
+        days = PriceCache.REFRESH_DAYS)
+
+def test_offline_mode(tmp_path):
+    source = MockSource()
+    start, end = datetime(2020, 1, 1), datetime(2021, 1, 1)
+    offline_cache = PriceCache(str(tmp_path), offline = True)
+    with pytest.raises(ValueError):
+        offline_cache.get("MSFT", start, end, source.download)
+
+    PriceCache(str(tmp_path)).get("MSFT", start, end, source.download)
+    df = offline_cache.get("MSFT", start, end, source.download)
+    assert len(df) > 0
+    # Requests beyond the cached range cannot be served offline
+    with pytest.raises(ValueError):
+        offline_cache.get("MSFT", start, datetime(2021, 6, 1),
+            source.download)
+    assert len(source.requests) == 1
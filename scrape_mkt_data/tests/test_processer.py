@@ -92,3 +92,26 @@ def test_get_aum_pnl():
     expected_pnl = -2000
     # floating point tolerance
     assert abs(actual_pnl - expected_pnl) <= 10 ** -6
+
+def test_add_dividend_keeps_only_adjusted_close():
+    input_args = {
+        "ticker": "AAPL",
+        "b": "20210515",
+        "e": "20210517",
+        "initial_aum": 6000,
+        "plot": False,
+        "float32": True
+    }
+    processor = Processor(input_args)
+    mock_df = pd.DataFrame({
+        "Open": [1.0, 2.0, 3.0],
+        "Close": [100.0, 101.0, 102.0],
+        "Volume": [10, 20, 30],
+        "Dividends": [0.0, 0.5, 0.0]
+    }, index = pd.date_range("2021/05/15", freq="D", periods = 3))
+    actual_df = processor._add_dividend_to_stock(mock_df)
+    assert list(actual_df.columns) == ["Stocks_Close_Adjusted"]
+    assert actual_df["Stocks_Close_Adjusted"].dtype == "float32"
+    assert list(actual_df["Stocks_Close_Adjusted"]) == [100.0, 101.5, 102.5]
+    # The fetched data itself is left untouched
+    assert list(mock_df["Close"]) == [100.0, 101.0, 102.0]
@@ -0,0 +1,115 @@
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from tools.processor import Processor
+from tools.providers import LocalProvider, Provider, RecordingProvider, \
+    ReplayProvider, SyntheticProvider, create_provider, fixture_name
+
+def test_synthetic_is_seeded_and_consistent():
+    provider = SyntheticProvider(seed = 1)
+    df = provider("MSFT", datetime(2000, 1, 3), datetime(2010, 1, 1))
+    assert df.index[0] == pd.Timestamp("2000-01-03")
+    assert df.index[-1] == pd.Timestamp("2009-12-31")
+    assert (df.index.dayofweek < 5).all()
+    # About 4 dividends a year
+    assert 40 <= (df["Dividends"] > 0).sum() <= 42
+    assert (df["Low"] <= df[["Open", "Close"]].min(axis = 1)).all()
+
+    # Any period of the same ticker comes from the same path
+    part = provider("MSFT", datetime(2005, 1, 1), datetime(2006, 1, 1))
+    pd.testing.assert_frame_equal(part, df.loc["2005"])
+    other = SyntheticProvider(seed = 1)("AAPL", datetime(2005, 1, 1),
+        datetime(2006, 1, 1))
+    assert not np.allclose(other["Close"], part["Close"])
+
+def test_local_reads_csv(tmp_path):
+    dates = pd.date_range("2020-01-02", periods = 5, tz = "America/New_York")
+    pd.DataFrame({
+        "Close": [1.0, 2.0, 3.0, 4.0, 5.0],
+        "Dividends": [0.0, 0.0, 0.1, 0.0, 0.0]
+    }, index = pd.Index(dates, name = "Date")).to_csv(tmp_path / "MSFT.csv")
+
+    provider = LocalProvider(str(tmp_path))
+    df = provider("msft", datetime(2020, 1, 3), datetime(2020, 1, 5))
+    assert list(df.index) == [pd.Timestamp("2020-01-03"),
+        pd.Timestamp("2020-01-04")]
+    assert list(df["Close"]) == [2.0, 3.0]
+    with pytest.raises(ValueError):
+        provider("AAPL", datetime(2020, 1, 3), datetime(2020, 1, 5))
+
+def test_create_provider():
+    assert create_provider({}).name == "yfinance"
+    assert create_provider({"provider": "synthetic", "seed": 7}).seed == 7
+    with pytest.raises(ValueError):
+        create_provider({"provider": "local"})
+    with pytest.raises(ValueError):
+        create_provider({"provider": "bloomberg"})
+
+def test_processor_runs_offline():
+    input_args = {
+        "ticker": "MSFT",
+        "b": "19900102",
+        "e": "20191231",
+        "initial_aum": 10000,
+        "plot": False,
+        "provider": "synthetic"
+    }
+    processor = Processor(input_args)
+    statistics = processor.get_statistics(processor.load_data())
+    assert statistics["Start Date:"] == "1990-01-02"
+    assert statistics["End Date: "] == "2019-12-31"
+    assert statistics["Initial AUM:"] == 10000
+
+class PayloadProvider(Provider):
+    """Provider returning a yfinance-like payload, with a gap and a split"""
+    name = "payload"
+
+    def history(self, ticker, start, end):
+        dates = pd.DatetimeIndex(["2020-01-02", "2020-01-03", "2020-01-07",
+            "2020-01-08"]).tz_localize("America/New_York")
+        df = pd.DataFrame({
+            "Open": [1.0, 2.0, 1.5, 1.6],
+            "Close": [2.0, 3.0, 1.5, 1.7],
+            "Volume": np.array([10, 20, 30, 40], dtype = np.int64),
+            "Dividends": [0.0, 0.1, 0.0, 0.0],
+            "Stock Splits": [0.0, 0.0, 2.0, 0.0]
+        }, index = pd.DatetimeIndex(dates, name = "Date"))
+        local = df.index.tz_localize(None)
+        return df[(local >= start) & (local < end)]
+
+def test_record_and_replay(tmp_path):
+    start, end = datetime(2020, 1, 1), datetime(2020, 1, 9)
+    recorder = RecordingProvider(PayloadProvider(), str(tmp_path))
+    recorded = recorder("msft", start, end)
+    assert (tmp_path / fixture_name("MSFT", "1d", start, end)).exists()
+
+    # The payload is served as recorded, timezone and dtypes included
+    replay = ReplayProvider(str(tmp_path))
+    pd.testing.assert_frame_equal(replay("MSFT", start, end), recorded)
+    # A covered period is cut from the recording
+    part = replay("MSFT", datetime(2020, 1, 3), datetime(2020, 1, 8))
+    assert list(part["Stock Splits"]) == [0.0, 2.0]
+    with pytest.raises(ValueError):
+        replay("MSFT", datetime(2019, 12, 1), end)
+    with pytest.raises(ValueError):
+        replay("AAPL", start, end)
+
+def test_processor_replays_recording(tmp_path):
+    input_args = {
+        "ticker": "MSFT",
+        "b": "20100104",
+        "e": "20191231",
+        "initial_aum": 10000,
+        "plot": False,
+        "provider": "synthetic",
+        "record": str(tmp_path)
+    }
+    processor = Processor(input_args)
+    expected = processor.get_statistics(processor.load_data())
+    input_args = dict(input_args, provider = "yfinance", record = None,
+        replay = str(tmp_path))
+    processor = Processor(input_args)
+    assert processor.get_statistics(processor.load_data()) == expected
+    with pytest.raises(ValueError):
+        create_provider(dict(input_args, record = str(tmp_path)))
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from tools.fetcher import Fetcher
+from tools.processor import Processor
+from tools.running_state import RunningState
+from tools.statistics import compute_statistics
+
+# pylint: disable=W0212
+
+def mock_bars(start: datetime, end: datetime) -> pd.DataFrame:
+    """Deterministic bars with a quarterly dividend"""
+    dates = pd.bdate_range("1990/01/01", "2030/12/31")
+    rng = np.random.default_rng(4228)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(dates))))
+    dividends = np.where(np.arange(len(dates)) % 63 == 0, 0.5, 0.0)
+    df = pd.DataFrame({"Close": close, "Dividends": dividends}, index = dates)
+    return df[start : end - timedelta(days = 1)]
+
+def mock_download(self, start: datetime, end: datetime) -> pd.DataFrame:
+    return mock_bars(start, end)
+
+def full_statistics(start: str, end: str, initial_aum: float) -> dict:
+    df = mock_bars(datetime.strptime(start, "%Y%m%d"),
+        datetime.strptime(end, "%Y%m%d") + timedelta(days = 1))
+    prices = df["Close"] + df["Dividends"].cumsum()
+    return compute_statistics(df.index, prices.to_numpy(), initial_aum)
+
+def assert_statistics_close(actual: dict, expected: dict) -> None:
+    assert list(actual) == list(expected)
+    for key, value in expected.items():
+        if isinstance(value, str):
+            assert actual[key] == value
+        else:
+            assert np.isclose(actual[key], value, rtol = 1e-9, atol = 1e-12)
+
+def test_updates_match_full_recompute():
+    df = mock_bars(datetime(2000, 1, 3), datetime(2010, 1, 1))
+    state = RunningState.from_bars(datetime(2000, 1, 3), df.iloc[:10])
+    for date, row in df.iloc[10:].iterrows():
+        state.update(date, row["Close"], row["Dividends"])
+    prices = df["Close"] + df["Dividends"].cumsum()
+    assert_statistics_close(state.to_statistics(10000),
+        compute_statistics(df.index, prices.to_numpy(), 10000))
+
+def test_processor_updates_persisted_state(monkeypatch, tmp_path):
+    monkeypatch.setattr(Fetcher, "_download", mock_download)
+    args = {
+        "ticker": "MSFT",
+        "b": "19950103",
+        "e": "20200630",
+        "initial_aum": 10000,
+        "plot": False,
+        "state_dir": str(tmp_path)
+    }
+    processor = Processor(args)
+    assert_statistics_close(processor.update_statistics(),
+        full_statistics("19950103", "20200630", 10000))
+    assert processor.is_state_rebuilt
+
+    # A later run only processes the new bars
+    processor = Processor(dict(args, e = "20200731"))
+    assert_statistics_close(processor.update_statistics(),
+        full_statistics("19950103", "20200731", 10000))
+    assert not processor.is_state_rebuilt
+
+    # Another start date needs another history
+    processor = Processor(dict(args, b = "19960102", e = "20200731"))
+    processor.update_statistics()
+    assert processor.is_state_rebuilt
+
+def test_corrupted_state_is_rebuilt(monkeypatch, tmp_path):
+    monkeypatch.setattr(Fetcher, "_download", mock_download)
+    args = {
+        "ticker": "MSFT",
+        "b": "20100104",
+        "e": "20150630",
+        "initial_aum": 10000,
+        "plot": False,
+        "state_dir": str(tmp_path)
+    }
+    Processor(args).update_statistics()
+    state_file = tmp_path / "MSFT.json"
+    state_file.write_text(state_file.read_text().replace(
+        '"count": ', '"count": 1'))
+    assert RunningState.load(str(state_file)) is None
+
+    processor = Processor(dict(args, e = "20150731"))
+    assert_statistics_close(processor.update_statistics(),
+        full_statistics("20100104", "20150731", 10000))
+    assert processor.is_state_rebuilt
+
+def test_stale_state_is_rebuilt():
+    df = mock_bars(datetime(2010, 1, 4), datetime(2011, 1, 1))
+    state = RunningState.from_bars(datetime(2010, 1, 4), df.iloc[:100])
+    revised = df.iloc[99:].copy()
+    revised.iloc[0, revised.columns.get_loc("Close")] *= 1.01
+    assert not state.extend(revised)
+    assert state.extend(df.iloc[99:])
+    assert state.count == len(df)
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+from tools.processor import Processor
+from tools.statistics import compute_rolling_statistics, compute_statistics
+
+# pylint: disable=W0212
+
+def test_statistics_match_getters():
+    input_args = {
+        "ticker": "AAPL",
+        "b": "20100104",
+        "e": "20211231",
+        "initial_aum": 10000,
+        "plot": False
+    }
+    processor = Processor(input_args)
+    rng = np.random.default_rng(4228)
+    for _ in range(20):
+        n_days = rng.integers(3, 5000)
+        dates = pd.bdate_range("2000/01/03", periods = n_days)
+        stock_hist = pd.Series(
+            100 * np.exp(np.cumsum(rng.normal(0, 0.02, n_days))),
+            index = dates
+        )
+        n_stocks = 10000 / stock_hist.iloc[0]
+        statistics = compute_statistics(dates, stock_hist.to_numpy(), 10000)
+        aum_returns = processor._get_aum_returns(stock_hist, n_stocks)
+        expected = {
+            "Total stock return (With Dividends):": \
+                processor._get_stock_returns(stock_hist),
+            "Total returns of AUM:": aum_returns,
+            "Annualized AUM returns:": \
+                processor._get_annual_aum_returns(aum_returns, n_days),
+            "Final AUM:": processor._get_final_aum(aum_returns),
+            "Average AUM:": processor._get_average_aum(stock_hist, n_stocks),
+            "Maximum AUM:": processor._get_max_aum(stock_hist, n_stocks),
+            "Average daily returns:": \
+                processor._get_average_daily_return(stock_hist, n_stocks),
+            "Daily Standard Deviation:": \
+                processor._get_daily_aum_sd(stock_hist, n_stocks),
+            "Daily Sharpe Ratio:": \
+                processor._get_daily_sharpe_ratio(stock_hist, n_stocks),
+        }
+        for name, value in expected.items():
+            assert abs(statistics[name] - value) <= 10 ** -6 * abs(value) \
+                + 10 ** -9
+        assert statistics["Start Date:"] == "2000-01-03"
+        assert statistics["Calender Days:"] == (dates[-1] - dates[0]).days
+        assert abs(statistics["PnL of AUM:"] \
+            - (statistics["Final AUM:"] - 10000)) <= 10 ** -6
+
+def test_rolling_statistics_match_pandas():
+    rng = np.random.default_rng(4228)
+    n_days = 1000
+    dates = pd.bdate_range("2000/01/03", periods = n_days)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n_days)))
+    rolling = compute_rolling_statistics(dates, prices, 10000,
+        windows = (20, 250))
+
+    aum_hist = pd.Series(prices * 10000 / prices[0], index = dates)
+    returns = aum_hist.pct_change()
+    assert np.allclose(rolling["AUM"], aum_hist)
+    assert np.allclose(rolling["Running Max AUM"], aum_hist.cummax())
+    for window in (20, 250):
+        expected_sd = returns.rolling(window).std()
+        expected_mdd = aum_hist.rolling(window + 1).apply(
+            lambda x: (1 - x / np.maximum.accumulate(x)).max(), raw = True)
+        pd.testing.assert_series_equal(
+            rolling[f"{window}d Daily Standard Deviation"], expected_sd,
+            check_names = False)
+        pd.testing.assert_series_equal(
+            rolling[f"{window}d Daily Sharpe Ratio"],
+            (returns.rolling(window).mean() - 0.0001) / expected_sd,
+            check_names = False)
+        pd.testing.assert_series_equal(
+            rolling[f"{window}d Max Drawdown"], expected_mdd,
+            check_names = False)
+
+def test_rolling_window_longer_than_history():
+    dates = pd.bdate_range("2000/01/03", periods = 10)
+    rolling = compute_rolling_statistics(dates, np.linspace(1, 2, 10), 100,
+        windows = (20,))
+    assert rolling["20d Max Drawdown"].isna().all()
+    assert (rolling["Drawdown"] == 0).all()
@@ -0,0 +1,185 @@
+"""Module containing the BarStore class, which keeps long histories of
+(intraday) bars on disk as chunked columnar files, so that they can be
+streamed through memory maps instead of being loaded at once."""
+
+from datetime import datetime
+import json
+import os
+import shutil
+from typing import Iterator, Optional
+import numpy as np
+import pandas as pd
+
+class BarStore:
+    """Chunked, memory-mappable columnar storage of a ticker's bars
+
+    Bars are appended or prepended in chronological chunks, e.g. one
+    per download, so that the store always covers one contiguous period.
+    Each chunk is stored as one .npy file per column (dates as int64
+    nanoseconds), which np.load maps into memory without reading it.
+    The index.json file lists the chunks with their first and last
+    dates, and the period the stored bars cover.
+
+    Bars of every provider and dtype are kept in their own directory,
+    so that a run with another --provider or --float32 neither mixes
+    its bars with the stored ones nor deletes them.
+
+    Attributes:
+        path: directory holding the chunks of the ticker, interval,
+            dtype and source
+        source: name of the provider the bars are downloaded from
+        columns: columns stored for every bar
+        dtype: dtype the price columns are stored as
+        chunks: metadata of the stored chunks, in chronological order
+        start: first date covered by the stored bars, or None if empty
+        end: date the stored bars stop at (exclusive), or None if empty
+    """
+    COLUMNS = ("Close", "Dividends")
+
+    def __init__(self,
+        root_dir: str,
+        ticker: str,
+        interval: str,
+        dtype: type = np.float64,
+        source: str = "yfinance") -> None:
+        self.dtype = np.dtype(dtype)
+        self.source = source
+        self.path = os.path.join(root_dir, source,
+            f"{ticker.upper()}_{interval}_{self.dtype.name}")
+        self.columns = self.COLUMNS
+        self.chunks = []
+        self.start: Optional[datetime] = None
+        self.end: Optional[datetime] = None
+        os.makedirs(self.path, exist_ok = True)
+        self._load_index()
+
+    def _load_index(self) -> None:
+        """Reads the list of chunks, starting over if it is unreadable"""
+        try:
+            with open(os.path.join(self.path, "index.json"),
+                encoding = "utf-8") as f:
+                index = json.load(f)
+            self.chunks = index["chunks"]
+            self.start = datetime.fromisoformat(index["start"])
+            self.end = datetime.fromisoformat(index["end"])
+        except (OSError, ValueError, KeyError, TypeError):
+            self.clear()
+
+    def _save_index(self) -> None:
+        """Writes the list of chunks, replacing the old one atomically"""
+        index_path = os.path.join(self.path, "index.json")
+        with open(f"{index_path}.tmp", "w", encoding = "utf-8") as f:
+            json.dump({
+                "dtype": self.dtype.name,
+                "source": self.source,
+                "start": self.start.isoformat(),
+                "end": self.end.isoformat(),
+                "chunks": self.chunks
+            }, f, indent = 2)
+        os.replace(f"{index_path}.tmp", index_path)
+
+    def clear(self) -> None:
+        """Deletes every stored chunk"""
+        shutil.rmtree(self.path, ignore_errors = True)
+        os.makedirs(self.path, exist_ok = True)
+        self.chunks = []
+        self.start = None
+        self.end = None
+
+    @property
+    def n_rows(self) -> int:
+        """Number of stored bars"""
+        return sum(chunk["rows"] for chunk in self.chunks)
+
+    def append(self, df: pd.DataFrame, start: datetime, end: datetime) -> None:
+        """Appends the bars downloaded for the period [start, end)
+
+        Args:
+            df: bars of the period, with the stored columns
+            start: first date of the period, equal to end of the store
+                unless the store is empty
+            end: date the period stops at (exclusive)
+        """
+        if self.end is not None and start != self.end:
+            raise ValueError("Bars must be appended in chronological order.")
+        chunk = self._write_chunk(df)
+        if chunk is not None:
+            self.chunks.append(chunk)
+        self.start = start if self.start is None else self.start
+        self.end = end
+        self._save_index()
+
+    def prepend(self, df: pd.DataFrame, start: datetime, end: datetime) -> None:
+        """Prepends the bars downloaded for the period [start, end)
+
+        Args:
+            df: bars of the period, with the stored columns
+            start: first date of the period
+            end: date the period stops at (exclusive), equal to start of
+                the store unless the store is empty
+        """
+        if self.start is not None and end != self.start:
+            raise ValueError("Bars must be prepended in chronological order.")
+        chunk = self._write_chunk(df)
+        if chunk is not None:
+            self.chunks.insert(0, chunk)
+        self.start = start
+        self.end = end if self.end is None else self.end
+        self._save_index()
+
+    def _write_chunk(self, df: pd.DataFrame) -> Optional[dict]:
+        """Writes the columns of bars to a new chunk
+
+        Args:
+            df: bars with the stored columns
+
+        Returns:
+            Metadata of the chunk, or None if there are no bars
+        """
+        if len(df) == 0:
+            return None
+        # Chunks may be prepended, so names follow the highest one
+        number = max((int(chunk["name"].split("_")[1])
+            for chunk in self.chunks), default = -1) + 1
+        name = f"chunk_{number:06d}"
+        arrays = {"Date": df.index.values.astype("datetime64[ns]") \
+            .astype(np.int64)}
+        for column in self.columns:
+            arrays[column] = df[column].to_numpy(dtype = self.dtype)
+        for column, array in arrays.items():
+            np.save(os.path.join(self.path, f"{name}.{column}.npy"), array)
+        return {
+            "name": name,
+            "rows": len(df),
+            "first": int(arrays["Date"][0]),
+            "last": int(arrays["Date"][-1])
+        }
+
+    def iter_chunks(self,
+        start: datetime,
+        end: datetime) -> Iterator["tuple[np.ndarray, ...]"]:
+        """Streams the stored bars in [start, end), one chunk at a time
+
+        Args:
+            start: first date to read
+            end: date to stop reading at (exclusive)
+
+        Yields:
+            Tuple of the dates (datetime64[ns]) and stored columns of a
+            chunk, as read-only memory maps where no slicing is needed
+        """
+        start_ns = pd.Timestamp(start).value
+        end_ns = pd.Timestamp(end).value
+        for chunk in self.chunks:
+            if chunk["last"] < start_ns or chunk["first"] >= end_ns:
+                continue
+            arrays = [np.load(os.path.join(self.path,
+                f"{chunk['name']}.{column}.npy"), mmap_mode = "r")
+                for column in ("Date",) + self.columns]
+            dates = arrays[0]
+            first = np.searchsorted(dates, start_ns) \
+                if chunk["first"] < start_ns else 0
+            last = np.searchsorted(dates, end_ns) \
+                if chunk["last"] >= end_ns else len(dates)
+            yield (dates[first:last].view("datetime64[ns]"),
+                *(array[first:last] for array in arrays[1:]))
@@ -0,0 +1,137 @@
+"""Module containing the BatchProcessor class, which generates the
+statistics of many tickers concurrently and combines them in a table."""
+
+from concurrent.futures import ThreadPoolExecutor
+import time
+import numpy as np
+import pandas as pd
+from tools.async_fetcher import AsyncFetcher
+from tools.processor import Processor
+
+class BatchProcessor:
+    """Class that runs the Processor's statistics over a list of tickers
+
+    Tickers are fetched by a bounded pool of worker threads, since
+    fetching is dominated by waiting on the network. All downloads go
+    through one shared fetch layer, so the rate limit and retries apply
+    to the batch as a whole. A ticker that still fails is recorded in
+    the Error column of its row instead of aborting the whole batch.
+
+    Attributes:
+        args: CLI arguments shared by all tickers
+        tickers: tickers to process, in the order of the output rows
+        n_workers: maximum number of tickers fetched at once
+        fetch_layer: AsyncFetcher shared by the tickers of the batch
+        elapsed: seconds taken by the last run
+        memory_usage: bytes fetched and kept for each processed ticker
+    """
+
+    def __init__(self, args: dict, tickers: "list[str]",
+        n_workers: int = 8) -> None:
+        if len(tickers) == 0:
+            raise ValueError("No tickers given for batch mode.")
+        if n_workers < 1:
+            raise ValueError("Need at least 1 worker.")
+        self.args = args
+        self.tickers = tickers
+        self.n_workers = n_workers
+        self.fetch_layer = AsyncFetcher.from_args(args)
+        self.elapsed = None
+        self.memory_usage = []
+
+    @staticmethod
+    def read_tickers(filename: str) -> "list[str]":
+        """Reads tickers from a file, separated by newlines or commas
+
+        Blank lines and lines starting with # are ignored.
+
+        Args:
+            filename: path of the file of tickers
+
+        Returns:
+            List of tickers in the order they appear in the file
+        """
+        tickers = []
+        with open(filename, encoding = "utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line == "" or line.startswith("#"):
+                    continue
+                tickers += [s.strip() for s in line.split(",") if s.strip()]
+        return tickers
+
+    def _process_ticker(self, ticker: str) -> dict:
+        """Generates the statistics row of a single ticker
+
+        Args:
+            ticker: ticker to process
+
+        Returns:
+            Dictionary of the ticker's statistics, or of its error
+        """
+        try:
+            processor = Processor(dict(self.args, ticker = ticker,
+                plot = False), self.fetch_layer)
+            if processor.state_dir is not None:
+                statistics = processor.update_statistics()
+            elif processor.bars_per_day > 1:
+                statistics = processor.stream_statistics()
+            else:
+                statistics = processor.get_statistics(processor.load_data())
+                self.memory_usage.append(processor.memory_usage)
+            return dict({"Ticker": ticker, "Error": None}, **statistics)
+        # One bad ticker should not abort the rest of the batch
+        except Exception as err: # pylint: disable=broad-except
+            return {"Ticker": ticker, "Error": f"{type(err).__name__}: {err}"}
+
+    def run(self) -> pd.DataFrame:
+        """Processes every ticker with the worker pool
+
+        Returns:
+            Dataframe with a row of statistics per ticker
+        """
+        start = time.perf_counter()
+        # The fetch layer's event loop is stopped once all are processed
+        with self.fetch_layer, \
+            ThreadPoolExecutor(max_workers = self.n_workers) as pool:
+            rows = list(pool.map(self._process_ticker, self.tickers))
+        self.elapsed = time.perf_counter() - start
+        table = pd.DataFrame(rows).set_index("Ticker")
+        # Statistic names end with ":" for printing, not as column names
+        table.columns = [col.strip().rstrip(":") for col in table.columns]
+        return table
+
+    def save(self, table: pd.DataFrame, filename: str) -> None:
+        """Saves the table as Parquet if the filename says so, else CSV
+
+        Args:
+            table: Dataframe returned by run
+            filename: path of the output file
+        """
+        if filename.endswith(".parquet"):
+            table.to_parquet(filename)
+        else:
+            table.to_csv(filename)
+
+    def print_summary(self, table: pd.DataFrame) -> None:
+        """Prints the failed tickers and the throughput of the batch
+
+        Args:
+            table: Dataframe returned by run
+        """
+        line_separator = "---------------------------------------------------"
+        failed = table[table["Error"].notna()]
+        print(line_separator)
+        for ticker, error in failed["Error"].items():
+            print(f"Failed to process {ticker}: {error}")
+        n_tickers = len(table)
+        print(f"Processed {n_tickers} tickers ({len(failed)} failed) "
+            f"in {self.elapsed:.2f} seconds")
+        print(f"Throughput: {n_tickers / self.elapsed:.2f} tickers/sec")
+        print(f"Downloads: {self.fetch_layer.stats}")
+        if len(self.memory_usage) > 0:
+            fetched, kept = (np.mean([usage[key] for usage in
+                self.memory_usage]) / 1024 for key in ("fetched", "kept"))
+            print(f"Memory per ticker: {fetched:.1f} KiB fetched, "
+                f"{kept:.1f} KiB kept")
+        print(line_separator)
@@ -2,8 +2,9 @@
  data of given ticker using the yfinance package."""
 
 from datetime import datetime, timedelta
-import yfinance as yf
 import pandas as pd
+from tools.async_fetcher import AsyncFetcher
+from tools.price_cache import PriceCache
 
 class Fetcher:
     """Class that fetches data about a given ticker
@@ -16,12 +17,47 @@ class Fetcher:
         ticker: String containing the inputted ticker name
         start_date: Beginning day of retrieved financial data
         end_date: Final day of retrieved financial data
+        cache: Optional on-disk cache of previously fetched bars
+        fetch_layer: AsyncFetcher that rate limits and retries downloads.
+            It can be shared by several Fetchers to limit them together.
     """
-    def __init__(self, args: dict) -> None:
+    def __init__(self, args: dict, fetch_layer: AsyncFetcher = None) -> None:
         fetcher_args = self._check_args_validity(args)
         self._ticker = fetcher_args["ticker"]
         self._start_date = fetcher_args["start_date"]
         self._end_date = fetcher_args["end_date"]
+        self._owns_fetch_layer = fetch_layer is None
+        self._fetch_layer = fetch_layer if fetch_layer is not None \
+            else AsyncFetcher.from_args(args)
+        self._cache = self._setup_cache(args)
+
+    def close(self) -> None:
+        """Stops the fetch layer, unless it is shared with other Fetchers"""
+        if self._owns_fetch_layer:
+            self._fetch_layer.close()
+
+    def _setup_cache(self, args: dict) -> PriceCache:
+        """Sets up the price cache if a cache directory is given
+
+        Offline mode can only serve cached data, so it uses the
+        default cache directory if none is given.
+
+        Args:
+            args: dictionary containing the input CLI Arguments
+
+        Returns:
+            PriceCache, or None if bars should not be cached
+        """
+        offline = args.get("offline", False)
+        cache_dir = args.get("cache_dir")
+        if cache_dir is None and not offline:
+            return None
+        return PriceCache(
+            cache_dir if cache_dir is not None else "./cache",
+            ttl = timedelta(hours = args.get("cache_ttl", 12)),
+            offline = offline,
+            source = self._fetch_layer.source
+        )
 
     def _check_args_validity(self, args: dict) -> dict:
         """Checks for the validity of the CLI arguments
@@ -64,20 +100,19 @@ class Fetcher:
 
 
     def fetch_data(self) -> pd.DataFrame:
-        """Function that fetches data from yfinance.
+        """Function that fetches data from the selected provider.
 
         After checking, it checks for the data validity before proceeding.
 
+        If a cache is set up, the data is served from the cache and
+        only the date ranges it does not cover are downloaded.
+
         Returns:
             Dataframe with the columns representing financial data
             of the given ticker, arranged from earliest to latest date.
         """
-        tracker = yf.Ticker(self._ticker)
         try:
-            data: pd.DataFrame = tracker.history(
-                start = self._start_date,
-                end = self._end_date
-            )[self._start_date : self._end_date]
+            data = self._fetch_bars(self._start_date, self._end_date)
             if len(data) == 0:
                 raise Exception("No data available for given ticker.")
             if len(data) == 1:
@@ -92,3 +127,34 @@ class Fetcher:
                 ) from err
         except BaseException as err:
             raise err
+
+    def _fetch_bars(self, start: datetime, end: datetime) -> pd.DataFrame:
+        """Gets the bars of the ticker in [start, end), from the cache if any
+
+        Args:
+            start: first date to get
+            end: date to stop at (exclusive)
+
+        Returns:
+            Dataframe of the bars in the period, possibly empty
+        """
+        if self._cache is None:
+            data = self._download(start, end)
+        else:
+            data = self._cache.get(self._ticker, start, end, self._download)
+        return data[start : end]
+
+    def _download(self, start: datetime, end: datetime) -> pd.DataFrame:
+        """Downloads the bars of the ticker in [start, end) from the provider
+
+        The download goes through the fetch layer, so it is retried
+        on transient failures and counts towards the rate limit.
+
+        Args:
+            start: first date to download
+            end: date to stop downloading at (exclusive)
+
+        Returns:
+            Dataframe of the downloaded bars, possibly empty
+        """
+        return self._fetch_layer.fetch_sync(self._ticker, start, end)
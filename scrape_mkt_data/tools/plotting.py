@@ -0,0 +1,178 @@
+"""Helper functions for plotting, so that matplotlib is only imported
+when a graph is actually requested.
+
+Huge series are decimated before being drawn: time series keep their
+visual shape with the largest-triangle-three-buckets (LTTB) method,
+and scatter plots draw one marker per occupied cell of a 2D grid.
+Figures can also be saved by a background worker, which lets the
+caller carry on while the image is being rendered.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+import os
+import numpy as np
+import pandas as pd
+
+# Beyond a few thousand points, a plot no longer shows more detail
+MAX_PLOT_POINTS = 5000
+
+# Single worker, so that figures are rendered one at a time. Pending
+# saves are completed before the interpreter exits.
+_SAVE_WORKER = ThreadPoolExecutor(max_workers = 1)
+
+def load_pyplot():
+    """Imports matplotlib.pyplot with a non-interactive backend
+
+    Unless a backend is chosen through the MPLBACKEND environment
+    variable, the Agg backend is used so that batch jobs never open
+    a window or block on plt.show().
+
+    Returns:
+        The matplotlib.pyplot module
+    """
+    # pylint: disable=import-outside-toplevel
+    import matplotlib
+    if "MPLBACKEND" not in os.environ:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+def show_plot(plt) -> None:
+    """Shows the current figure, only if the backend is interactive
+
+    Args:
+        plt: matplotlib.pyplot module returned by load_pyplot
+    """
+    if plt.get_backend().lower() != "agg":
+        plt.show()
+
+def save_figure(plt, fig, path: str,
+    background: bool = False, **kwargs) -> Future:
+    """Saves, shows (if interactive) and closes a figure
+
+    Args:
+        plt: matplotlib.pyplot module returned by load_pyplot
+        fig: figure to save
+        path: file path the figure is saved to
+        background: if True, the figure is saved by a background worker
+            and the function returns immediately. Only applies to
+            non-interactive backends, since shown figures need the
+            main thread.
+        kwargs: extra keyword arguments for fig.savefig
+
+    Returns:
+        Future that completes once the figure has been saved
+    """
+    if background and plt.get_backend().lower() == "agg":
+        # pyplot is not thread-safe, so the figure is closed here and
+        # the worker only renders it through its own Agg canvas
+        plt.close(fig)
+        return _SAVE_WORKER.submit(fig.savefig, path, **kwargs)
+
+    fig.savefig(path, **kwargs)
+    show_plot(plt)
+    plt.close(fig)
+    done = Future()
+    done.set_result(None)
+    return done
+
+def lttb_indexes(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Picks the points of a series to keep with largest-triangle-three-buckets
+
+    The first and last points are always kept. Every other point falls
+    in one of n_out - 2 buckets, and from each bucket the point forming
+    the largest triangle with the previously kept point and the average
+    of the next bucket is kept, which preserves peaks and troughs.
+
+    Args:
+        x: increasing x values (e.g. timestamps as numbers)
+        y: y values of the series
+        n_out: number of points to keep
+
+    Returns:
+        Sorted array of the indexes of the points to keep
+    """
+    n_points = len(y)
+    if n_out >= n_points or n_out < 3:
+        return np.arange(n_points)
+
+    x = np.asarray(x, dtype = np.float64)
+    y = np.asarray(y, dtype = np.float64)
+    edges = np.linspace(1, n_points - 1, n_out - 1).astype(np.int64)
+    kept = np.empty(n_out, dtype = np.int64)
+    kept[0] = 0
+    kept[-1] = n_points - 1
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket, or the last point for the last one
+        if i + 2 < len(edges):
+            avg_x = x[end:edges[i + 2]].mean()
+            avg_y = y[end:edges[i + 2]].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        # Twice the triangle areas, sign does not matter
+        areas = np.abs(
+            (x[prev] - avg_x) * (y[start:end] - y[prev])
+            - (x[prev] - x[start:end]) * (avg_y - y[prev])
+        )
+        prev = start + int(np.argmax(areas))
+        kept[i + 1] = prev
+    return kept
+
+def decimate_series(series: pd.Series,
+    max_points: int = MAX_PLOT_POINTS) -> pd.Series:
+    """Downsamples a (time) series for display with LTTB
+
+    Args:
+        series: series to plot, indexed by dates or numbers
+        max_points: maximum number of points to draw
+
+    Returns:
+        The same series if it is small enough, else its LTTB subset
+    """
+    if len(series) <= max_points:
+        return series
+    index = series.index
+    x = index.asi8 if isinstance(index, pd.DatetimeIndex) \
+        else np.arange(len(series))
+    kept = lttb_indexes(x, series.to_numpy(), max_points)
+    return series.iloc[kept]
+
+def bin_scatter(x: "list[float]", y: "list[float]",
+    max_points: int = MAX_PLOT_POINTS) -> "tuple[np.ndarray, np.ndarray]":
+    """Downsamples scatter data by binning points on a 2D grid
+
+    The grid has about max_points cells, and each occupied cell is
+    drawn as one point at the mean of the points it contains, so the
+    shape of the point cloud is kept while dense areas are thinned.
+
+    Args:
+        x: x values of the scatter plot
+        y: y values of the scatter plot
+        max_points: maximum number of points to draw
+
+    Returns:
+        Tuple of x and y values to draw, without non-finite pairs
+    """
+    x = np.asarray(x, dtype = np.float64)
+    y = np.asarray(y, dtype = np.float64)
+    keep = np.isfinite(x) & np.isfinite(y)
+    x, y = x[keep], y[keep]
+    if len(x) <= max_points:
+        return x, y
+
+    n_bins = max(int(np.sqrt(max_points)), 1)
+    cells = np.zeros(len(x), dtype = np.int64)
+    for values in (x, y):
+        span = np.ptp(values)
+        scaled = (values - values.min()) / (span if span > 0 else 1)
+        cell = np.minimum((scaled * n_bins).astype(np.int64), n_bins - 1)
+        cells = cells * n_bins + cell
+
+    counts = np.bincount(cells, minlength = n_bins ** 2)
+    occupied = counts > 0
+    x_mean = np.bincount(cells, weights = x, minlength = n_bins ** 2)
+    y_mean = np.bincount(cells, weights = y, minlength = n_bins ** 2)
+    return x_mean[occupied] / counts[occupied], \
+        y_mean[occupied] / counts[occupied]
@@ -0,0 +1,197 @@
+"""Module containing the PriceCache class, which stores fetched
+price bars on disk so that only missing date ranges are requested
+from the data source on later runs."""
+
+from datetime import datetime, timedelta
+import json
+import os
+from typing import Callable, Optional
+import numpy as np
+import pandas as pd
+
+class PriceCache:
+    """Columnar on-disk cache of price bars, keyed by ticker.
+
+    Each ticker is stored as two files in the cache directory:
+    <TICKER>.npz holds one array per column (dates as int64 UTC
+    nanoseconds), and <TICKER>.json holds the fetch metadata: the date
+    range the bars cover, when they were fetched and from which source.
+
+    A request is served from the cache, and only the leading and
+    trailing date ranges that are not covered yet are downloaded.
+    Bars fetched close to the fetch time may still be revised (e.g.
+    today's bar while the market is open), so once the cache is older
+    than the TTL, the last REFRESH_DAYS of bars are downloaded again.
+
+    Attributes:
+        cache_dir: directory where the cache files are kept
+        ttl: age after which the most recent bars are refreshed
+        offline: if True, never download and only serve cached bars
+        source: name of the provider bars are downloaded from
+        n_downloads: number of downloads made by this cache
+        REFRESH_DAYS: calendar days of recent bars considered provisional
+    """
+    REFRESH_DAYS = 5
+
+    def __init__(self,
+        cache_dir: str,
+        ttl: timedelta = timedelta(hours = 12),
+        offline: bool = False,
+        source: str = "yfinance") -> None:
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.offline = offline
+        self.source = source
+        self.n_downloads = 0
+        os.makedirs(cache_dir, exist_ok = True)
+
+    def _paths(self, ticker: str) -> "tuple[str, str]":
+        """Returns the bars and metadata file paths of a ticker"""
+        base = os.path.join(self.cache_dir, ticker.upper())
+        return f"{base}.npz", f"{base}.json"
+
+    def load(self, ticker: str) -> "tuple[Optional[pd.DataFrame], dict]":
+        """Loads the cached bars and metadata of a ticker
+
+        Args:
+            ticker: ticker to load
+
+        Returns:
+            Tuple of the cached bars and metadata, or (None, {}) if the
+            ticker is not cached or its files cannot be read
+        """
+        bars_path, meta_path = self._paths(ticker)
+        try:
+            with open(meta_path, encoding = "utf-8") as f:
+                meta = json.load(f)
+            with np.load(bars_path, allow_pickle = False) as arrays:
+                index = pd.to_datetime(arrays["Date"], utc = True)
+                columns = {col: arrays[col] for col in meta["columns"]}
+        except (OSError, ValueError, KeyError):
+            return None, {}
+        if meta["tz"] is not None:
+            index = index.tz_convert(meta["tz"])
+        else:
+            index = index.tz_localize(None)
+        df = pd.DataFrame(columns, index = pd.DatetimeIndex(index,
+            name = "Date"))
+        return df, meta
+
+    def save(self, ticker: str, df: pd.DataFrame, meta: dict) -> None:
+        """Writes the bars and metadata of a ticker, replacing old ones
+
+        Files are written to a temporary path first and then renamed,
+        so that an interrupted run never leaves a half-written cache.
+
+        Args:
+            ticker: ticker to save
+            df: bars, indexed by date
+            meta: fetch metadata, see class docstring
+        """
+        bars_path, meta_path = self._paths(ticker)
+        index = df.index
+        meta = dict(meta,
+            columns = list(df.columns),
+            tz = str(index.tz) if index.tz is not None else None)
+        arrays = {col: df[col].to_numpy() for col in df.columns}
+        # values of a tz-aware index are already in UTC
+        arrays["Date"] = index.values.astype("datetime64[ns]") \
+            .astype(np.int64)
+        with open(f"{bars_path}.tmp", "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(f"{bars_path}.tmp", bars_path)
+        with open(f"{meta_path}.tmp", "w", encoding = "utf-8") as f:
+            json.dump(meta, f, indent = 2)
+        os.replace(f"{meta_path}.tmp", meta_path)
+
+    def get(self,
+        ticker: str,
+        start: datetime,
+        end: datetime,
+        download: Callable[[datetime, datetime], pd.DataFrame]
+        ) -> pd.DataFrame:
+        """Gets bars of a ticker in [start, end), downloading only gaps
+
+        Args:
+            ticker: ticker to get
+            start: first date to get
+            end: date to stop at (exclusive)
+            download: function downloading the bars in [start, end)
+
+        Returns:
+            Dataframe of all bars of the ticker that the cache holds
+            after filling the gaps, arranged from earliest to latest.
+            It covers at least [start, end).
+        """
+        start = pd.Timestamp(start).floor("D").to_pydatetime()
+        end = pd.Timestamp(end).ceil("D").to_pydatetime()
+        now = datetime.now()
+        cached, meta = self.load(ticker)
+        # Bars of another source cannot be mixed with this source's bars
+        if cached is not None and meta.get("source") != self.source:
+            cached = None
+        if cached is None:
+            if self.offline:
+                raise ValueError(f"{ticker} is not cached, cannot fetch "
+                    "data in offline mode.")
+            return self._store(ticker, self._download(download, start, end),
+                start, end, now)
+
+        cov_start = datetime.fromisoformat(meta["start"])
+        cov_end = datetime.fromisoformat(meta["end"])
+        fetched_at = datetime.fromisoformat(meta["fetched_at"])
+        missing = []
+        if start < cov_start:
+            missing.append((start, cov_start))
+        # Recent bars of a stale cache are downloaded again
+        provisional = fetched_at - timedelta(days = self.REFRESH_DAYS)
+        if not self.offline and now - fetched_at > self.ttl \
+            and end > provisional:
+            missing.append((min(provisional, cov_end), max(end, cov_end)))
+        elif end > cov_end:
+            missing.append((cov_end, end))
+
+        if not missing:
+            return cached
+        if self.offline:
+            raise ValueError(f"Cached data of {ticker} only covers "
+                f"{cov_start:%Y-%m-%d} to {cov_end:%Y-%m-%d}, cannot fetch "
+                "the rest in offline mode.")
+
+        parts = [cached]
+        is_refreshed = False
+        for gap_start, gap_end in missing:
+            parts.append(self._download(download, gap_start, gap_end))
+            is_refreshed = is_refreshed or gap_end >= cov_end
+        merged = pd.concat([part for part in parts if len(part) > 0] \
+            or [cached])
+        # Newly downloaded bars replace the cached ones of the same date
+        merged = merged[~merged.index.duplicated(keep = "last")].sort_index()
+        # Only a download of the latest bars makes the cache fresh again
+        return self._store(ticker, merged,
+            min(start, cov_start), max(end, cov_end),
+            now if is_refreshed else fetched_at)
+
+    def _download(self,
+        download: Callable[[datetime, datetime], pd.DataFrame],
+        start: datetime,
+        end: datetime) -> pd.DataFrame:
+        """Downloads the bars in [start, end), counting the download"""
+        self.n_downloads += 1
+        return download(start, end)
+
+    def _store(self,
+        ticker: str,
+        df: pd.DataFrame,
+        start: datetime,
+        end: datetime,
+        fetched_at: datetime) -> pd.DataFrame:
+        """Saves the bars with their metadata and returns them"""
+        self.save(ticker, df, {
+            "ticker": ticker,
+            "source": self.source,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "fetched_at": fetched_at.isoformat()
+        })
+        return df
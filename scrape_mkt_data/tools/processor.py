@@ -1,8 +1,17 @@
 """Sub-module storing the Processor Class that Does Data Crunching"""
 
+from datetime import datetime, timedelta
+import os
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+from tools.async_fetcher import AsyncFetcher
+from tools.bar_store import BarStore
 from tools.fetcher import Fetcher
+from tools.providers import BARS_PER_DAY, MAX_REQUEST_DAYS
+from tools.running_state import RunningState
+from tools.statistics import ROLLING_WINDOWS, compute_rolling_statistics, \
+    compute_statistics
+from tools.plotting import decimate_series, load_pyplot, save_figure
 
 class Processor(Fetcher):
     """Class that post-processes data from the Fetcher class.
@@ -16,86 +25,407 @@ class Processor(Fetcher):
     Attributes:
         initial_aum: Initial Assets Under Management
         is_plot: Boolean of whether graph should be generated
+        plot_async: Boolean of whether graph is saved in the background
+        rolling_windows: Rolling window lengths, or None to skip them
+        rolling_statistics: Dataframe of the last rolling statistics
+        state_dir: Optional directory of persisted running states
+        is_state_rebuilt: Whether the last update had to rebuild the state
+        price_dtype: dtype the adjusted close is stored as
+        memory_usage: bytes of the last data fetched, and of what was kept
+        interval: length of the bars, one of BARS_PER_DAY
+        bars_per_day: number of bars per trading day of the interval
+        bar_dir: directory of the stored intraday bars
         TRADING_DAYS_PER_YEAR: Assumed to be 250
     """
 
-    def __init__(self, args: dict):
-        super().__init__(args)
+    def __init__(self, args: dict, fetch_layer: AsyncFetcher = None):
+        super().__init__(args, fetch_layer)
         # AUM must be positive to be relevant
         if args["initial_aum"] <= 0:
             raise ValueError("Initial AUM should be Positive")
         self._initial_aum = args["initial_aum"]
         self._is_plot = args["plot"]
+        self._plot_async = args.get("plot_async", False)
+        # --rolling without window lengths uses the default windows
+        rolling = args.get("rolling")
+        self._rolling_windows = None if rolling is None \
+            else tuple(rolling) or ROLLING_WINDOWS
+        self.rolling_statistics: pd.DataFrame = None
+        self.state_dir = args.get("state_dir")
+        self.is_state_rebuilt = None
+        self.price_dtype = np.float32 if args.get("float32", False) \
+            else np.float64
+        self.memory_usage: dict = None
+        self.interval = args.get("interval") or "1d"
+        self.bars_per_day = BARS_PER_DAY[self.interval]
+        self.bar_dir = args.get("bar_dir") or "./bars"
+        # Rolling windows and running states are counted in daily bars
+        if self.bars_per_day > 1 and (self._rolling_windows is not None
+            or self.state_dir is not None):
+            raise ValueError("--rolling and --state_dir need daily bars.")
         # Assumption given in the question
         self.TRADING_DAYS_PER_YEAR = 250
         self.DAILY_RISK_FREE = 0.0001
 
-    def generate_statistics(self) -> None:
+    def generate_statistics(self) -> dict:
         """Overall Function that calculates the relevant statistics
 
         Returns:
-            While it is a void function, it generates important statistics
-            that is subsequently printed by the print_statistics function.
-            Furthermore, it also handles whether the graph should be
-            generated based on the boolean is_plot attribute
+            Dictionary of the statistics, which is also printed by the
+            print_statistics function. Furthermore, it also handles
+            whether the graph should be generated based on the boolean
+            is_plot attribute
         """
-        # Stocks adjusted for dividend added for easier processing
-        df = self._add_dividend_to_stock(self.fetch_data())
-
-        # Retrieve number of days + start, end dates
-        start_date = self._get_start_date_adjusted(df)
-        end_date = self._get_end_date_adjusted(df)
-        trading_days = self._get_trading_days(df)
-        calender_days = pd.to_datetime(end_date) \
-            - pd.to_datetime(start_date)
-
-        n_calender_days = calender_days.days
-        # Retrieve the stock returns adjusted for dividends
+        # Intraday histories may not fit in memory, so they are streamed
+        if self.bars_per_day > 1:
+            statistics = self.stream_statistics()
+            self.print_statistics(statistics)
+            return statistics
+
+        # Graphs and rolling statistics need the whole history, but
+        # the other statistics can be updated from the persisted state
+        if self.state_dir is not None and not self._is_plot \
+            and self._rolling_windows is None:
+            statistics = self.update_statistics()
+            self.print_statistics(statistics)
+            return statistics
+
+        df = self.load_data()
+        statistics = self.get_statistics(df)
         stock_hist = df["Stocks_Close_Adjusted"]
-        n_stocks_bought = float(self._initial_aum / stock_hist[0])
+        n_stocks_bought = float(self._initial_aum / stock_hist.iloc[0])
+        if self._rolling_windows is not None:
+            self.rolling_statistics = self.get_rolling_statistics(df)
 
-        # Rest of the statistics retrieved with atomic functions
-        # So that each function can be easily edited
-        adjusted_stock_returns = self._get_stock_returns(stock_hist)
-        total_aum_returns = self._get_aum_returns(
-            stock_hist, n_stocks_bought
-        )
-        annual_aum_returns = self._get_annual_aum_returns(
-            total_aum_returns, trading_days
-        )
-        initial_aum = self._initial_aum
-        final_aum = self._get_final_aum(total_aum_returns)
-        average_aum = self._get_average_aum(stock_hist, n_stocks_bought)
-        max_aum = self._get_max_aum(stock_hist, n_stocks_bought)
-        pnl_aum = self._get_aum_pnl(initial_aum, final_aum)
-        avg_daily_return_aum = \
-            self._get_average_daily_return(stock_hist, n_stocks_bought)
-        avg_daily_aum_sd = self._get_daily_aum_sd(
-            stock_hist, n_stocks_bought
+        # Plot first, so that a background save overlaps the printing
+        self._plot_graph(stock_hist, n_stocks_bought, self.rolling_statistics)
+        self.print_statistics(statistics)
+        if self.rolling_statistics is not None:
+            self.print_rolling_statistics(self.rolling_statistics)
+        self.print_memory_usage()
+        return statistics
+
+    def load_data(self) -> pd.DataFrame:
+        """Fetches the data, with stocks adjusted for dividends added
+
+        Returns:
+            Dataframe of retrieved financial data, which includes the
+            Stocks_Close_Adjusted column
+        """
+        df = self.fetch_data()
+        fetched_bytes = df.memory_usage(deep = True).sum()
+        df = self._add_dividend_to_stock(df)
+        self.memory_usage = {
+            "fetched": int(fetched_bytes),
+            "kept": int(df.memory_usage(deep = True).sum())
+        }
+        return df
+
+    def get_statistics(self, df: pd.DataFrame) -> dict:
+        """Calculates the statistics of the data without printing them
+
+        Args:
+            df: Dataframe returned by load_data
+
+        Returns:
+            Dictionary of statistic names mapped to their values
+        """
+        # All statistics come from arrays shared by the stats engine
+        return compute_statistics(
+            df.index,
+            df["Stocks_Close_Adjusted"].to_numpy(),
+            self._initial_aum,
+            self.TRADING_DAYS_PER_YEAR,
+            self.DAILY_RISK_FREE
         )
-        daily_sharpe_ratio = self._get_daily_sharpe_ratio(
-            stock_hist, n_stocks_bought
+
+    def update_statistics(self) -> dict:
+        """Calculates the statistics by updating the persisted state
+
+        Only the bars since the last run are fetched, and each of them
+        updates the state in O(1). The state is rebuilt from the whole
+        history instead if it is missing or corrupted, was built from
+        another start date, covers more than the requested period, or
+        is stale because its last bar has since been revised.
+
+        Returns:
+            Dictionary of statistic names mapped to their values, the
+            same as get_statistics over the whole history
+        """
+        path = os.path.join(self.state_dir, f"{self._ticker.upper()}.json")
+        state = RunningState.load(path)
+        self.is_state_rebuilt = not self._is_state_usable(state) \
+            or not state.extend(self._fetch_bars(
+                pd.Timestamp(state.last_date).tz_localize(None) \
+                    .floor("D").to_pydatetime(),
+                self._end_date))
+        if self.is_state_rebuilt:
+            state = RunningState.from_bars(self._start_date,
+                self.fetch_data())
+        state.save(path)
+        return state.to_statistics(self._initial_aum,
+            self.TRADING_DAYS_PER_YEAR, self.DAILY_RISK_FREE)
+
+    def stream_statistics(self) -> dict:
+        """Calculates the statistics of intraday bars by streaming them
+
+        The bars are kept in a BarStore under bar_dir, to which only the
+        months it does not cover yet are downloaded. The stored chunks
+        are then streamed through memory maps into a RunningState, so
+        the whole history is never loaded at once. Bars of the current
+        day are not stored, since they are still being revised.
+
+        Returns:
+            Dictionary of statistic names mapped to their values, with
+            daily figures scaled from the returns of the bars
+        """
+        store = BarStore(self.bar_dir, self._ticker, self.interval,
+            self.price_dtype, self._fetch_layer.source)
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
+        stored_end = max(min(self._end_date, today), self._start_date)
+        self._fill_bar_store(store, stored_end)
+
+        def chunks():
+            yield from store.iter_chunks(self._start_date, stored_end)
+            if stored_end < self._end_date:
+                live = self._drop_timezone(
+                    self._download(stored_end, self._end_date))
+                if len(live) > 0:
+                    yield self._to_arrays(live[stored_end : self._end_date])
+
+        daily_closes = []
+        state = RunningState.from_chunks(self._start_date,
+            self._collect_daily_closes(chunks(), daily_closes))
+        if state is None:
+            raise ValueError("No data available for given ticker.")
+        if state.count == 1:
+            raise ValueError("Only 1 data point seen. Check time period.")
+        if self._is_plot:
+            stock_hist = pd.concat(daily_closes)
+            stock_hist = stock_hist[~stock_hist.index.duplicated(
+                keep = "last")]
+            self._plot_graph(stock_hist, self._initial_aum / state.first_price)
+        return state.to_statistics(self._initial_aum,
+            self.TRADING_DAYS_PER_YEAR, self.DAILY_RISK_FREE,
+            self.bars_per_day)
+
+    def _fill_bar_store(self, store: BarStore, end: datetime) -> None:
+        """Downloads the bars missing from the store until end
+
+        The store covers one contiguous period, which is extended
+        backwards to the requested start and forwards to end, so bars
+        stored before are never deleted. Providers only serve recent
+        intraday bars, so an empty store is filled backwards from end.
+        Downloads go through the fetch layer, see _fill_periods.
+
+        Args:
+            store: BarStore of the ticker and interval
+            end: date the stored bars should reach (exclusive)
+        """
+        start = self._start_date
+        if store.start is None:
+            self._fill_periods(store, start, end, is_backwards = True)
+            return
+        if start < store.start:
+            self._fill_periods(store, start, store.start, is_backwards = True)
+        if store.end < end:
+            self._fill_periods(store, store.end, end, is_backwards = False)
+
+    def _fill_periods(self,
+        store: BarStore,
+        start: datetime,
+        end: datetime,
+        is_backwards: bool) -> None:
+        """Downloads the months of [start, end) into the store
+
+        Each month is stored as one chunk, but downloaded in windows of
+        at most MAX_REQUEST_DAYS, which the provider serves in one
+        request. The windows are downloaded concurrently.
+
+        An empty download of a window with business days is not stored,
+        since the provider may simply not serve it (yet), and the store
+        must stay contiguous. Filling stops there, after storing the
+        windows of the month downloaded before it, so the period is
+        downloaded again by the next run.
+
+        Args:
+            store: BarStore of the ticker and interval
+            start: first date to download
+            end: date to stop downloading at (exclusive)
+            is_backwards: whether months are prepended from end, rather
+                than appended from start
+        """
+        windows = self._download_windows(start, end)
+        if is_backwards:
+            windows.reverse()
+        # Downloaded windows of the month being filled, in filling order
+        month_windows = []
+        group_size = self._fetch_layer.max_concurrency
+        for i in range(0, len(windows), group_size):
+            group = windows[i : i + group_size]
+            results = self._fetch_layer.fetch_many(
+                [(self._ticker, first, last) for first, last, _ in group])
+            for (first, last, month), result in zip(group, results):
+                if month_windows and month_windows[-1][2] != month:
+                    self._store_windows(store, month_windows, is_backwards)
+                if isinstance(result, BaseException):
+                    self._store_windows(store, month_windows, is_backwards)
+                    raise result
+                bars = self._drop_timezone(result)
+                bars = bars[first : last] if len(bars) > 0 else bars
+                if len(bars) == 0 and \
+                    np.busday_count(first.date(), last.date()) > 0:
+                    self._store_windows(store, month_windows, is_backwards)
+                    print(f"No {self.interval} bars of {self._ticker} from "
+                        f"{first:%Y-%m-%d} to {last:%Y-%m-%d}, which are "
+                        "left out of the stored bars")
+                    return
+                month_windows.append((first, last, month, bars))
+        self._store_windows(store, month_windows, is_backwards)
+
+    def _download_windows(self,
+        start: datetime,
+        end: datetime) -> "list[tuple[datetime, datetime, datetime]]":
+        """Splits [start, end) into the windows downloaded at once
+
+        Args:
+            start: first date to download
+            end: date to stop downloading at (exclusive)
+
+        Returns:
+            List of (first, last, month) of every window, in order, where
+            month is the start of the month the window is stored in
+        """
+        month_starts = pd.date_range(start, end, freq = "MS")
+        edges = [start] + [date.to_pydatetime() for date in month_starts
+            if start < date < end] + [end]
+        max_days = MAX_REQUEST_DAYS[self.interval]
+        windows = []
+        for month, month_end in zip(edges[:-1], edges[1:]):
+            first = month
+            while max_days is not None \
+                and first + timedelta(days = max_days) < month_end:
+                windows.append((first, first + timedelta(days = max_days),
+                    month))
+                first += timedelta(days = max_days)
+            windows.append((first, month_end, month))
+        return windows
+
+    def _store_windows(self,
+        store: BarStore,
+        month_windows: list,
+        is_backwards: bool) -> None:
+        """Stores the downloaded windows of a month as one chunk
+
+        Args:
+            store: BarStore of the ticker and interval
+            month_windows: (first, last, month, bars) of the windows, in
+                filling order, emptied once stored
+            is_backwards: whether the windows are prepended to the store
+        """
+        if not month_windows:
+            return
+        ordered = month_windows[::-1] if is_backwards else month_windows
+        bars = pd.concat([window[3] for window in ordered
+            if len(window[3]) > 0] or [ordered[0][3]])
+        first, last = ordered[0][0], ordered[-1][1]
+        if is_backwards:
+            store.prepend(bars, first, last)
+        else:
+            store.append(bars, first, last)
+        month_windows.clear()
+
+    def _collect_daily_closes(self, chunks, daily_closes: list):
+        """Passes chunks through, keeping the adjusted close of each day
+
+        Only done for the graph, which needs one point per day rather
+        than the whole intraday history.
+
+        Args:
+            chunks: iterable of (dates, close, dividends) arrays
+            daily_closes: list the Series of each chunk's daily adjusted
+                closes are appended to
+
+        Yields:
+            The chunks, unchanged
+        """
+        cum_dividends = 0.0
+        for dates, close, dividends in chunks:
+            if self._is_plot and len(dates) > 0:
+                adjusted = cum_dividends + np.cumsum(
+                    np.asarray(dividends, dtype = np.float64))
+                cum_dividends = float(adjusted[-1])
+                adjusted += close
+                days = dates.astype("datetime64[D]")
+                is_last = np.append(days[1:] != days[:-1], True)
+                daily_closes.append(pd.Series(adjusted[is_last],
+                    index = pd.DatetimeIndex(days[is_last])))
+            yield dates, close, dividends
+
+    def _drop_timezone(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Converts the dates of bars to local time without timezone"""
+        if isinstance(df.index, pd.DatetimeIndex) and df.index.tz is not None:
+            df = df.tz_localize(None)
+        return df
+
+    def _to_arrays(self, df: pd.DataFrame) -> "tuple[np.ndarray, ...]":
+        """Converts bars to the (dates, close, dividends) arrays of chunks"""
+        return (df.index.values.astype("datetime64[ns]"),
+            df["Close"].to_numpy(dtype = self.price_dtype),
+            df["Dividends"].to_numpy(dtype = self.price_dtype))
+
+    def _is_state_usable(self, state: RunningState) -> bool:
+        """Checks that a loaded state summarizes the requested history
+
+        Args:
+            state: state returned by RunningState.load, possibly None
+
+        Returns:
+            True if the state can be extended with the latest bars
+        """
+        if state is None:
+            return False
+        last_date = pd.Timestamp(state.last_date).tz_localize(None)
+        return state.start == pd.Timestamp(self._start_date).isoformat() \
+            and last_date < self._end_date
+
+    def get_rolling_statistics(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Calculates the rolling risk statistics over the whole history
+
+        Args:
+            df: Dataframe returned by load_data
+
+        Returns:
+            Dataframe of rolling statistics aligned with the dates of df
+        """
+        return compute_rolling_statistics(
+            df.index,
+            df["Stocks_Close_Adjusted"].to_numpy(),
+            self._initial_aum,
+            self._rolling_windows or ROLLING_WINDOWS,
+            self.DAILY_RISK_FREE
         )
-        # Dictionary that is used for pretty-printing later
-        statistics = {
-            "Start Date:": start_date.strftime("%Y-%m-%d"),
-            "End Date: ": end_date.strftime("%Y-%m-%d"),
-            "Calender Days:": n_calender_days,
-            "Total stock return (With Dividends):": adjusted_stock_returns,
-            "Total returns of AUM:": total_aum_returns,
-            "Annualized AUM returns:": annual_aum_returns,
-            "Initial AUM:": initial_aum,
-            "Final AUM:": final_aum,
-            "Average AUM:": average_aum,
-            "Maximum AUM:": max_aum,
-            "PnL of AUM:": pnl_aum,
-            "Average daily returns:": avg_daily_return_aum,
-            "Daily Standard Deviation:": avg_daily_aum_sd,
-            "Daily Sharpe Ratio:": daily_sharpe_ratio
-        }
 
-        self.print_statistics(statistics)
-        self._plot_graph(stock_hist, n_stocks_bought)
+    def print_rolling_statistics(self, rolling: pd.DataFrame):
+        """Prints the rolling statistics of the latest trading day
+
+        Args:
+            rolling: Dataframe returned by get_rolling_statistics
+        """
+        line_separator = "---------------------------------------------------"
+        print(f"Rolling statistics as of {rolling.index[-1]:%Y-%m-%d}")
+        print(line_separator)
+        for info, value in rolling.iloc[-1].items():
+            print(f"{info}:", value)
+        print(line_separator)
+
+    def print_memory_usage(self):
+        """Prints the memory taken by the fetched and the kept data"""
+        if self.memory_usage is None:
+            return
+        print(f"Memory of {self._ticker}: "
+            f"{self.memory_usage['fetched'] / 1024:.1f} KiB fetched, "
+            f"{self.memory_usage['kept'] / 1024:.1f} KiB kept")
 
     def print_statistics(self, statistics: dict):
         """Function that handles the printing of statistics.
@@ -161,16 +491,22 @@ class Processor(Fetcher):
         become more managable. We have assumed that all dividends are not
         reinvested in any way.
 
+        Only the adjusted close is read afterwards, so the other columns
+        are dropped. Dividends are accumulated in float64 before the sum
+        is stored as price_dtype.
+
         Args:
             df: Dataframe of retrieved financial data
 
         Returns:
-            Same Dataframe but with added column
+            Dataframe with only the Stocks_Close_Adjusted column
         """
-        df["Stocks_Close_Adjusted"] = (
-            df["Close"] + df["Dividends"].cumsum()
-        )
-        return df
+        close_adjusted = df["Close"].to_numpy(dtype = np.float64, copy = True)
+        close_adjusted += np.cumsum(df["Dividends"].to_numpy())
+        return pd.DataFrame({
+            "Stocks_Close_Adjusted": close_adjusted.astype(
+                self.price_dtype, copy = False)
+        }, index = df.index)
 
     def _get_stock_returns(self, stock_hist: pd.Series) -> float:
         """Getter for stock returns at end of time period
@@ -181,8 +517,8 @@ class Processor(Fetcher):
         Returns:
             Stock returns in decimals
         """
-        stock_initial = stock_hist[0]
-        stock_final = stock_hist[-1]
+        stock_initial = stock_hist.iloc[0]
+        stock_final = stock_hist.iloc[-1]
         stock_returns = (stock_final - stock_initial) / stock_initial
         return stock_returns.astype(float)
 
@@ -206,8 +542,8 @@ class Processor(Fetcher):
         Returns:
             AUM Returns in decimal form
         """
-        aum_initial = stock_hist[0] * n_stocks
-        aum_final = stock_hist[-1] * n_stocks
+        aum_initial = stock_hist.iloc[0] * n_stocks
+        aum_final = stock_hist.iloc[-1] * n_stocks
         aum_returns = (aum_final - aum_initial) / aum_initial
         return aum_returns.astype(float)
 
@@ -360,24 +696,60 @@ class Processor(Fetcher):
     def _plot_graph(
             self,
             stock_hist: pd.Series,
-            n_stocks: float
+            n_stocks: float,
+            rolling: pd.DataFrame = None
         ) -> None:
         """Generates time series graph of the stock, if
-        _is_plot is set to True.
+        _is_plot is set to True. Long histories are decimated
+        with LTTB before being plotted.
 
         Args:
             stock_hist: Time Series of stock price history
             n_stocks: Number of stocks invested
+            rolling: Optional rolling statistics, plotted in a second graph
 
         Returns:
             Saved version of graph in ./graph directory
         """
         if self._is_plot:
-            aum_hist = stock_hist * n_stocks
+            plt = load_pyplot()
+            aum_hist = decimate_series(stock_hist * n_stocks)
+            fig, ax = plt.subplots()
             aum_hist.plot(
+                ax = ax,
                 title = "AUM history",
                 xlabel = "Date",
                 ylabel = "AUM in USD"
             )
-            plt.savefig(f"./graph/{self._ticker}.png")
-            plt.show()
+            save_figure(plt, fig, f"./graph/{self._ticker}.png",
+                self._plot_async)
+            if rolling is not None:
+                self._plot_rolling(plt, rolling)
+
+    def _plot_rolling(self, plt, rolling: pd.DataFrame) -> None:
+        """Plots the rolling statistics, one panel per kind of statistic
+
+        Args:
+            plt: matplotlib.pyplot module returned by load_pyplot
+            rolling: Dataframe returned by get_rolling_statistics
+        """
+        fig, axes = plt.subplots(4, 1, sharex = True, figsize = (10, 12))
+        panels = [
+            (["AUM", "Running Max AUM"], "AUM in USD"),
+            ([c for c in rolling if c.endswith("Standard Deviation")],
+                "Daily SD"),
+            ([c for c in rolling if c.endswith("Sharpe Ratio")],
+                "Daily Sharpe"),
+            ([c for c in rolling if c.endswith("Max Drawdown")],
+                "Max Drawdown")
+        ]
+        for ax, (columns, ylabel) in zip(axes, panels):
+            for column in columns:
+                decimate_series(rolling[column].dropna()).plot(
+                    ax = ax, label = column)
+            ax.set_ylabel(ylabel)
+            ax.legend(loc = "upper left", fontsize = "small")
+        axes[0].set_title("Rolling risk statistics")
+        axes[-1].set_xlabel("Date")
+        save_figure(plt, fig, f"./graph/{self._ticker}_rolling.png",
+            self._plot_async)
@@ -0,0 +1,453 @@
+"""Module containing the market data providers that the fetch layer
+downloads bars from: yfinance, local CSV/Parquet files, or a seeded
+synthetic generator, so that every entry point can also run offline.
+The responses of any provider can also be recorded to fixtures, and
+replayed later without network access.
+
+A provider is called with (ticker, start, end) and returns the bars
+of the ticker in [start, end) at its interval, indexed by date, with at
+least the Close and Dividends columns, like yfinance's Ticker.history."""
+
+from datetime import datetime
+import json
+import os
+import zlib
+import numpy as np
+import pandas as pd
+
+# Bars per trading day of each interval, for a 6.5 hour trading session
+BARS_PER_DAY = {
+    "1m": 390,
+    "2m": 195,
+    "5m": 78,
+    "15m": 26,
+    "30m": 13,
+    "1h": 7,
+    "1d": 1
+}
+
+# Longest period, in days, that Yahoo Finance serves in one request of
+# each interval. Longer requests come back empty.
+MAX_REQUEST_DAYS = {
+    "1m": 7,
+    "2m": 60,
+    "5m": 60,
+    "15m": 60,
+    "30m": 60,
+    "1h": 730,
+    "1d": None
+}
+
+# Fixture files are named <TICKER>_<interval>_<start>_<end>.npz
+FIXTURE_DATE_FORMAT = "%Y%m%dT%H%M%S"
+FIXTURE_META = "__meta__"
+
+def fixture_name(ticker: str,
+    interval: str,
+    start: datetime,
+    end: datetime) -> str:
+    """Name of the fixture file of a request
+
+    Args:
+        ticker: ticker requested
+        interval: length of the bars requested
+        start: first date requested
+        end: date the request stops at (exclusive)
+
+    Returns:
+        File name of the fixture, without directory
+    """
+    return f"{ticker.upper()}_{interval}_" \
+        f"{pd.Timestamp(start):{FIXTURE_DATE_FORMAT}}_" \
+        f"{pd.Timestamp(end):{FIXTURE_DATE_FORMAT}}.npz"
+
+class MissingDataError(ValueError):
+    """Raised when a provider has no data for a request, which retrying
+    the request will not change"""
+
+class Provider:
+    """Base class of the market data providers
+
+    Attributes:
+        name: name of the provider, as selected with --provider
+        interval: length of the bars, one of BARS_PER_DAY
+    """
+    name = None
+    interval = "1d"
+
+    def history(self,
+        ticker: str,
+        start: datetime,
+        end: datetime) -> pd.DataFrame:
+        """Gets the bars of a ticker
+
+        Args:
+            ticker: ticker to get
+            start: first date to get
+            end: date to stop at (exclusive)
+
+        Returns:
+            Dataframe of the bars, arranged from earliest to latest date
+        """
+        raise NotImplementedError
+
+    def __call__(self,
+        ticker: str,
+        start: datetime,
+        end: datetime) -> pd.DataFrame:
+        return self.history(ticker, start, end)
+
+class YFinanceProvider(Provider):
+    """Provider downloading bars from Yahoo Finance through yfinance
+
+    Yahoo Finance only serves intraday bars of recent periods, e.g.
+    1 minute bars of the last 7 days.
+    """
+    name = "yfinance"
+
+    def __init__(self, interval: str = "1d") -> None:
+        self.interval = interval
+
+    def history(self,
+        ticker: str,
+        start: datetime,
+        end: datetime) -> pd.DataFrame:
+        # yfinance is slow to import, so only import it when fetching
+        # pylint: disable=import-outside-toplevel
+        import yfinance as yf
+        return yf.Ticker(ticker).history(start = start, end = end,
+            interval = self.interval)
+
+class LocalProvider(Provider):
+    """Provider reading bars from a directory of files, one per ticker
+
+    Each ticker is read from <TICKER>.parquet or <TICKER>.csv in the
+    directory, in the format written by DataFrame.to_parquet or to_csv
+    on yfinance bars: dates in the index (or a Date column), and the
+    Close and Dividends columns.
+
+    Attributes:
+        data_dir: directory containing the files
+    """
+    name = "local"
+
+    def __init__(self, data_dir: str) -> None:
+        if not os.path.isdir(data_dir):
+            raise ValueError(f"Data directory {data_dir} does not exist.")
+        self.data_dir = data_dir
+
+    def _read(self, ticker: str) -> pd.DataFrame:
+        """Reads all bars of a ticker from its file"""
+        base = os.path.join(self.data_dir, ticker.upper())
+        if os.path.exists(f"{base}.parquet"):
+            df = pd.read_parquet(f"{base}.parquet")
+        elif os.path.exists(f"{base}.csv"):
+            df = pd.read_csv(f"{base}.csv", index_col = 0)
+        else:
+            raise MissingDataError(
+                f"No data file for {ticker} in {self.data_dir}")
+        if "Date" in df.columns:
+            df = df.set_index("Date")
+        # Dates are kept in the exchange's local time, without timezone
+        index = df.index
+        if not isinstance(index, pd.DatetimeIndex):
+            index = pd.to_datetime(index.astype(str).str.replace(
+                r"[+-]\d{2}:\d{2}$", "", regex = True))
+        elif index.tz is not None:
+            index = index.tz_localize(None)
+        df.index = pd.DatetimeIndex(index, name = "Date")
+        return df.sort_index()
+
+    def history(self,
+        ticker: str,
+        start: datetime,
+        end: datetime) -> pd.DataFrame:
+        df = self._read(ticker)
+        return df[(df.index >= start) & (df.index < end)]
+
+class SyntheticProvider(Provider):
+    """Provider generating bars with a seeded geometric Brownian motion
+
+    Every ticker has its own random path, which only depends on the seed
+    and the ticker, and starts on a fixed origin date. Requests for any
+    period are therefore consistent with each other and with the cache.
+    A dividend of a quarter of the yearly yield is paid every quarter.
+
+    Intraday bars follow a Brownian bridge from one daily close to the
+    next, seeded by the ticker and the day, so that they are consistent
+    with the daily bars and only the requested days are generated.
+
+    Attributes:
+        seed: seed shared by all tickers
+        mu: yearly drift of the price
+        sigma: yearly volatility of the price
+        dividend_yield: yearly dividend, as a fraction of the price
+        interval: length of the bars, one of BARS_PER_DAY
+        ORIGIN: first date of every generated path
+        TRADING_DAYS_PER_YEAR: number of bars per year of the path
+    """
+    name = "synthetic"
+    ORIGIN = datetime(1970, 1, 1)
+    TRADING_DAYS_PER_YEAR = 250
+    SESSION_START = pd.Timedelta(hours = 9, minutes = 30)
+
+    def __init__(self,
+        seed: int = 4228,
+        mu: float = 0.07,
+        sigma: float = 0.25,
+        dividend_yield: float = 0.02,
+        interval: str = "1d") -> None:
+        self.seed = seed
+        self.mu = mu
+        self.sigma = sigma
+        self.dividend_yield = dividend_yield
+        self.interval = interval
+
+    def history(self,
+        ticker: str,
+        start: datetime,
+        end: datetime) -> pd.DataFrame:
+        if self.interval == "1d":
+            return self._daily(ticker, start, end)
+        return self._intraday(ticker, start, end)
+
+    def _daily(self,
+        ticker: str,
+        start: datetime,
+        end: datetime) -> pd.DataFrame:
+        """Generates the daily bars of a ticker in [start, end)"""
+        days = np.arange(np.datetime64(self.ORIGIN, "D"),
+            np.datetime64(pd.Timestamp(end).ceil("D").date(), "D"))
+        dates = pd.DatetimeIndex(days[np.is_busday(days)], name = "Date")
+        n_days = len(dates)
+        # Seeded by ticker, so that each ticker has its own path. All
+        # draws of a bar are in one row, so that bars do not depend on
+        # how many bars are generated.
+        rng = np.random.default_rng([self.seed, zlib.crc32(ticker.encode())])
+        start_price = rng.uniform(10, 500)
+        draws = rng.standard_normal((n_days, 4))
+        dt = 1 / self.TRADING_DAYS_PER_YEAR
+        daily_sd = self.sigma * np.sqrt(dt)
+        log_returns = (self.mu - self.sigma ** 2 / 2) * dt \
+            + daily_sd * draws[:, 0]
+        close = start_price * np.exp(np.cumsum(log_returns))
+        intraday = np.abs(draws[:, 1:3]) * daily_sd / 2
+        open_price = np.concatenate(([start_price], close[:-1]))
+        quarter = self.TRADING_DAYS_PER_YEAR // 4
+        is_paid = np.arange(n_days) % quarter == quarter - 1
+        df = pd.DataFrame({
+            "Open": open_price,
+            "High": np.maximum(open_price, close) * (1 + intraday[:, 0]),
+            "Low": np.minimum(open_price, close) * (1 - intraday[:, 1]),
+            "Close": close,
+            "Volume": (10 ** 6 * np.exp(draws[:, 3] / 2)).astype(np.int64),
+            "Dividends": np.where(is_paid,
+                close * self.dividend_yield / 4, 0.0),
+            "Stock Splits": np.zeros(n_days)
+        }, index = dates)
+        return df[df.index >= start]
+
+    def _intraday(self,
+        ticker: str,
+        start: datetime,
+        end: datetime) -> pd.DataFrame:
+        """Generates the intraday bars of a ticker in [start, end)"""
+        bars_per_day = BARS_PER_DAY[self.interval]
+        # The day before start gives the close that the first day opens at
+        daily = self._daily(ticker,
+            pd.Timestamp(start).floor("D") - pd.Timedelta(days = 7), end)
+        first_day = daily.index.searchsorted(pd.Timestamp(start).floor("D"))
+        if first_day >= len(daily):
+            return daily.iloc[:0]
+        prev_close = daily["Close"].to_numpy()[max(first_day - 1, 0):-1]
+        daily = daily.iloc[first_day:]
+        if first_day == 0:
+            prev_close = np.concatenate(([daily["Open"].iloc[0]], prev_close))
+        close = daily["Close"].to_numpy()
+        n_days = len(daily)
+
+        # Standard normals of each day, seeded by the ticker and the day
+        ticker_seed = zlib.crc32(ticker.encode())
+        draws = np.stack([np.random.default_rng(
+            [self.seed, ticker_seed, day]).standard_normal(bars_per_day)
+            for day in daily.index.asi8 // (86400 * 10 ** 9)])
+        bar_sd = self.sigma * np.sqrt(
+            1 / self.TRADING_DAYS_PER_YEAR / bars_per_day)
+        walk = np.cumsum(draws, axis = 1) * bar_sd
+        steps = np.arange(1, bars_per_day + 1) / bars_per_day
+        # Brownian bridge from the previous close to the day's close
+        log_prices = np.log(prev_close)[:, None] \
+            + steps * np.log(close / prev_close)[:, None] \
+            + walk - steps * walk[:, -1:]
+        bar_close = np.exp(log_prices).ravel()
+        bar_open = np.concatenate(([prev_close[0]], bar_close[:-1]))
+
+        minutes = 390 // bars_per_day if bars_per_day < 390 else 1
+        offsets = self.SESSION_START + pd.to_timedelta(
+            np.arange(bars_per_day) * minutes, unit = "m")
+        dates = pd.DatetimeIndex(
+            (daily.index.values[:, None] + offsets.values).ravel(),
+            name = "Date")
+        # Dividends are paid on the first bar of the day
+        dividends = np.zeros((n_days, bars_per_day))
+        dividends[:, 0] = daily["Dividends"].to_numpy()
+        df = pd.DataFrame({
+            "Open": bar_open,
+            "High": np.maximum(bar_open, bar_close),
+            "Low": np.minimum(bar_open, bar_close),
+            "Close": bar_close,
+            "Volume": np.repeat(daily["Volume"].to_numpy() // bars_per_day,
+                bars_per_day),
+            "Dividends": dividends.ravel(),
+            "Stock Splits": np.zeros(n_days * bars_per_day)
+        }, index = dates)
+        return df[(df.index >= start) & (df.index < end)]
+
+class RecordingProvider(Provider):
+    """Provider recording every response of another provider to fixtures
+
+    Each response is saved as a compressed fixture in fixture_dir,
+    named after the ticker, interval and requested period, so that a
+    ReplayProvider can later serve it without any network access. The
+    columns, dtypes and timezone of the response are kept as they are.
+
+    Attributes:
+        provider: provider whose responses are recorded
+        fixture_dir: directory the fixtures are written to
+    """
+
+    def __init__(self, provider: Provider, fixture_dir: str) -> None:
+        self.provider = provider
+        self.fixture_dir = fixture_dir
+        self.name = provider.name
+        self.interval = provider.interval
+        os.makedirs(fixture_dir, exist_ok = True)
+
+    def history(self,
+        ticker: str,
+        start: datetime,
+        end: datetime) -> pd.DataFrame:
+        df = self.provider(ticker, start, end)
+        path = os.path.join(self.fixture_dir,
+            fixture_name(ticker, self.interval, start, end))
+        index = df.index if isinstance(df.index, pd.DatetimeIndex) \
+            else pd.DatetimeIndex([])
+        arrays = {col: df[col].to_numpy() for col in df.columns}
+        # values of a tz-aware index are already in UTC
+        arrays["Date"] = index.values.astype("datetime64[ns]") \
+            .astype(np.int64)
+        arrays[FIXTURE_META] = np.array(json.dumps({
+            "columns": list(df.columns),
+            "tz": str(index.tz) if index.tz is not None else None,
+            "unit": getattr(index, "unit", "ns")
+        }))
+        with open(f"{path}.tmp", "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(f"{path}.tmp", path)
+        return df
+
+class ReplayProvider(Provider):
+    """Provider serving the fixtures written by a RecordingProvider
+
+    A request is served from the fixture of the same ticker, interval
+    and period, or else from a fixture covering the requested period.
+    No request ever reaches the network, and a request without fixture
+    raises a MissingDataError.
+
+    Attributes:
+        fixture_dir: directory the fixtures are read from
+    """
+    name = "replay"
+
+    def __init__(self, fixture_dir: str, interval: str = "1d") -> None:
+        if not os.path.isdir(fixture_dir):
+            raise ValueError(f"Fixture directory {fixture_dir} does not exist.")
+        self.fixture_dir = fixture_dir
+        self.interval = interval
+
+    def _find(self, ticker: str, start: datetime, end: datetime) -> str:
+        """Finds the path of the fixture serving a request"""
+        name = fixture_name(ticker, self.interval, start, end)
+        if os.path.exists(os.path.join(self.fixture_dir, name)):
+            return os.path.join(self.fixture_dir, name)
+        prefix = f"{ticker.upper()}_{self.interval}_"
+        for other in sorted(os.listdir(self.fixture_dir)):
+            if not (other.startswith(prefix) and other.endswith(".npz")):
+                continue
+            first, last = (datetime.strptime(date, FIXTURE_DATE_FORMAT)
+                for date in other[len(prefix):-len(".npz")].split("_"))
+            if first <= start and end <= last:
+                return os.path.join(self.fixture_dir, other)
+        raise MissingDataError(f"No recorded response for {ticker} from "
+            f"{start} to {end} in {self.fixture_dir}")
+
+    def history(self,
+        ticker: str,
+        start: datetime,
+        end: datetime) -> pd.DataFrame:
+        path = self._find(ticker, start, end)
+        with np.load(path, allow_pickle = False) as arrays:
+            meta = json.loads(str(arrays[FIXTURE_META]))
+            index = pd.to_datetime(arrays["Date"], utc = True)
+            columns = {col: arrays[col] for col in meta["columns"]}
+        if meta["tz"] is not None:
+            index = index.tz_convert(meta["tz"])
+        else:
+            index = index.tz_localize(None)
+        # pandas 2 and later keep the resolution of the dates
+        if hasattr(index, "as_unit"):
+            index = index.as_unit(meta["unit"])
+        df = pd.DataFrame(columns, index = pd.DatetimeIndex(index,
+            name = "Date"))
+        if os.path.basename(path) == fixture_name(ticker, self.interval,
+            start, end):
+            return df
+        # A covering fixture is cut to the period, in local time
+        local = df.index.tz_localize(None) if df.index.tz is not None \
+            else df.index
+        return df[(local >= start) & (local < end)]
+
+# Providers selectable with --provider
+PROVIDERS = ["yfinance", "local", "synthetic"]
+
+def create_provider(args: dict) -> Provider:
+    """Creates the provider selected by the CLI arguments
+
+    Args:
+        args: dictionary containing the input CLI Arguments, with the
+            optional provider, interval, data_dir, seed, record and
+            replay keys
+
+    Returns:
+        Provider to download bars from, yfinance by default. With
+        --replay, fixtures are served instead, and with --record, the
+        responses of the provider are recorded.
+    """
+    interval = args.get("interval") or "1d"
+    if interval not in BARS_PER_DAY:
+        raise ValueError(f"Unknown interval {interval}, "
+            f"choose one of {', '.join(BARS_PER_DAY)}.")
+    if args.get("record") is not None and args.get("replay") is not None:
+        raise ValueError("Cannot both record and replay responses.")
+    if args.get("replay") is not None:
+        return ReplayProvider(args["replay"], interval)
+    provider = _create_source(args, interval)
+    if args.get("record") is not None:
+        return RecordingProvider(provider, args["record"])
+    return provider
+
+def _create_source(args: dict, interval: str) -> Provider:
+    """Creates the provider selected with --provider"""
+    provider = args.get("provider") or "yfinance"
+    if provider == "yfinance":
+        return YFinanceProvider(interval)
+    if provider == "local":
+        if args.get("data_dir") is None:
+            raise ValueError("--data_dir is needed for the local provider.")
+        return LocalProvider(args["data_dir"])
+    if provider == "synthetic":
+        seed = args.get("seed")
+        return SyntheticProvider(seed if seed is not None else 4228,
+            interval = interval)
+    raise ValueError(f"Unknown provider {provider}, "
+        f"choose one of {', '.join(PROVIDERS)}.")
@@ -0,0 +1,301 @@
+"""Module containing the RunningState class, a compact summary of a
+ticker's price history from which every printed statistic is derived,
+and which is updated in O(1) for every new bar, or merged with a whole
+chunk of bars at once when streaming a long history."""
+
+from datetime import datetime
+import hashlib
+import json
+import os
+from typing import Optional
+import numpy as np
+import pandas as pd
+from tools.statistics import format_statistics
+
+class RunningState:
+    """Running summary of the adjusted close of a ticker since a start date
+
+    Daily returns are summarized by their running mean and sum of
+    squared deviations (M2), updated with Welford's algorithm, so that
+    their standard deviation needs no pass over the history. Dividends
+    are accumulated, since the adjusted close of a bar is its close
+    plus all dividends paid since the start date.
+
+    The state is saved as JSON along with a checksum of its fields, so
+    that a corrupted file is detected and ignored when loaded.
+
+    Attributes:
+        start: requested start date the history was fetched from
+        count: number of bars summarized
+        first_date: date of the first bar
+        last_date: date of the last bar
+        first_price: adjusted close of the first bar
+        last_price: adjusted close of the last bar
+        last_close: unadjusted close of the last bar
+        last_dividend: dividend paid on the last bar
+        cum_dividends: dividends paid since the start date
+        max_price: maximum adjusted close
+        sum_prices: sum of the adjusted closes
+        mean_return: mean of the daily returns
+        m2_return: sum of squared deviations of the daily returns
+        VERSION: format version of the saved state
+    """
+    VERSION = 1
+    FIELDS = ("start", "count", "first_date", "last_date", "first_price",
+        "last_price", "last_close", "last_dividend", "cum_dividends",
+        "max_price", "sum_prices", "mean_return", "m2_return")
+
+    def __init__(self, **fields) -> None:
+        self.start = fields["start"]
+        self.count = fields["count"]
+        self.first_date = fields["first_date"]
+        self.last_date = fields["last_date"]
+        self.first_price = fields["first_price"]
+        self.last_price = fields["last_price"]
+        self.last_close = fields["last_close"]
+        self.last_dividend = fields["last_dividend"]
+        self.cum_dividends = fields["cum_dividends"]
+        self.max_price = fields["max_price"]
+        self.sum_prices = fields["sum_prices"]
+        self.mean_return = fields["mean_return"]
+        self.m2_return = fields["m2_return"]
+
+    @classmethod
+    def from_bars(cls, start: datetime, df: pd.DataFrame) -> "RunningState":
+        """Builds the state from the full history of a ticker
+
+        Args:
+            start: requested start date the history was fetched from
+            df: bars with Close and Dividends columns, from earliest
+                to latest date
+
+        Returns:
+            RunningState summarizing all bars of df
+        """
+        close = df["Close"].to_numpy(dtype = np.float64)
+        dividends = df["Dividends"].to_numpy(dtype = np.float64)
+        cum_dividends = np.cumsum(dividends)
+        prices = close + cum_dividends
+        returns = prices[1:] / prices[:-1] - 1
+        mean_return = returns.mean() if returns.size > 0 else 0.0
+        return cls(
+            start = pd.Timestamp(start).isoformat(),
+            count = int(prices.size),
+            first_date = df.index[0].isoformat(),
+            last_date = df.index[-1].isoformat(),
+            first_price = float(prices[0]),
+            last_price = float(prices[-1]),
+            last_close = float(close[-1]),
+            last_dividend = float(dividends[-1]),
+            cum_dividends = float(cum_dividends[-1]),
+            max_price = float(prices.max()),
+            sum_prices = float(prices.sum()),
+            mean_return = float(mean_return),
+            m2_return = float(((returns - mean_return) ** 2).sum())
+        )
+
+    def update(self, date: pd.Timestamp, close: float, dividend: float) -> None:
+        """Adds a new bar to the state in O(1)
+
+        Args:
+            date: date of the bar, later than last_date
+            close: unadjusted close of the bar
+            dividend: dividend paid on the bar
+        """
+        self.cum_dividends += float(dividend)
+        price = float(close) + self.cum_dividends
+        daily_return = price / self.last_price - 1
+        # Welford's update of the mean and M2 of the daily returns
+        n_returns = self.count
+        delta = daily_return - self.mean_return
+        self.mean_return += delta / n_returns
+        self.m2_return += delta * (daily_return - self.mean_return)
+
+        self.count += 1
+        self.sum_prices += price
+        self.max_price = max(self.max_price, price)
+        self.last_date = pd.Timestamp(date).isoformat()
+        self.last_price = price
+        self.last_close = float(close)
+        self.last_dividend = float(dividend)
+
+    @classmethod
+    def from_chunks(cls, start: datetime, chunks) -> "RunningState":
+        """Builds the state by streaming chunks of bars
+
+        Only one chunk is in memory at a time, so histories that do not
+        fit in memory can be summarized.
+
+        Args:
+            start: requested start date the history was fetched from
+            chunks: iterable of (dates, close, dividends) arrays, in
+                chronological order
+
+        Returns:
+            RunningState summarizing all bars, or None if there are none
+        """
+        state = None
+        for dates, close, dividends in chunks:
+            if len(dates) == 0:
+                continue
+            if state is None:
+                state = cls.from_bars(start, pd.DataFrame(
+                    {"Close": close, "Dividends": dividends},
+                    index = pd.DatetimeIndex(dates)))
+            else:
+                state.update_chunk(dates, close, dividends)
+        return state
+
+    def update_chunk(self,
+        dates: np.ndarray,
+        close: np.ndarray,
+        dividends: np.ndarray) -> None:
+        """Adds a chunk of bars at once, in O(chunk size)
+
+        The mean and M2 of the chunk's returns are merged with those of
+        the state with Chan et al.'s parallel update, which gives the
+        same result as adding the bars one by one.
+
+        Args:
+            dates: dates of the bars, later than last_date
+            close: unadjusted closes of the bars
+            dividends: dividends paid on the bars
+        """
+        cum_dividends = self.cum_dividends + np.cumsum(
+            np.asarray(dividends, dtype = np.float64))
+        prices = np.asarray(close, dtype = np.float64) + cum_dividends
+        returns = prices / np.concatenate(([self.last_price], prices[:-1])) - 1
+        n_old, n_new = self.count - 1, returns.size
+        chunk_mean = returns.mean()
+        chunk_m2 = ((returns - chunk_mean) ** 2).sum()
+        delta = chunk_mean - self.mean_return
+        n_total = n_old + n_new
+        self.mean_return += delta * n_new / n_total
+        self.m2_return += chunk_m2 + delta ** 2 * n_old * n_new / n_total
+
+        self.count += int(prices.size)
+        self.sum_prices += float(prices.sum())
+        self.max_price = max(self.max_price, float(prices.max()))
+        self.cum_dividends = float(cum_dividends[-1])
+        self.last_date = pd.Timestamp(dates[-1]).isoformat()
+        self.last_price = float(prices[-1])
+        self.last_close = float(close[-1])
+        self.last_dividend = float(dividends[-1])
+        self.mean_return = float(self.mean_return)
+        self.m2_return = float(self.m2_return)
+
+    def extend(self, df: pd.DataFrame) -> bool:
+        """Adds the bars after last_date, after checking the state is fresh
+
+        The bars must start with the last bar of the state. If that bar
+        has been revised since (e.g. an intraday close, or a split
+        adjusting past prices), the state is stale and nothing is added.
+
+        Args:
+            df: bars with Close and Dividends columns, starting at
+                last_date
+
+        Returns:
+            False if the state is stale and must be rebuilt, else True
+        """
+        last_date = pd.Timestamp(self.last_date)
+        if len(df) == 0 or df.index[0] != last_date:
+            return False
+        first_bar = df.iloc[0]
+        if not np.isclose(first_bar["Close"], self.last_close,
+            rtol = 1e-9, atol = 0) or \
+            not np.isclose(first_bar["Dividends"], self.last_dividend,
+            rtol = 1e-9, atol = 1e-12):
+            return False
+        for date, close, dividend in zip(df.index[1:],
+            df["Close"].iloc[1:], df["Dividends"].iloc[1:]):
+            self.update(date, close, dividend)
+        return True
+
+    def to_statistics(self,
+        initial_aum: float,
+        trading_days_per_year: int = 250,
+        daily_risk_free: float = 0.0001,
+        bars_per_day: int = 1) -> dict:
+        """Derives every printed statistic from the state in O(1)
+
+        For intraday bars, annualization uses bars_per_day times
+        trading_days_per_year bars per year. The daily mean and standard
+        deviation of returns are scaled from those of the bars, as
+        bars_per_day times and sqrt(bars_per_day) times as large,
+        which assumes that the returns of the bars are independent.
+
+        Args:
+            initial_aum: Initial Assets Under Management
+            trading_days_per_year: used to annualize AUM returns
+            daily_risk_free: daily risk free rate used for Sharpe ratio
+            bars_per_day: number of bars per trading day
+
+        Returns:
+            Dictionary of statistic names mapped to their values, the
+            same as compute_statistics over the whole history
+        """
+        n_stocks = initial_aum / self.first_price
+        returns = (self.last_price - self.first_price) / self.first_price
+        n_returns = self.count - 1
+        bar_sd = np.sqrt(np.float64(self.m2_return) / (n_returns - 1)) \
+            if n_returns > 1 else np.nan
+        return format_statistics(
+            pd.Timestamp(self.first_date), pd.Timestamp(self.last_date),
+            self.count / bars_per_day,
+            stock_returns = returns,
+            aum_returns = returns,
+            average_aum = self.sum_prices / self.count * n_stocks,
+            max_aum = self.max_price * n_stocks,
+            avg_daily_return = np.float64(self.mean_return) * bars_per_day,
+            daily_sd = bar_sd * np.sqrt(bars_per_day),
+            initial_aum = initial_aum,
+            trading_days_per_year = trading_days_per_year,
+            daily_risk_free = daily_risk_free
+        )
+
+    def _checksum(self, fields: dict) -> str:
+        """Checksum of the fields, to detect corrupted state files"""
+        encoded = json.dumps(fields, sort_keys = True).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def save(self, path: str) -> None:
+        """Writes the state to a JSON file, replacing it atomically
+
+        Args:
+            path: path of the state file
+        """
+        fields = {field: getattr(self, field) for field in self.FIELDS}
+        content = {
+            "version": self.VERSION,
+            "state": fields,
+            "checksum": self._checksum(fields)
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok = True)
+        with open(f"{path}.tmp", "w", encoding = "utf-8") as f:
+            json.dump(content, f, indent = 2)
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["RunningState"]:
+        """Loads a state saved by save
+
+        Args:
+            path: path of the state file
+
+        Returns:
+            RunningState, or None if the file is missing, corrupted or
+            of another version
+        """
+        try:
+            with open(path, encoding = "utf-8") as f:
+                content = json.load(f)
+            if content["version"] != cls.VERSION:
+                return None
+            state = cls(**content["state"])
+            fields = {field: content["state"][field] for field in cls.FIELDS}
+            if state._checksum(fields) != content["checksum"]:
+                return None
+            return state
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
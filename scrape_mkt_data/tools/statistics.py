@@ -0,0 +1,233 @@
+"""Sub-module containing the statistics engine used by the Processor.
+
+The adjusted close is converted to a NumPy array once, and the AUM
+path and daily returns are derived from it once. All the statistics
+are then computed from those shared arrays, instead of re-deriving
+them from pandas Series in every getter.
+
+Rolling statistics are computed in O(n) for any window length: window
+sums come from cumulative sums, and window maxima, minima and
+drawdowns from block-wise prefix and suffix scans (van Herk/Gil-Werman),
+instead of re-aggregating every window.
+"""
+
+import numpy as np
+import pandas as pd
+
+def compute_statistics(
+        dates: pd.DatetimeIndex,
+        close_adjusted: np.ndarray,
+        initial_aum: float,
+        trading_days_per_year: int = 250,
+        daily_risk_free: float = 0.0001
+    ) -> dict:
+    """Computes every statistic printed by Processor.print_statistics
+
+    Args:
+        dates: trading dates of the adjusted close, in order
+        close_adjusted: stock price history adjusted for dividends
+        initial_aum: Initial Assets Under Management
+        trading_days_per_year: used to annualize AUM returns
+        daily_risk_free: daily risk free rate used for Sharpe ratio
+
+    Returns:
+        Dictionary of statistic names mapped to their values, in the
+        order they are printed
+    """
+    prices = np.asarray(close_adjusted, dtype = np.float64)
+    n_days = prices.size
+    # AUM path and daily returns, shared by all statistics below
+    n_stocks = initial_aum / prices[0]
+    aum_hist = prices * n_stocks
+    daily_returns = aum_hist[1:] / aum_hist[:-1] - 1
+
+    # Same as pandas, the standard deviation has n - 1 degrees of freedom
+    daily_sd = daily_returns.std(ddof = 1) if daily_returns.size > 1 \
+        else np.nan
+    return format_statistics(
+        dates[0], dates[-1], n_days,
+        stock_returns = (prices[-1] - prices[0]) / prices[0],
+        aum_returns = (aum_hist[-1] - aum_hist[0]) / aum_hist[0],
+        average_aum = aum_hist.mean(),
+        max_aum = aum_hist.max(),
+        avg_daily_return = daily_returns.mean(),
+        daily_sd = daily_sd,
+        initial_aum = initial_aum,
+        trading_days_per_year = trading_days_per_year,
+        daily_risk_free = daily_risk_free
+    )
+
+def format_statistics(
+        start_date: pd.Timestamp,
+        end_date: pd.Timestamp,
+        n_days: int,
+        stock_returns: float,
+        aum_returns: float,
+        average_aum: float,
+        max_aum: float,
+        avg_daily_return: float,
+        daily_sd: float,
+        initial_aum: float,
+        trading_days_per_year: int = 250,
+        daily_risk_free: float = 0.0001
+    ) -> dict:
+    """Derives the printed statistics from summary values of a history
+
+    Args:
+        start_date: first trading date
+        end_date: last trading date
+        n_days: number of trading days
+        stock_returns: total stock return, with dividends
+        aum_returns: total return of the AUM
+        average_aum: average AUM over all trading days
+        max_aum: maximum AUM over all trading days
+        avg_daily_return: average daily return of the AUM
+        daily_sd: standard deviation of the daily returns of the AUM
+        initial_aum: Initial Assets Under Management
+        trading_days_per_year: used to annualize AUM returns
+        daily_risk_free: daily risk free rate used for Sharpe ratio
+
+    Returns:
+        Dictionary of statistic names mapped to their values, in the
+        order they are printed
+    """
+    start_date = pd.Timestamp(start_date)
+    end_date = pd.Timestamp(end_date)
+    annual_aum_returns = initial_aum * ((1 + aum_returns) ** \
+        (trading_days_per_year / n_days) - 1)
+    final_aum = initial_aum * (1 + aum_returns)
+
+    return {
+        "Start Date:": start_date.strftime("%Y-%m-%d"),
+        "End Date: ": end_date.strftime("%Y-%m-%d"),
+        "Calender Days:": (end_date - start_date).days,
+        "Total stock return (With Dividends):": float(stock_returns),
+        "Total returns of AUM:": float(aum_returns),
+        "Annualized AUM returns:": float(annual_aum_returns),
+        "Initial AUM:": initial_aum,
+        "Final AUM:": float(final_aum),
+        "Average AUM:": float(average_aum),
+        "Maximum AUM:": float(max_aum),
+        "PnL of AUM:": float(final_aum - initial_aum),
+        "Average daily returns:": float(avg_daily_return),
+        "Daily Standard Deviation:": float(daily_sd),
+        "Daily Sharpe Ratio:": \
+            float((avg_daily_return - daily_risk_free) / daily_sd)
+    }
+
+# Default windows of the rolling statistics, in trading days
+ROLLING_WINDOWS = (20, 60, 250)
+
+def _window_sums(values: np.ndarray, window: int) -> np.ndarray:
+    """Sums of every window of consecutive values, from cumulative sums
+
+    Args:
+        values: array to sum
+        window: number of values per window
+
+    Returns:
+        Array whose element i is the sum of values[i : i + window]
+    """
+    cumsum = np.concatenate(([0.0], np.cumsum(values)))
+    return cumsum[window:] - cumsum[:-window]
+
+def _window_min_ratio(prices: np.ndarray, window: int) -> np.ndarray:
+    """Worst trough-to-peak ratio of every window of consecutive prices
+
+    The prices are split into blocks of window length, so that every
+    window is a suffix of one block followed by a prefix of the next.
+    The (max, min, worst ratio) of all prefixes and suffixes of the
+    blocks are found with cumulative scans, and combined per window.
+
+    Args:
+        prices: positive prices, in chronological order
+        window: number of prices per window
+
+    Returns:
+        Array whose element i is the minimum of prices[t] / prices[p]
+        over p <= t in prices[i : i + window]
+    """
+    n_prices = prices.size
+    n_blocks = -(-n_prices // window)
+    # Padding repeats the last price, which never deepens a drawdown
+    blocks = np.pad(prices, (0, n_blocks * window - n_prices),
+        mode = "edge").reshape(n_blocks, window)
+    prefix_max = np.maximum.accumulate(blocks, axis = 1)
+    prefix_min = np.minimum.accumulate(blocks, axis = 1)
+    prefix_ratio = np.minimum.accumulate(blocks / prefix_max, axis = 1)
+    reverse = blocks[:, ::-1]
+    suffix_max = np.maximum.accumulate(reverse, axis = 1)[:, ::-1]
+    suffix_min = np.minimum.accumulate(reverse, axis = 1)[:, ::-1]
+    suffix_ratio = np.minimum.accumulate(
+        (suffix_min / blocks)[:, ::-1], axis = 1)[:, ::-1]
+    prefix_max, prefix_min, prefix_ratio, suffix_max, suffix_ratio = (
+        arr.ravel() for arr in
+        (prefix_max, prefix_min, prefix_ratio, suffix_max, suffix_ratio))
+
+    starts = np.arange(n_prices - window + 1)
+    ends = starts + window - 1
+    # Peak in the suffix of one block and trough in the prefix of the next
+    ratio = np.minimum(suffix_ratio[starts], prefix_ratio[ends])
+    ratio = np.minimum(ratio, prefix_min[ends] / suffix_max[starts])
+    # Windows aligned with a block are a whole block prefix
+    aligned = starts % window == 0
+    ratio[aligned] = prefix_ratio[ends[aligned]]
+    return ratio
+
+def compute_rolling_statistics(
+        dates: pd.DatetimeIndex,
+        close_adjusted: np.ndarray,
+        initial_aum: float,
+        windows: "tuple[int]" = ROLLING_WINDOWS,
+        daily_risk_free: float = 0.0001
+    ) -> pd.DataFrame:
+    """Computes rolling risk statistics over the whole history
+
+    A window of w days holds the last w daily returns, i.e. the last
+    w + 1 AUM values, so the first w rows of its columns are NaN.
+
+    Args:
+        dates: trading dates of the adjusted close, in order
+        close_adjusted: stock price history adjusted for dividends
+        initial_aum: Initial Assets Under Management
+        windows: window lengths, in trading days
+        daily_risk_free: daily risk free rate used for Sharpe ratio
+
+    Returns:
+        Dataframe indexed by date, with the AUM, its running maximum
+        and drawdown from it, and per window the daily standard
+        deviation, daily Sharpe ratio and maximum drawdown
+    """
+    prices = np.asarray(close_adjusted, dtype = np.float64)
+    aum_hist = prices * (initial_aum / prices[0])
+    daily_returns = aum_hist[1:] / aum_hist[:-1] - 1
+    running_max = np.maximum.accumulate(aum_hist)
+    columns = {
+        "AUM": aum_hist,
+        "Running Max AUM": running_max,
+        "Drawdown": 1 - aum_hist / running_max
+    }
+
+    # Centering the returns keeps the sums of squares accurate
+    centered = daily_returns - daily_returns.mean() \
+        if daily_returns.size > 0 else daily_returns
+    for window in windows:
+        if window < 2:
+            raise ValueError("Rolling windows need at least 2 days.")
+        vol, sharpe, max_drawdown = (np.full(prices.size, np.nan)
+            for _ in range(3))
+        if window < prices.size:
+            sums = _window_sums(centered, window)
+            sq_sums = _window_sums(centered ** 2, window)
+            variance = np.maximum(sq_sums - sums ** 2 / window, 0) \
+                / (window - 1)
+            mean = sums / window + daily_returns.mean()
+            vol[window:] = np.sqrt(variance)
+            with np.errstate(divide = "ignore", invalid = "ignore"):
+                sharpe[window:] = (mean - daily_risk_free) / vol[window:]
+            max_drawdown[window:] = \
+                1 - _window_min_ratio(aum_hist, window + 1)
+        columns[f"{window}d Daily Standard Deviation"] = vol
+        columns[f"{window}d Daily Sharpe Ratio"] = sharpe
+        columns[f"{window}d Max Drawdown"] = max_drawdown
+    return pd.DataFrame(columns, index = dates)
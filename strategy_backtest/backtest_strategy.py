@@ -7,7 +7,10 @@ This is the main file for the execution of the backtesting strategy.
 
 from datetime import datetime, timedelta
 import argparse
+from tools.Calendar import Calendar
 from tools.Portfolio import Portfolio
+from tools.Providers import PROVIDERS
+from tools.Significance import Significance
 
 def process_inputs() -> dict:
     """Processes inputs from command line for further processing
@@ -49,6 +52,32 @@ def process_inputs() -> dict:
         required = True, type = int,
         help = "Indicates the percentage of stocks to go long (Rounded up)"
     )
+    parser.add_argument("--rebalance",
+        required = False, type = str, default = "M",
+        choices = Calendar.FREQUENCIES,
+        help = "<OPTIONAL> Rebalance frequency: D, W, M or Q. Default: M"
+    )
+    add_data_arguments(parser)
+    parser.add_argument("--plot_async",
+        required = False, action = "store_true",
+        help = "<OPTIONAL> Save the graph in a background worker"
+    )
+    parser.add_argument("--significance",
+        required = False, type = int,
+        help = "<OPTIONAL> Number of randomized replicates to test against"
+    )
+    parser.add_argument("--significance_method",
+        required = False, choices = Significance.METHODS, default = "random",
+        help = "<OPTIONAL> Replicates: random portfolios, or bootstrap returns"
+    )
+    parser.add_argument("--significance_seed",
+        required = False, type = int, default = 4228,
+        help = "<OPTIONAL> Seed of the randomized replicates"
+    )
+    parser.add_argument("--workers",
+        required = False, type = int,
+        help = "<OPTIONAL> Number of worker processes. Default: CPU count"
+    )
 
     # Check for Argument Validity before returning
     dict_args = vars(parser.parse_args())
@@ -59,6 +88,54 @@ def process_inputs() -> dict:
         raise e
 
 
+def add_data_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the arguments selecting where and how prices are fetched
+
+    Args:
+        parser: parser of the command line arguments
+    """
+    parser.add_argument("--provider",
+        required = False, choices = PROVIDERS, default = "yfinance",
+        help = "<OPTIONAL> Source of market data: yfinance, local or synthetic"
+    )
+    parser.add_argument("--data_dir",
+        required = False, type = str,
+        help = "<OPTIONAL> Directory of <TICKER>.csv/.parquet files for local"
+    )
+    parser.add_argument("--seed",
+        required = False, type = int, default = 4228,
+        help = "<OPTIONAL> Seed of the generated prices for synthetic"
+    )
+    parser.add_argument("--record",
+        required = False, type = str,
+        help = "<OPTIONAL> Directory to record provider responses to"
+    )
+    parser.add_argument("--replay",
+        required = False, type = str,
+        help = "<OPTIONAL> Directory of recorded responses to serve offline"
+    )
+    parser.add_argument("--fetch_concurrency",
+        required = False, type = int, default = 8,
+        help = "<OPTIONAL> Maximum number of downloads in flight at once"
+    )
+    parser.add_argument("--fetch_rate",
+        required = False, type = float, default = 10.0,
+        help = "<OPTIONAL> Maximum number of downloads started per second"
+    )
+    parser.add_argument("--fetch_retries",
+        required = False, type = int, default = 3,
+        help = "<OPTIONAL> Number of retries of a failed download, with backoff"
+    )
+    parser.add_argument("--fetch_timeout",
+        required = False, type = float, default = 30.0,
+        help = "<OPTIONAL> Seconds after which a download attempt is abandoned"
+    )
+    parser.add_argument("--float32",
+        required = False, action = "store_true",
+        help = "<OPTIONAL> Store prices as float32 to halve their memory"
+    )
+
+
 def check_validity(args: dict) -> dict:
     """Check for validity of arguments based on given restrictions
 
@@ -78,6 +155,11 @@ def check_validity(args: dict) -> dict:
         raise ValueError("--strategy_type: Only 'R'(Reversal) or 'M'(Momentum)")
     if args["initial_aum"] <= 0:
         raise ValueError("--initial_aum: Initial AUM must be positive")
+    if args.get("significance") is not None and args["significance"] < 1:
+        raise ValueError("--significance: Need at least 1 replicate")
+    args["rebalance"] = args.get("rebalance") or "M"
+    if args["rebalance"] not in Calendar.FREQUENCIES:
+        raise ValueError("--rebalance: Only 'D', 'W', 'M' or 'Q'")
     # Check for DateTime validity
     start_date_DT = datetime.strptime(args["b"], "%Y%m%d")
 
@@ -96,9 +178,11 @@ def check_validity(args: dict) -> dict:
     if start_date_DT > end_date_DT:
         raise ValueError("Start Date is later than End Date")
 
-    # Start date cannot be at same month and year as end
-    # this is because positions are taken at the end of month
-    if start_date_DT.year == end_date_DT.year and \
+    # Start date cannot be at same month and year as end when
+    # rebalancing monthly or quarterly, since positions are
+    # taken at the end of month
+    if args["rebalance"] in ["M", "Q"] and \
+        start_date_DT.year == end_date_DT.year and \
         start_date_DT.month == end_date_DT.month:
         # pylint: disable=line-too-long
         raise ValueError("Position taken at last trading day of start date month. Please select end date at least 1 month after start date")
@@ -114,8 +198,14 @@ def execute():
     portfolio = Portfolio(args)
     # Strategize first then print stats
     portfolio.strategize()
-    portfolio.print_stats()
+    # Plot first, so that a background save overlaps the printing
     portfolio.plot_graph()
+    portfolio.print_stats()
+    if args["significance"] is not None:
+        significance = Significance(portfolio, args["significance"],
+            args["significance_method"], args["workers"],
+            args["significance_seed"])
+        significance.print_results(significance.run())
 
 if __name__ == "__main__":
     execute()
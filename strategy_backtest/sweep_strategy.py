@@ -0,0 +1,101 @@
+"""YSC4228 Data Science in Quantitative Finance
+
+Authors: Koa Zhao Yuan, Walter Boo Keng Hua
+
+This is the main file for sweeping the parameters of the backtesting
+strategy: every combination of --strategy_types, --days and --top_pct
+is backtested on one fetched universe, e.g.
+
+    python sweep_strategy.py --tickers MSFT AAPL NVDA --b 20150105
+        --e 20201231 --initial_aum 10000 --days 10 20 60 --top_pct 20 50
+"""
+
+import argparse
+from backtest_strategy import add_data_arguments, check_validity
+from tools.Calendar import Calendar
+from tools.Sweep import Sweep
+
+def process_inputs() -> dict:
+    """Processes inputs from command line for further processing
+
+    Returns:
+        Dictionary that maps parser command line arguments (key) to
+        the parameters (values) inputted by the user.
+    """
+    parser = argparse.ArgumentParser(
+        prog = "sweep_strategy",
+        description = "Backtest a grid of Momentum and Reversal parameters"
+    )
+    parser.add_argument(
+        "--tickers", "--list", nargs = "+",
+        help = "<REQUIRED> List of Tickers to track",
+        required = True
+    )
+    parser.add_argument("--b",
+        required = True, type = str,
+        help = "<REQUIRED> Start Date to track (YYYYMMDD)"
+    )
+    parser.add_argument("--e",
+        required = False, type = str,
+        help = "<OPTIONAL> Stop Date to Track (YYYYMMDD). Default: today's date"
+    )
+    parser.add_argument("--initial_aum",
+        required = True, type = int,
+        help = "Initial Assets Under Management, expressed in US dollars"
+    )
+    parser.add_argument("--strategy_types",
+        required = False, nargs = "+", default = ["R", "M"],
+        help = "<OPTIONAL> Strategies to sweep: 'R' and/or 'M'. Default: both"
+    )
+    parser.add_argument("--days",
+        required = True, type = int, nargs = "+",
+        help = "<REQUIRED> Numbers of trading days of the returns to sweep"
+    )
+    parser.add_argument("--top_pct",
+        required = True, type = int, nargs = "+",
+        help = "<REQUIRED> Percentages of stocks to go long to sweep"
+    )
+    parser.add_argument("--rebalance",
+        required = False, type = str, default = "M",
+        choices = Calendar.FREQUENCIES,
+        help = "<OPTIONAL> Rebalance frequency of every configuration"
+    )
+    parser.add_argument("--workers",
+        required = False, type = int,
+        help = "<OPTIONAL> Number of worker processes. Default: CPU count"
+    )
+    parser.add_argument("--output",
+        required = False, type = str, default = "sweep_results.csv",
+        help = "<OPTIONAL> CSV file of the results, resumed if it exists"
+    )
+    add_data_arguments(parser)
+    return check_sweep_validity(vars(parser.parse_args()))
+
+def check_sweep_validity(args: dict) -> dict:
+    """Checks every configuration of the grid like a single backtest
+
+    Args:
+        args: input arguments as provided in the command line
+
+    Returns:
+        args, with the dates parsed as in check_validity
+    """
+    valid_args = None
+    for strategy_type in args["strategy_types"]:
+        for days in args["days"]:
+            for top_pct in args["top_pct"]:
+                valid_args = check_validity(dict(args,
+                    strategy_type = strategy_type,
+                    days = days, top_pct = top_pct))
+    return dict(args, b = valid_args["b"], e = valid_args["e"])
+
+def execute():
+    """Overall function that executes the parameter sweep."""
+    args = process_inputs()
+    sweep = Sweep(args, args["strategy_types"], args["days"],
+        args["top_pct"], args["output"], args["workers"])
+    results = sweep.run()
+    sweep.print_best(results)
+
+if __name__ == "__main__":
+    execute()
@@ -0,0 +1,35 @@
+"""Unit tests for the Calendar class, which finds the last trading day
+of every period of a universe's trading dates.
+"""
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from tools.Calendar import Calendar
+
+def test_period_ends_match_groupby():
+    dates = pd.bdate_range("2019-11-01", "2021-03-15").delete([3, 40, 41])
+    calendar = Calendar(dates)
+    days = pd.Series(dates, index = dates)
+    for frequency, key in [("D", dates), ("W", dates.to_period("W")),
+        ("M", dates.to_period("M")), ("Q", dates.to_period("Q"))]:
+        expected = days.groupby(key).max()
+        assert list(dates[calendar.period_end_rows(frequency)]) \
+            == list(expected)
+
+def test_period_ends_within_dates():
+    calendar = Calendar(pd.bdate_range("2020-01-01", "2020-12-31"))
+    rows = calendar.period_end_rows("Q", datetime(2020, 4, 1),
+        datetime(2020, 10, 30))
+    assert list(calendar.dates[rows]) == [
+        pd.Timestamp("2020-06-30"), pd.Timestamp("2020-09-30")]
+    with pytest.raises(ValueError):
+        calendar.period_end_rows("Y")
+
+def test_union_and_rows_of():
+    first = pd.DatetimeIndex(["2020-01-02", "2020-01-06"])
+    second = pd.DatetimeIndex(["2020-01-03", "2020-01-06", "2020-01-07"])
+    calendar = Calendar.from_union([first, second])
+    assert len(calendar.dates) == 4
+    assert list(calendar.rows_of(second)) == [1, 2, 3]
+    assert isinstance(calendar.rows_of(first), np.ndarray)
@@ -1,9 +1,12 @@
 """Unit tests file for the initiation of the Fetcher
 Class, along with some basic sanity tests.
 """
+from datetime import datetime
 import random
 import pytest
 from backtest_strategy import check_validity
+from tools.Fetcher import Fetcher
+from tools.Providers import SyntheticProvider
 from tests.test_utils import generate_random_str_exclu
 
 def test_invalid_strategy_param():
@@ -78,3 +81,40 @@ def test_bad_positive_days():
             check_validity(input_args)
             assert "--top_pct: Percentile must be between 1 and 100." \
                  in excinfo.value
+
+def test_single_rebalance_date():
+    input_args = check_validity({
+        "tickers": ["AAA", "BBB", "CCC"],
+        "b": "20180102",
+        "e": "20180205",
+        "initial_aum": 10 ** 4,
+        "strategy_type": "R",
+        "days": 10,
+        "top_pct": 40,
+        "rebalance": "Q",
+        "provider": "synthetic"
+    })
+    with pytest.raises(ValueError, match = "at least 2"):
+        Fetcher(input_args)
+    # Weekly rebalances leave enough periods in the same dates
+    assert Fetcher(dict(input_args, rebalance = "W")).n_periods >= 2
+
+def test_ticker_without_data_left_out(tmp_path):
+    synthetic = SyntheticProvider()
+    for ticker in ["AAA", "BBB", "CCC"]:
+        synthetic(ticker, datetime(2017, 6, 1), datetime(2018, 6, 30)) \
+            .to_csv(tmp_path / f"{ticker}.csv")
+    input_args = check_validity({
+        "tickers": ["AAA", "ZZZ", "BBB", "CCC"],
+        "b": "20180102",
+        "e": "20180531",
+        "initial_aum": 10 ** 4,
+        "strategy_type": "R",
+        "days": 10,
+        "top_pct": 40,
+        "provider": "local",
+        "data_dir": str(tmp_path)
+    })
+    assert Fetcher(input_args).panel.tickers == ["AAA", "BBB", "CCC"]
+    with pytest.raises(ValueError, match = "any ticker"):
+        Fetcher(dict(input_args, tickers = ["YYY", "ZZZ"]))
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from backtest_strategy import check_validity
 from tools.Portfolio import Portfolio
@@ -95,3 +96,65 @@ def test_get_init_pnl():
 
     # floating point tolerance
     assert abs(expected_init_aum - actual_init_aum) <= 10 ** -6
+
+def synthetic_portfolio() -> Portfolio:
+    return Portfolio(check_validity({
+        "tickers": ["AAA", "BBB", "CCC", "DDD"],
+        "b": "20170504",
+        "e": "20171229",
+        "initial_aum": 300,
+        "strategy_type": 'R',
+        "days": 25,
+        "top_pct": 50,
+        "provider": "synthetic",
+        "fetch_rate": 1000.0
+    }))
+
+def test_get_max_drawdown():
+    portfolio = synthetic_portfolio()
+    portfolio.daily_aum_hist = pd.Series(
+        [300, 450, 360, 400, 450, 500, 250, 300],
+        index = pd.date_range("2022/03/07", freq="D", periods = 8)
+    )
+    max_drawdown, duration = portfolio.get_max_drawdown()
+    assert abs(max_drawdown - (250 / 500 - 1)) <= 10 ** -6
+    # Below the peak of 450 for 2 days, and of 500 until the end
+    assert duration == 2
+
+def test_stats_match_series_formulas():
+    portfolio = synthetic_portfolio()
+    portfolio.strategize()
+    stats = dict(portfolio.get_stats())
+    aum = portfolio.daily_aum_hist
+    returns = aum.pct_change().dropna()
+    assert list(stats)[13] == "14. Daily Sharpe Ratio of portfolio"
+    assert np.isclose(stats["13. Daily S.D of portfolio returns:"],
+        returns.std())
+    assert np.isclose(stats["9. Average daily AUM:"], aum.mean())
+    assert np.isclose(stats["15. Maximum drawdown:"],
+        (aum / aum.cummax() - 1).min())
+    assert np.isclose(stats["19. Hit rate of daily returns:"],
+        (returns > 0).mean())
+    # pandas applies the sample corrections, which are undone here to
+    # compare with the population skewness and excess kurtosis
+    n_returns = len(returns)
+    assert np.isclose(stats["21. Skewness of daily returns:"],
+        returns.skew() * (n_returns - 2)
+        / np.sqrt(n_returns * (n_returns - 1)))
+    assert np.isclose(stats["22. Excess kurtosis of daily returns:"],
+        (returns.kurt() * (n_returns - 2) * (n_returns - 3)
+        / (n_returns - 1) - 6) / (n_returns + 1))
+    # Each rebalance after the first trades at most the whole AUM
+    assert 0 <= stats["20. Average turnover per rebalance:"] <= 1
+
+def test_risk_ratios_without_downside():
+    portfolio = synthetic_portfolio()
+    # AUM that only rises has no downside deviation
+    returns = np.array([0.01, 0.02, 0.005, 0.03])
+    assert np.isnan(portfolio.get_daily_sortino_ratio(returns, 0.01))
+    skewness, kurtosis = portfolio.get_skew_kurtosis(returns)
+    assert np.isfinite(skewness) and np.isfinite(kurtosis)
+    # Flat AUM has neither deviation nor moments
+    flat = np.zeros(5)
+    assert np.isnan(portfolio.get_daily_sortino_ratio(flat, 0.0))
+    assert all(np.isnan(portfolio.get_skew_kurtosis(flat)))
@@ -0,0 +1,59 @@
+"""Unit tests for the PricePanel class, which aligns the adjusted
+closes of all tickers on a shared date index.
+"""
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from tools.PricePanel import PricePanel
+
+def make_series(ticker: str, dates: "list[str]", prices: "list[float]"):
+    return pd.Series(prices, index = pd.DatetimeIndex(dates), name = ticker)
+
+def test_panel_aligns_tickers():
+    panel = PricePanel.from_series([
+        make_series("AAA", ["2020-01-30", "2020-01-31", "2020-02-03",
+            "2020-02-28"], [1.0, 2.0, 3.0, 4.0]),
+        make_series("BBB", ["2020-01-31", "2020-02-28"], [10.0, 20.0])
+    ], datetime(2020, 1, 1), datetime(2020, 3, 1))
+
+    assert panel.tickers == ["AAA", "BBB"]
+    assert panel.prices.shape == (4, 2)
+    assert list(panel.mask[:, 1]) == [False, True, False, True]
+    # Prices are carried forward, but not before the first trading day
+    assert np.isnan(panel.prices[0, 1])
+    assert list(panel.prices[1:, 1]) == [10.0, 10.0, 20.0]
+    assert list(panel.dates[panel.rebalance_rows]) == [
+        pd.Timestamp("2020-01-31"), pd.Timestamp("2020-02-28")]
+
+def test_month_ends_within_period():
+    dates = pd.bdate_range("2019-11-01", "2020-03-15")
+    panel = PricePanel.from_series(
+        [pd.Series(np.arange(len(dates), dtype = float), index = dates,
+            name = "AAA")],
+        datetime(2020, 1, 1), datetime(2020, 3, 15), np.float32)
+    assert panel.prices.dtype == np.float32
+    # The last row closes the partial month of the end date
+    assert list(panel.dates[panel.rebalance_rows]) == [
+        pd.Timestamp("2020-01-31"), pd.Timestamp("2020-02-28"),
+        pd.Timestamp("2020-03-13")]
+
+def test_adjusted_matches_panel_fetched_later():
+    dates = ["2020-01-30", "2020-01-31", "2020-02-03", "2020-02-28"]
+    closes = [make_series("AAA", dates, [1.0, 2.0, 3.0, 4.0]),
+        make_series("BBB", dates[1::2], [10.0, 20.0])]
+    dividends = [make_series("AAA", dates, [0.5, 0.0, 0.25, 0.0]),
+        make_series("BBB", dates[1::2], [1.0, 2.0])]
+    panel = PricePanel.from_series(closes, datetime(2020, 1, 1),
+        datetime(2020, 3, 1), dividends = dividends)
+    adjusted = panel.adjusted(datetime(2020, 2, 1), np.float32)
+
+    # As if fetched from 2020-02-01, with dividends summed from there
+    expected = PricePanel.from_series([
+        make_series("AAA", dates[2:], [3.25, 4.25]),
+        make_series("BBB", dates[3:], [22.0])
+    ], datetime(2020, 1, 1), datetime(2020, 3, 1), np.float32)
+    assert adjusted.dividends is None
+    assert list(adjusted.dates) == list(expected.dates)
+    assert adjusted.prices.dtype == np.float32
+    np.testing.assert_array_equal(adjusted.prices, expected.prices)
+    np.testing.assert_array_equal(adjusted.mask, expected.mask)
@@ -0,0 +1,64 @@
+"""Unit tests for the Significance class, run offline on synthetic
+prices.
+"""
+import numpy as np
+import pytest
+from backtest_strategy import check_validity
+from tools.Portfolio import Portfolio
+from tools.Significance import Significance
+
+def make_portfolio() -> Portfolio:
+    args = check_validity({
+        "tickers": [f"T{i:02d}" for i in range(20)],
+        "b": "20180102",
+        "e": "20191231",
+        "initial_aum": 10000,
+        "strategy_type": 'M',
+        "days": 10,
+        "top_pct": 20,
+        "provider": "synthetic",
+        "fetch_rate": 1000.0
+    })
+    portfolio = Portfolio(args)
+    portfolio.strategize()
+    return portfolio
+
+def test_observed_matches_portfolio():
+    portfolio = make_portfolio()
+    significance = Significance(portfolio, 10)
+    stats = dict(portfolio.get_stats())
+    assert np.isclose(significance.observed["Daily Sharpe Ratio"],
+        stats["14. Daily Sharpe Ratio of portfolio"])
+    assert np.isclose(significance.observed["Total AUM Return"],
+        stats["5. Total AUM Return:"])
+
+    # With only the held tickers to pick from, every replicate is the
+    # strategy itself
+    significance.is_ranked = portfolio.holdings
+    aum, ic = significance.random_portfolios(3,
+        np.random.default_rng(0))
+    assert np.allclose(aum, portfolio.daily_aum_hist.to_numpy()[:, None])
+    assert np.allclose(ic, portfolio.evaluate_ic().to_numpy()[:, None])
+
+def test_replicates_are_reproducible():
+    portfolio = make_portfolio()
+    results = []
+    for method, n_workers in [("random", 1), ("random", 2),
+        ("bootstrap", 1)]:
+        significance = Significance(portfolio, 30, method, n_workers)
+        significance.CHUNK_SIZE = 8
+        results.append(significance.run())
+    assert len(results[0]) == 30
+    assert results[0].equals(results[1])
+    assert (significance.p_values(results[2]) > 0).all()
+    with pytest.raises(ValueError):
+        Significance(portfolio, 10, "permutation")
+
+def test_stationary_indices():
+    indices = Significance.stationary_indices(100, 50, 5.0,
+        np.random.default_rng(0))
+    assert indices.shape == (100, 50)
+    assert ((indices >= 0) & (indices < 100)).all()
+    # Most indices continue the block of the previous one
+    steps = (indices[1:] - indices[:-1]) % 100 == 1
+    assert 0.7 < steps.mean() < 0.9
@@ -1,12 +1,18 @@
 """Unit tests for the Strategizer class. Since most of the infrastructure
 inside is very complex, we have decided to instead test only the
-find_n_top_tickers function with some sanity checks on the parameters
+find_n_top_tickers function with some sanity checks on the parameters,
+and the vectorized selection of holdings against a plain sort.
 """
 import random
+from datetime import datetime
 from math import ceil
+import numpy as np
+import pandas as pd
 import pytest
 from backtest_strategy import check_validity
 from tests.test_utils import generate_random_ticker_dummy
+from tools.PricePanel import PricePanel
+from tools.Strategizer import Strategizer
 
 def test_bad_negative_top_pct():
     for _ in range(50):
@@ -132,3 +138,154 @@ def test_beginning_later_than_end_date_2():
         check_validity(input_args)
         assert "Start date cannot be after current time" \
             in excinfo.value
+
+def sorted_picks(returns: "list[float]", strat: str, n_top: int) -> set:
+    # Picks of the former per-month implementation, with a stable sort
+    ranked = sorted(range(len(returns)), key = lambda j: returns[j],
+        reverse = strat == 'R')
+    return set(ranked[:n_top])
+
+def test_select_holdings_matches_sort():
+    rng = np.random.default_rng(0)
+    for strat in ['R', 'M']:
+        for n_tickers, n_top in [(7, 3), (50, 50), (3000, 150)]:
+            # Rounded returns, so that many of them are tied
+            returns = np.round(rng.normal(0, 0.05, (24, n_tickers)), 2)
+            strategizer = Strategizer.__new__(Strategizer)
+            strategizer.strat = strat
+            holdings = strategizer.select_holdings(returns,
+                np.full(len(returns), n_top))
+            assert (holdings.sum(axis = 1) == n_top).all()
+            for month, row in enumerate(returns):
+                assert set(np.flatnonzero(holdings[month])) == \
+                    sorted_picks(list(row), strat, n_top)
+        # Months holding different numbers of tickers
+        n_held = rng.integers(0, 40, 24)
+        holdings = strategizer.select_holdings(returns, n_held)
+        for month, row in enumerate(returns):
+            assert set(np.flatnonzero(holdings[month])) == \
+                sorted_picks(list(row), strat, n_held[month])
+
+def test_track_aum_by_date():
+    dates = pd.bdate_range("2020-01-27", "2020-03-31")
+    rng = np.random.default_rng(1)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (len(dates), 4)),
+        axis = 0))
+    # A flat month, whose equal daily AUM must not be dropped
+    prices[(dates > "2020-01-31") & (dates <= "2020-02-28")] = prices[4]
+    strategizer = Strategizer.__new__(Strategizer)
+    strategizer.panel = PricePanel.from_series(
+        [pd.Series(prices[:, j], index = dates, name = f"T{j}")
+            for j in range(4)],
+        datetime(2020, 1, 1), datetime(2020, 3, 31))
+    strategizer.n_periods = 3
+    strategizer.n_top_tickers = 2
+    strategizer.curr_aum = 1000
+    strategizer.holdings = np.array([[True, False, True, False],
+        [False, True, True, False], [True, True, False, False]])
+
+    aum = strategizer.track_aum()
+    assert list(aum.index) == list(dates[4:])
+    assert aum.iloc[0] == 1000
+    assert (aum.loc["2020-02-03":"2020-02-28"] == 1000).all()
+    march = dates[dates >= "2020-02-28"]
+    expected = 500 * (prices[-len(march):, 1] / prices[-len(march), 1]
+        + prices[-len(march):, 2] / prices[-len(march), 2])
+    assert np.allclose(aum.loc["2020-02-28":], expected)
+    assert strategizer.curr_aum == aum.iloc[-1]
+    ic = strategizer.evaluate_ic()
+    n_increase = (prices[-1, 1:3] > prices[-len(march), 1:3]).sum()
+    assert list(ic) == [-1.0, n_increase / 2 * 2 - 1]
+
+def test_ragged_universe():
+    dates = pd.bdate_range("2019-12-02", "2020-04-30")
+    rng = np.random.default_rng(2)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (len(dates), 4)),
+        axis = 0))
+    series = [pd.Series(prices[:, j], index = dates, name = f"T{j}")
+        for j in range(4)]
+    # T2 lists in February, T3 stops trading in the middle of March
+    series[2] = series[2]["2020-02-03":]
+    series[3] = series[3][:"2020-03-13"]
+    strategizer = Strategizer.__new__(Strategizer)
+    strategizer.strat = 'R'
+    strategizer.top_pct = 50
+    strategizer.curr_aum = 1000
+    strategizer.panel = PricePanel.from_series(series,
+        datetime(2020, 1, 1), datetime(2020, 4, 30))
+
+    returns = strategizer.panel.lookback_returns(10)
+    assert list(np.isfinite(returns).sum(axis = 1)) == [3, 4, 3, 3]
+    assert np.isnan(returns[0, 2]) and np.isnan(returns[2:, 3]).all()
+    n_held = strategizer.find_n_held(returns)
+    assert list(n_held) == [2, 2, 2, 2]
+    strategizer.holdings = strategizer.select_holdings(returns, n_held)
+    assert not strategizer.holdings[np.isnan(returns)].any()
+
+    # T3's position keeps its last price until the March month end
+    strategizer.holdings[1] = [False, False, False, True]
+    aum = strategizer.track_aum()
+    february_end = pd.Timestamp("2020-02-28")
+    expected = pd.Series(aum[february_end] * prices[:, 3]
+        / prices[dates == february_end, 3], index = dates)
+    assert np.allclose(aum["2020-03-02":"2020-03-13"],
+        expected["2020-03-02":"2020-03-13"])
+    assert (aum["2020-03-13":"2020-03-31"] == aum["2020-03-13"]).all()
+    assert len(strategizer.evaluate_ic()) == 3
+
+def test_daily_rebalance():
+    dates = pd.bdate_range("2020-01-01", "2020-03-31")
+    rng = np.random.default_rng(3)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (len(dates), 6)),
+        axis = 0))
+    strategizer = Strategizer.__new__(Strategizer)
+    strategizer.strat = 'R'
+    strategizer.top_pct = 50
+    strategizer.curr_aum = 1000
+    strategizer.panel = PricePanel.from_series(
+        [pd.Series(prices[:, j], index = dates, name = f"T{j}")
+            for j in range(6)],
+        datetime(2020, 2, 1), datetime(2020, 3, 31), frequency = "D")
+    returns = strategizer.panel.lookback_returns(5)
+    strategizer.holdings = strategizer.select_holdings(returns,
+        strategizer.find_n_held(returns))
+    aum = strategizer.track_aum()
+
+    # Every day, the AUM is split among the 3 highest 5-day returns
+    rows = strategizer.panel.rebalance_rows
+    assert list(aum.index) == list(dates[rows])
+    expected = [1000]
+    for row in rows[:-1]:
+        picks = np.argsort(-(prices[row] / prices[row - 5]))[:3]
+        expected.append(expected[-1]
+            * np.mean(prices[row + 1, picks] / prices[row, picks]))
+    assert np.allclose(aum, expected)
+    assert len(strategizer.evaluate_ic()) == len(rows) - 1
+
+def test_rank_ic_matches_spearman():
+    dates = pd.bdate_range("2019-10-01", "2020-06-30")
+    rng = np.random.default_rng(4)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (len(dates), 30)),
+        axis = 0))
+    series = [pd.Series(prices[:, j], index = dates, name = f"T{j}")
+        for j in range(30)]
+    # A late listing, so that some periods rank fewer tickers
+    series[0] = series[0]["2020-03-02":]
+    for strat in ['R', 'M']:
+        strategizer = Strategizer.__new__(Strategizer)
+        strategizer.strat = strat
+        strategizer.panel = PricePanel.from_series(series,
+            datetime(2020, 1, 1), datetime(2020, 6, 30))
+        strategizer.lookback_returns = \
+            strategizer.panel.lookback_returns(20)
+        rank_ic = strategizer.evaluate_rank_ic()
+
+        rows = strategizer.panel.rebalance_rows
+        for i in range(len(rows) - 1):
+            signal = pd.Series(strategizer.lookback_returns[i])
+            forward = pd.Series(strategizer.panel.prices[rows[i + 1]]
+                / strategizer.panel.prices[rows[i]] - 1)
+            ranked = signal.notna() & forward.notna()
+            expected = signal[ranked].rank().corr(forward[ranked].rank())
+            assert np.isclose(rank_ic.iloc[i],
+                expected if strat == 'R' else -expected)
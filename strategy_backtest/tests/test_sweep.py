@@ -0,0 +1,95 @@
+"""Unit tests for the Sweep class, run offline on synthetic prices."""
+import pandas as pd
+import pytest
+from backtest_strategy import check_validity
+from tools.Portfolio import Portfolio
+from tools.Sweep import Sweep
+
+def sweep_args() -> dict:
+    return check_validity({
+        "tickers": ["AAA", "BBB", "CCC", "DDD", "EEE"],
+        "b": "20180102",
+        "e": "20191231",
+        "initial_aum": 10000,
+        "strategy_type": 'M',
+        "days": 10,
+        "top_pct": 40,
+        "provider": "synthetic",
+        "fetch_rate": 1000.0
+    })
+
+def test_sweep_runs_grid_and_resumes(tmp_path):
+    output = str(tmp_path / "sweep.csv")
+    args = sweep_args()
+    sweep = Sweep(args, ["R", "M"], [10, 30], [40, 100], output, 2)
+    results = sweep.run()
+    assert list(zip(results["strategy_type"], results["days"],
+        results["top_pct"])) == sweep.configs
+    assert results["Error"].isna().all()
+
+    # Each configuration matches a backtest on the same panel
+    portfolio = Portfolio(dict(args, strategy_type = "R", days = 30),
+        sweep.panel)
+    portfolio.strategize()
+    expected = dict(portfolio.get_stats())
+    row = results[(results["strategy_type"] == "R")
+        & (results["days"] == 30) & (results["top_pct"] == 40)].iloc[0]
+    assert row["Final AUM"] == expected["8. Final AUM:"]
+
+    # Configurations already saved are not run again
+    pd.read_csv(output).iloc[:3].to_csv(output, index = False)
+    sweep = Sweep(args, ["R", "M"], [10, 30], [40, 100], output, 1)
+    resumed = sweep.run()
+    assert len(resumed) == 8
+    assert resumed["Final AUM"].tolist() == results["Final AUM"].tolist()
+
+def test_sweep_retries_failed_configurations(tmp_path):
+    output = str(tmp_path / "sweep.csv")
+    args = sweep_args()
+    sweep = Sweep(args, ["R"], [10], [40, 100], output, 1)
+    results = sweep.run()
+    results.loc[0, "Error"] = "ValueError: failed"
+    results.loc[0, "Final AUM"] = 0
+    results.to_csv(output, index = False)
+    resumed = Sweep(args, ["R"], [10], [40, 100], output, 1).run()
+    assert resumed["Error"].isna().all()
+    assert resumed["Final AUM"].tolist() == sweep.run()["Final AUM"].tolist()
+    assert resumed.loc[0, "Final AUM"] > 0
+
+def test_sweep_refuses_results_of_other_arguments(tmp_path):
+    output = str(tmp_path / "sweep.csv")
+    args = sweep_args()
+    Sweep(args, ["R"], [10], [40], output, 1).run()
+    # Other fetch settings and grids resume the same results
+    Sweep(dict(args, fetch_rate = 5.0), ["R", "M"], [10], [40], output,
+        1).run()
+    with pytest.raises(ValueError, match = "tickers differ"):
+        Sweep(dict(args, tickers = ["AAA", "BBB"]), ["R"], [10], [40],
+            output, 1).run()
+    with pytest.raises(ValueError, match = "rebalance differ"):
+        Sweep(dict(args, rebalance = "W"), ["R"], [10], [40], output,
+            1).run()
+
+def test_sweep_without_end_date_resumes(tmp_path):
+    output = str(tmp_path / "sweep.csv")
+    args = dict(sweep_args(), b = "20240102", e = None)
+    Sweep(check_validity(dict(args)), ["R"], [10], [40], output, 1).run()
+    # The end date is the current time, parsed again by every run
+    resumed = Sweep(check_validity(dict(args)), ["R"], [10], [40], output,
+        1).run()
+    assert len(resumed) == 1
+
+def test_sweep_rows_match_single_backtests(tmp_path):
+    output = str(tmp_path / "sweep.csv")
+    args = sweep_args()
+    sweep = Sweep(args, ["R", "M"], [10, 120], [40], output, 1)
+    results = sweep.run()
+    for _, row in results.iterrows():
+        # Each single backtest fetches from its own start date
+        portfolio = Portfolio(dict(args, strategy_type = row["strategy_type"],
+            days = row["days"], top_pct = row["top_pct"]))
+        portfolio.strategize()
+        for category, number in portfolio.get_stats():
+            saved = row[Sweep.column_name(category)]
+            if isinstance(number, float):
+                assert saved == number or (pd.isna(saved) and pd.isna(number))
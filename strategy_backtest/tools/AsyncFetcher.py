@@ -0,0 +1,342 @@
+"""Module containing the AsyncFetcher class, an asyncio layer that
+downloads price data with a concurrency limit, rate limiting, retries
+and timeouts, along with the counters it exposes for monitoring."""
+
+import asyncio
+from datetime import datetime
+import functools
+import random
+import threading
+import time
+from typing import Callable
+import numpy as np
+import pandas as pd
+from tools.Providers import MissingDataError, Provider, YFinanceProvider, \
+    create_provider
+
+# Errors caused by the request itself, which retrying will not fix. Other
+# ValueErrors, e.g. the JSONDecodeError of a truncated response, are
+# transient.
+NON_RETRYABLE_ERRORS = (OverflowError, TypeError, KeyError, MissingDataError)
+
+class TokenBucket:
+    """Token bucket rate limiter for coroutines.
+
+    Tokens are added at a constant rate up to the bucket's capacity,
+    and every request takes one token, waiting if there is none left.
+
+    Attributes:
+        rate: tokens added per second
+        capacity: maximum number of tokens, i.e. the allowed burst
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        if rate <= 0:
+            raise ValueError("Rate limit must be positive.")
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = None
+
+    def reset_lock(self) -> None:
+        """Forgets the lock, when its event loop is closed"""
+        self._lock = None
+
+    async def acquire(self) -> None:
+        """Waits until a token is available and takes it"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # Lock so that waiting requests are served in order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity,
+                    self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class FetchStats:
+    """Counters of the requests made through an AsyncFetcher.
+
+    Attributes:
+        n_requests: number of tickers requested
+        n_success: number of requests that eventually succeeded
+        n_empty: number of requests that returned no bars after all
+            retries, counted as successes
+        n_failures: number of requests that failed after all retries
+        n_retries: number of retried attempts
+        n_timeouts: number of attempts that timed out
+        latencies: seconds taken by each successful attempt
+    """
+
+    def __init__(self) -> None:
+        self.n_requests = 0
+        self.n_success = 0
+        self.n_empty = 0
+        self.n_failures = 0
+        self.n_retries = 0
+        self.n_timeouts = 0
+        self.latencies = []
+
+    def summary(self) -> dict:
+        """Summarizes the counters and latency percentiles (in ms)"""
+        latencies = np.array(self.latencies) * 1000
+        has_latency = latencies.size > 0
+        return {
+            "requests": self.n_requests,
+            "success": self.n_success,
+            "empty": self.n_empty,
+            "failures": self.n_failures,
+            "retries": self.n_retries,
+            "timeouts": self.n_timeouts,
+            "p50_latency_ms": np.percentile(latencies, 50) \
+                if has_latency else None,
+            "p99_latency_ms": np.percentile(latencies, 99) \
+                if has_latency else None
+        }
+
+    def __str__(self) -> str:
+        summary = self.summary()
+        latency = "n/a" if summary["p50_latency_ms"] is None else \
+            f"p50 {summary['p50_latency_ms']:.0f} ms, " \
+            f"p99 {summary['p99_latency_ms']:.0f} ms"
+        return (f"{summary['requests']} requests, "
+            f"{summary['failures']} failed, {summary['empty']} empty, "
+            f"{summary['retries']} retries, "
+            f"{summary['timeouts']} timeouts, latency {latency}")
+
+class AsyncFetcher:
+    """asyncio layer through which all price data is downloaded.
+
+    Each attempt waits for a free slot among max_concurrency, then for
+    a token of the rate limiter, and is then run in a worker thread
+    with a timeout. A slot is only freed once its thread has finished,
+    even if the attempt timed out before, so that abandoned downloads
+    still count towards max_concurrency. Failed attempts are retried
+    with jittered exponential backoff, unless the error is caused by
+    the request itself (see NON_RETRYABLE_ERRORS). Empty responses are
+    retried EMPTY_RETRIES times, since yfinance reports some failures by
+    returning an empty Dataframe, but periods without bars are common
+    too, so the empty response is then returned as it is.
+
+    The event loop runs in its own daemon thread, so that synchronous
+    code in any thread can submit requests with fetch_sync or
+    fetch_many, and all of them share the same limits. close, or the
+    end of a with block, stops the thread. It is started again by the
+    next request.
+
+    Attributes:
+        download: blocking function downloading (ticker, start, end),
+            usually a Provider. Defaults to yfinance.
+        max_concurrency: maximum number of requests in flight
+        rate: maximum number of attempts started per second
+        max_retries: number of retries after the first attempt
+        timeout: seconds after which an attempt is abandoned
+        base_delay: backoff delay of the first retry, in seconds
+        max_delay: maximum backoff delay, in seconds
+        stats: counters of the requests made so far
+        EMPTY_RETRIES: number of retries after an empty response
+    """
+    EMPTY_RETRIES = 1
+
+    def __init__(self,
+        download: Callable[[str, datetime, datetime], pd.DataFrame] = None,
+        max_concurrency: int = 8,
+        rate: float = 10.0,
+        max_retries: int = 3,
+        timeout: float = 30.0,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0) -> None:
+        if max_concurrency < 1:
+            raise ValueError("Need at least 1 concurrent request.")
+        if max_retries < 0:
+            raise ValueError("Number of retries cannot be negative.")
+        self.download = download if download is not None \
+            else YFinanceProvider()
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = FetchStats()
+        self._loop = None
+        self._thread = None
+        self._loop_lock = threading.Lock()
+        self._semaphore = None
+        self._bucket = TokenBucket(rate, capacity = max_concurrency)
+
+    @classmethod
+    def from_args(cls, args: dict, download: Callable = None):
+        """Creates the layer from the optional fetch-related CLI arguments
+
+        Unless a download function is given, bars are downloaded from
+        the provider selected with --provider.
+        """
+        return cls(download if download is not None \
+            else create_provider(args),
+            max_concurrency = args.get("fetch_concurrency", 8),
+            rate = args.get("fetch_rate", 10.0),
+            max_retries = args.get("fetch_retries", 3),
+            timeout = args.get("fetch_timeout", 30.0))
+
+    @property
+    def source(self) -> str:
+        """Name of the provider bars are downloaded from"""
+        if isinstance(self.download, Provider):
+            return self.download.name
+        return getattr(self.download, "__name__", "custom")
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Starts the background event loop on first use"""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target = self._loop.run_forever,
+                    name = "AsyncFetcher", daemon = True)
+                self._thread.start()
+        return self._loop
+
+    def close(self) -> None:
+        """Stops the background event loop and waits for its thread
+
+        Downloads still running, e.g. after their attempt timed out,
+        are waited for first.
+        """
+        with self._loop_lock:
+            if self._loop is None:
+                return
+            asyncio.run_coroutine_threadsafe(self._wait_downloads(),
+                self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+            self._thread = None
+            # Both are bound to the stopped loop
+            self._semaphore = None
+            self._bucket.reset_lock()
+
+    @staticmethod
+    async def _wait_downloads() -> None:
+        """Waits for every other task of the event loop to finish"""
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        await asyncio.gather(*tasks, return_exceptions = True)
+
+    def __enter__(self) -> "AsyncFetcher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _backoff(self, attempt: int) -> float:
+        """Returns a random delay before retrying (full jitter)"""
+        return random.uniform(0,
+            min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def fetch(self,
+        ticker: str,
+        start: datetime,
+        end: datetime) -> pd.DataFrame:
+        """Downloads the bars of a ticker, retrying transient failures
+
+        Args:
+            ticker: ticker to download
+            start: first date to download
+            end: date to stop downloading at (exclusive)
+
+        Returns:
+            Dataframe returned by the download function
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.stats.n_requests += 1
+        df = None
+        n_empty = 0
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                self.stats.n_retries += 1
+                await asyncio.sleep(self._backoff(attempt - 1))
+            await self._semaphore.acquire()
+            await self._bucket.acquire()
+            start_time = time.perf_counter()
+            download = asyncio.ensure_future(asyncio.to_thread(
+                self.download, ticker, start, end))
+            download.add_done_callback(
+                functools.partial(self._release_slot, self._semaphore))
+            try:
+                # Shielded, so that a timeout leaves the thread's slot taken
+                df = await asyncio.wait_for(asyncio.shield(download),
+                    self.timeout)
+            except NON_RETRYABLE_ERRORS:
+                self.stats.n_failures += 1
+                raise
+            except asyncio.TimeoutError as err:
+                self.stats.n_timeouts += 1
+                last_err = TimeoutError(f"Fetching {ticker} timed out "
+                    f"after {self.timeout} seconds")
+                last_err.__cause__ = err
+            except Exception as err: # pylint: disable=broad-except
+                last_err = err
+            else:
+                self.stats.latencies.append(time.perf_counter() - start_time)
+                if not self._is_empty(df):
+                    self.stats.n_success += 1
+                    return df
+                last_err = None
+                n_empty += 1
+                if n_empty > self.EMPTY_RETRIES:
+                    break
+        if last_err is None:
+            self.stats.n_success += 1
+            self.stats.n_empty += 1
+            return df
+        self.stats.n_failures += 1
+        raise last_err
+
+    @staticmethod
+    def _release_slot(semaphore: asyncio.Semaphore,
+        download: asyncio.Future) -> None:
+        """Frees the slot of a finished download thread"""
+        semaphore.release()
+        # Marks the error of an abandoned download as retrieved
+        if not download.cancelled():
+            download.exception()
+
+    @staticmethod
+    def _is_empty(df) -> bool:
+        """Whether a download returned no bars"""
+        return isinstance(df, pd.DataFrame) and len(df) == 0
+
+    async def _fetch_all(self, requests: list) -> list:
+        """Fetches all requests concurrently, keeping errors as results"""
+        return await asyncio.gather(
+            *(self.fetch(*request) for request in requests),
+            return_exceptions = True)
+
+    def fetch_sync(self,
+        ticker: str,
+        start: datetime,
+        end: datetime) -> pd.DataFrame:
+        """Blocking version of fetch, which can be called from any thread"""
+        return asyncio.run_coroutine_threadsafe(
+            self.fetch(ticker, start, end), self._get_loop()).result()
+
+    def fetch_many(self,
+        requests: "list[tuple[str, datetime, datetime]]") -> list:
+        """Fetches many (ticker, start, end) requests concurrently
+
+        Args:
+            requests: list of (ticker, start, end) tuples
+
+        Returns:
+            List with, for every request in order, its Dataframe or
+            the exception that made it fail
+        """
+        return asyncio.run_coroutine_threadsafe(
+            self._fetch_all(requests), self._get_loop()).result()
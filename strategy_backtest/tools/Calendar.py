@@ -0,0 +1,95 @@
+"""Module containing the Calendar class, which finds the last trading
+day of every day, week, month or quarter of a universe's trading dates at
+once, and maps the dates of each ticker onto those trading dates."""
+
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+class Calendar:
+    """Shared trading calendar of a universe of tickers
+
+    Periods are identified by integers computed from the dates with
+    numpy datetime arithmetic, so the last trading day of every period
+    is found with one comparison of consecutive dates, without grouping.
+
+    Attributes:
+        dates: sorted, unique trading dates of the universe
+        FREQUENCIES: supported period lengths, D(ay), W(eek), M(onth)
+            and Q(uarter)
+    """
+    FREQUENCIES = ["D", "W", "M", "Q"]
+
+    def __init__(self, dates: pd.DatetimeIndex) -> None:
+        self.dates = dates
+
+    @classmethod
+    def from_union(cls, indexes: "list[pd.DatetimeIndex]") -> "Calendar":
+        """Builds the calendar of the trading dates of any ticker
+
+        Args:
+            indexes: trading dates of each ticker, without timezone
+
+        Returns:
+            Calendar of the union of the dates
+        """
+        all_days = np.unique(np.concatenate([index.values.astype(
+            "datetime64[ns]") for index in indexes]))
+        return cls(pd.DatetimeIndex(all_days, name = "Date"))
+
+    def rows_of(self, dates: pd.DatetimeIndex) -> np.ndarray:
+        """Maps dates of the calendar to their rows
+
+        Args:
+            dates: sorted dates, all of which are in the calendar
+
+        Returns:
+            Array of the row of each date
+        """
+        return np.searchsorted(self.dates.values,
+            dates.values.astype("datetime64[ns]"))
+
+    def period_ids(self, frequency: str) -> np.ndarray:
+        """Numbers the period every date falls in
+
+        Args:
+            frequency: one of FREQUENCIES
+
+        Returns:
+            Array of integers, equal for dates of the same period
+        """
+        if frequency not in self.FREQUENCIES:
+            raise ValueError(f"Unknown frequency {frequency}, "
+                f"choose one of {', '.join(self.FREQUENCIES)}.")
+        if frequency in ["D", "W"]:
+            days = self.dates.values.astype("datetime64[D]").astype(np.int64)
+            # Day 0 is a Thursday, so that weeks start on Mondays
+            return days if frequency == "D" else (days + 3) // 7
+        months = self.dates.values.astype("datetime64[M]").astype(np.int64)
+        return months if frequency == "M" else months // 3
+
+    def period_end_rows(self,
+        frequency: str,
+        begin_date: datetime = None,
+        end_date: datetime = None) -> np.ndarray:
+        """Finds the rows of the last trading day of every period
+
+        The last date of the calendar always closes a period, even if
+        the period is not over yet.
+
+        Args:
+            frequency: one of FREQUENCIES
+            begin_date: first date to include, if any
+            end_date: last date to include, if any
+
+        Returns:
+            Array of rows whose date is the last of its period, and
+            between begin_date and end_date
+        """
+        ids = self.period_ids(frequency)
+        is_period_end = np.append(ids[1:] != ids[:-1], True)
+        if begin_date is not None:
+            is_period_end &= self.dates >= begin_date
+        if end_date is not None:
+            is_period_end &= self.dates <= end_date
+        return np.flatnonzero(is_period_end)
@@ -5,8 +5,11 @@ Class."""
 
 from datetime import datetime, timedelta
 from math import ceil
-import yfinance as yf
+import numpy as np
 import pandas as pd
+from tools.AsyncFetcher import AsyncFetcher
+from tools.Providers import MissingDataError
+from tools.PricePanel import PricePanel
 
 class Fetcher:
     """Class that fetches data about multiple tickers
@@ -16,22 +19,46 @@ class Fetcher:
     or not.
 
     Attributes:
-        n_months: number of months that rebalancing is done
-        begin_date: date of which position is taken at end of month
+        n_periods: number of periods that rebalancing is done
+        begin_date: date from which positions are taken at the end of
+            each rebalance period
+        frequency: rebalance frequency, D(aily), W(eekly), M(onthly)
+            or Q(uarterly)
         end_date: final day to take position
         days: number of days used to compute strategy-related returns
-        data: Raw financial information about ticker
+        fetch_layer: AsyncFetcher that rate limits and retries downloads
+        price_dtype: dtype the adjusted close is stored as
+        panel: PricePanel of the adjusted closes of all tickers
         LINE_SEPARATOR: Constant in line separating for presentability
     """
-    def __init__(self, args: dict) -> None:
-        self.n_months = None
+    def __init__(self,
+        args: dict,
+        panel: PricePanel = None,
+        adjust: bool = True) -> None:
+        self.n_periods = None
         self.LINE_SEPARATOR = "*" * 50
         self.begin_date = args["b"]
         self.end_date = args["e"]
+        self.frequency = args.get("rebalance", "M")
         self.strat = args["strategy_type"]
         self.days = args["days"] if self.strat == "R" \
             else args["days"] + 20
-        self.data = self.setup_data(args["tickers"])
+        self.fetch_layer = AsyncFetcher.from_args(args)
+        self.price_dtype = np.float32 if args.get("float32", False) \
+            else np.float64
+        # A panel fetched before, e.g. by a sweep, is reused, adjusted
+        # from this backtest's own fetch start if it is unadjusted
+        if panel is None:
+            panel = self.setup_data(args["tickers"], adjust)
+        elif panel.dividends is not None and adjust:
+            panel = panel.adjusted(self.fetch_start(), self.price_dtype)
+        self.frequency = panel.frequency
+        self.n_periods = len(panel.rebalance_rows)
+        if self.n_periods < 2:
+            raise ValueError(f"--b, --e: Only {self.n_periods} rebalance "
+                f"date(s) at frequency {self.frequency}, a backtest needs "
+                "at least 2.")
+        self.panel = panel
 
     def determine_period(self, days: int) -> int:
         """Conservatively Determines which day to start fetching data
@@ -48,43 +75,91 @@ class Fetcher:
         # Timing window if strategy is Reversal
         return ceil(10 + (7 / 4 * days))
 
+    def fetch_start(self) -> datetime:
+        """First date data is fetched from, see determine_period"""
+        return self.begin_date - \
+            timedelta(days = self.determine_period(self.days))
 
-    def setup_data(self, tickers: "list[str]") -> dict:
+    def setup_data(self,
+        tickers: "list[str]",
+        adjust: bool = True) -> PricePanel:
         """Setups up data so that it is more easily processed
 
-        Maps tickers to its respective last trading days and processed
-        dataframe so that data is well set up for calculation later on.
+        Aligns the adjusted closes of all tickers into one price panel,
+        with the rows of the last trading days of each period, so that
+        data is well set up for calculation later on. Tickers without
+        any data are reported and left out of the panel.
 
         Args:
             tickers: list of tickers being tracked
+            adjust: if False, the panel keeps the unadjusted closes and
+                the dividends, so that it can be adjusted from any later
+                start date, see PricePanel.adjusted
 
         Returns:
-            dictionary of tickers as keys and its data as values
+            PricePanel of the adjusted closes of the tickers
         """
-        # self.data contains tickers, mapped to its data frame and
-        # last trading day. Essentially, data is a dict of dict
-        data = {ticker: {} for ticker in tickers}
-        start_retrieve = self.begin_date - \
-            timedelta(days = self.determine_period(self.days))
+        start_retrieve = self.fetch_start()
         end_retrieve = self.end_date
-        # Initialize data for each ticker
+        # Download all tickers concurrently, then initialize their data
         print(self.LINE_SEPARATOR)
-        for ticker in tickers:
-            print(f"Retrieving yfinance data for {ticker}")
-            ticker_df = self.fetch_data(ticker, start_retrieve, end_retrieve)
-            processed_df = self.process_df(ticker_df)
-            last_trading_days = self.find_last_days(ticker, ticker_df)
-            data[ticker]["df"] = processed_df
-            data[ticker]["last_days"] = last_trading_days
+        print(f"Retrieving {self.fetch_layer.source} data for "
+            f"{len(tickers)} tickers")
+        # The fetch layer's event loop is stopped once all are fetched
+        with self.fetch_layer:
+            results = self.fetch_layer.fetch_many([(ticker, start_retrieve,
+                end_retrieve) for ticker in tickers])
+        fetched_bytes = 0
+        closes = []
+        dividends = []
+        missing = []
+        for i, ticker in enumerate(tickers):
+            try:
+                ticker_df = self.check_fetched(ticker, results[i],
+                    start_retrieve, end_retrieve)
+            except MissingDataError:
+                missing.append(ticker)
+                continue
+            finally:
+                # Raw bars are released as soon as they are processed
+                results[i] = None
+            fetched_bytes += ticker_df.memory_usage(deep = True).sum()
+            if adjust:
+                closes.append(self.process_df(ticker_df)["Close_Adjusted"]
+                    .rename(ticker))
+            else:
+                closes.append(ticker_df["Close"].astype(np.float64)
+                    .rename(ticker))
+                dividends.append(ticker_df["Dividends"])
+        if len(missing) > 0:
+            print(f"No data available for {len(missing)} tickers, left out "
+                f"of the backtest: {', '.join(missing)}")
+        if len(closes) == 0:
+            raise ValueError("No data available for any ticker.")
+        if adjust:
+            panel = PricePanel.from_series(closes, self.begin_date,
+                self.end_date, self.price_dtype, self.frequency)
+        else:
+            panel = PricePanel.from_series(closes, self.begin_date,
+                self.end_date, np.float64, self.frequency, dividends)
+        del closes, dividends
+        self.check_panel(panel)
         print("Raw data for all necessary tickers fetched")
+        print(f"Memory per ticker: "
+            f"{fetched_bytes / len(panel.tickers) / 1024:.1f} KiB fetched, "
+            f"{panel.nbytes / len(panel.tickers) / 1024:.1f} KiB kept")
+        print(f"Downloads: {self.fetch_layer.stats}")
         print(self.LINE_SEPARATOR)
-        return data
+        return panel
 
     def fetch_data(self, ticker: str,
             start_retri: datetime,
             end_retri: datetime
         ) -> pd.DataFrame:
-        """Fetches relevant financial data from the yfinance tracker.
+        """Fetches relevant financial data from the selected provider.
+
+        The download goes through the fetch layer, so it is retried
+        on transient failures and counts towards the rate limit.
 
         Args:
             tickers: name of ticker being tracked
@@ -94,14 +169,37 @@ class Fetcher:
         Returns:
             Dataframe of financial data from the given ticker
         """
-        tracker = yf.Ticker(ticker)
+        with self.fetch_layer:
+            result = self.fetch_layer.fetch_many(
+                [(ticker, start_retri, end_retri)])[0]
+        return self.check_fetched(ticker, result, start_retri, end_retri)
+
+    def check_fetched(self, ticker: str,
+            result,
+            start_retri: datetime,
+            end_retri: datetime
+        ) -> pd.DataFrame:
+        """Checks the result of a download from the fetch layer
+
+        Args:
+            ticker: name of ticker being tracked
+            result: downloaded Dataframe, or the error the download raised
+            start_retri: date to start retrieving data from
+            end_retri: final date to retrieve data from
+
+        Returns:
+            Dataframe of financial data from the given ticker
+
+        Raises:
+            MissingDataError: if the provider has no data for the ticker
+        """
         try:
-            df: pd.DataFrame = tracker.history(
-                start = start_retri,
-                end = end_retri
-            )[start_retri: end_retri]
+            if isinstance(result, BaseException):
+                raise result
+            df: pd.DataFrame = result[start_retri: end_retri]
             if len(df) == 0:
-                raise Exception(f"No data available for ticker {ticker}")
+                raise MissingDataError(
+                    f"No data available for ticker {ticker}")
             return df
         except OverflowError as err:
             raise ValueError(
@@ -111,43 +209,37 @@ class Fetcher:
             raise err
 
     def process_df(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Adds the stocks adjusted for dividends column to df
+        """Computes the stocks adjusted for dividends, dropping the rest
+
+        Only the adjusted close is read afterwards, so the other columns
+        are dropped. Dividends are accumulated in float64 before the sum
+        is stored as price_dtype.
 
         Args:
             df: dataframe of data w/o stocks adjusted for dividends
 
         Returns:
-            dataframe of data with stocks adjusted for dividends
+            dataframe with only the stocks adjusted for dividends
         """
         # cumsum used for Culminative Dividends
-        df["Close_Adjusted"] = (
-            df["Close"] + df["Dividends"].cumsum()
-        )
-        return df
+        close_adjusted = df["Close"].to_numpy(dtype = np.float64, copy = True)
+        close_adjusted += np.cumsum(df["Dividends"].to_numpy())
+        return pd.DataFrame({
+            "Close_Adjusted": close_adjusted.astype(
+                self.price_dtype, copy = False)
+        }, index = df.index)
 
-    def find_last_days(self, ticker: str, df: pd.DataFrame) -> "list":
-        """Finds the last days of the month for each ticker
+    def check_panel(self, panel: PricePanel) -> None:
+        """Reports the tickers that do not trade on every rebalance date
 
-        Circumvents the possibility that each ticker
-        might have different trading days
+        Such tickers, e.g. listed or delisted within the period, are
+        only ranked in the periods they trade on the rebalance date.
 
         Args:
-            ticker: stock to track
-            df: dataframe of financial data with date as index
-
-        Returns:
-            list of last trading days of the month for given ticker
+            panel: PricePanel of the tickers
         """
-        dates_idx = df.loc[
-            df.groupby(df.index.to_period('M')).apply(lambda x: x.index.max())
-        ].index
-        dates_list = dates_idx.to_list()
-        dates_np_filter = list(filter(lambda x:
-            self.begin_date <= x <= self.end_date, dates_list
-        ))
-        # Check if stocks have the same time-frame
-        if self.n_months is None:
-            self.n_months = len(dates_np_filter)
-        elif self.n_months != len(dates_np_filter):
-            raise ValueError(f"{ticker} might not be trading in entire period")
-        return dates_np_filter
+        traded = panel.mask[panel.rebalance_rows].all(axis = 0)
+        n_ragged = len(traded) - traded.sum()
+        if n_ragged > 0:
+            print(f"{n_ragged} tickers do not trade on every rebalance date, "
+                "and are only ranked while trading")
@@ -5,30 +5,48 @@ documnetation to occupy minimal space and minimize clutter.
 """
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.lines as mlines
+from tools.PricePanel import PricePanel
 from tools.Strategizer import Strategizer
+from tools.plotting import decimate_series, load_pyplot, save_figure
 
 class Portfolio(Strategizer):
     """Class that computes the relevant statistics of the portfolio.
 
     In detail, this class computes relevant information about the portfolio
-    which is shown below and also plots the graph of the culminative IC
-    and returns on the same axis.
+    which is shown below and also plots the graph of the culminative IC,
+    the culminative rank IC and returns on the same axis.
 
     Attributes:
         YEAR_TO_TRADING_DAYS: constant set at 250.
+        plot_async: whether the graph is saved by a background worker
     """
-    def __init__(self, args: dict) -> None:
-        super().__init__(args)
+    def __init__(self, args: dict, panel: PricePanel = None) -> None:
+        super().__init__(args, panel)
         self.YEAR_TO_TRADING_DAYS = 250
+        self.plot_async = args.get("plot_async", False)
 
     def print_stats(self) -> None:
         """Overall function that prints relevant statistics relating to AUM
 
         In essence, this function computes all relevant statistics to the AUM
-        then prints all the information as elaborated below
+        then prints all the information as elaborated in get_stats
         """
+        print(self.LINE_SEPARATOR)
+        print("Relevant Information of AUM over time:")
+        for category, number in self.get_stats():
+            print(category, number)
+
+    def get_stats(self) -> "list[tuple]":
+        """Computes all relevant statistics relating to AUM
+
+        Every statistic is computed from one NumPy view of the daily AUM
+        and one array of its daily returns, without copying the series.
+
+        Returns:
+            List of (category, number) pairs, in printing order
+        """
+        aum = self.daily_aum_hist.to_numpy()
+        returns = self.get_daily_returns(aum)
         start = self.get_start_date()
         end = self.get_end_date()
         # Not sure about total stock returns, but I'm assuming
@@ -38,7 +56,10 @@ class Portfolio(Strategizer):
         init_aum = self.get_init_aum()
         final_aum = self.get_final_aum()
         avg_daily_aum_return = self.get_avg_daily_aum_return(total_aum_return)
-        daily_sd_aum = self.get_sd_daily_aum()
+        daily_sd_aum = self.get_sd_daily_aum(returns)
+        annualized_ror = self.get_annualized_ror(total_aum_return)
+        max_drawdown, max_drawdown_days = self.get_max_drawdown(aum)
+        skewness, kurtosis = self.get_skew_kurtosis(returns)
 
         statistics = [
             ("1. Begin Date:", start),
@@ -46,21 +67,35 @@ class Portfolio(Strategizer):
             ("3. Number of Calender days:", self.get_calender_days(end, start)),
             ("4. Total Stock Return:", total_stock_return),
             ("5. Total AUM Return:", total_aum_return),
-            ("6. Annualized RoR:", self.get_annualized_ror(total_aum_return)),
+            ("6. Annualized RoR:", annualized_ror),
             ("7. Initial AUM:", init_aum),
             ("8. Final AUM:", final_aum),
-            ("9. Average daily AUM:", self.get_avg_daily_aum()),
-            ("10. Maximum daily AUM:", self.get_max_daily_aum()),
+            ("9. Average daily AUM:", self.get_avg_daily_aum(aum)),
+            ("10. Maximum daily AUM:", self.get_max_daily_aum(aum)),
             ("11. PnL of AUM Invested:", self.get_pnl_aum(init_aum, final_aum)),
             ("12. Average daily AUM return:", avg_daily_aum_return),
             ("13. Daily S.D of portfolio returns:", daily_sd_aum),
             ("14. Daily Sharpe Ratio of portfolio", \
-                self.get_daily_sharpe_ratio(daily_sd_aum, avg_daily_aum_return))
+                self.get_daily_sharpe_ratio(daily_sd_aum,
+                    avg_daily_aum_return)),
+            ("15. Maximum drawdown:", max_drawdown),
+            ("16. Maximum drawdown duration (trading days):",
+                max_drawdown_days),
+            ("17. Daily Sortino Ratio of portfolio:",
+                self.get_daily_sortino_ratio(returns, avg_daily_aum_return)),
+            ("18. Calmar Ratio:",
+                self.get_calmar_ratio(annualized_ror, max_drawdown)),
+            ("19. Hit rate of daily returns:", self.get_hit_rate(returns)),
+            ("20. Average turnover per rebalance:", self.get_turnover()),
+            ("21. Skewness of daily returns:", skewness),
+            ("22. Excess kurtosis of daily returns:", kurtosis)
         ]
-        print(self.LINE_SEPARATOR)
-        print("Relevant Information of AUM over time:")
-        for category, number in statistics:
-            print(category, number)
+        return statistics
+
+    def get_daily_returns(self, aum: np.ndarray = None) -> np.ndarray:
+        """Returns daily AUM returns, from a view of the AUM series"""
+        aum = self.daily_aum_hist.to_numpy() if aum is None else aum
+        return aum[1:] / aum[:-1] - 1
 
     def get_start_date(self) -> pd.Timestamp:
         """Returns first trading day for portfolio"""
@@ -76,8 +111,8 @@ class Portfolio(Strategizer):
 
     def get_aum_return(self) -> float:
         """Returns total AUM returns over the period"""
-        init_aum = self.daily_aum_hist[0]
-        final_aum = self.daily_aum_hist[-1]
+        init_aum = self.daily_aum_hist.iloc[0]
+        final_aum = self.daily_aum_hist.iloc[-1]
         return (final_aum - init_aum) / init_aum
 
     def get_annualized_ror(self, total_aum_return: np.float64) -> np.float64:
@@ -88,19 +123,21 @@ class Portfolio(Strategizer):
 
     def get_init_aum(self) -> np.float64:
         """Returns Initial AUM (Same as inputted parameter)"""
-        return self.daily_aum_hist[0]
+        return self.daily_aum_hist.iloc[0]
 
     def get_final_aum(self) -> np.float64:
         """Returns Final AUM over the period"""
-        return self.daily_aum_hist[-1]
+        return self.daily_aum_hist.iloc[-1]
 
-    def get_avg_daily_aum(self) -> np.float64:
+    def get_avg_daily_aum(self, aum: np.ndarray = None) -> np.float64:
         """Returns average daily AUM over the period"""
-        return self.daily_aum_hist.mean()
+        aum = self.daily_aum_hist.to_numpy() if aum is None else aum
+        return aum.mean()
 
-    def get_max_daily_aum(self) -> np.float64:
+    def get_max_daily_aum(self, aum: np.ndarray = None) -> np.float64:
         """Returns maximum AUM over the period"""
-        return self.daily_aum_hist.max()
+        aum = self.daily_aum_hist.to_numpy() if aum is None else aum
+        return aum.max()
 
     def get_pnl_aum(self,
         init_aum: np.float64,
@@ -113,11 +150,10 @@ class Portfolio(Strategizer):
         """Returns average daily return of stock"""
         return total_aum_return / self.daily_aum_hist.size
 
-    def get_sd_daily_aum(self) -> np.float64:
+    def get_sd_daily_aum(self, returns: np.ndarray = None) -> np.float64:
         """Returns daily AUM standard deviation over the period"""
-        aum_copy = self.daily_aum_hist.copy()
-        pct_change = aum_copy.pct_change().dropna()
-        return pct_change.std()
+        returns = self.get_daily_returns() if returns is None else returns
+        return returns.std(ddof = 1)
 
     def get_daily_sharpe_ratio(
         self, daily_aum_sd: np.float64,
@@ -126,41 +162,101 @@ class Portfolio(Strategizer):
         """Returns daily AUM Sharpe ratio over the period"""
         return (avg_daily_aum_return - risk_free) / daily_aum_sd
 
+    def get_max_drawdown(self,
+        aum: np.ndarray = None) -> "tuple[np.float64, int]":
+        """Returns the largest fall of AUM from a previous peak, and the
+        largest number of trading days spent below a previous peak"""
+        aum = self.daily_aum_hist.to_numpy() if aum is None else aum
+        peaks = np.maximum.accumulate(aum)
+        days = np.arange(len(aum))
+        # Days since the last day AUM was at its peak
+        last_peak = np.maximum.accumulate(np.where(aum >= peaks, days, 0))
+        return (aum / peaks - 1).min(), int((days - last_peak).max())
+
+    def get_daily_sortino_ratio(
+        self, returns: np.ndarray,
+        avg_daily_aum_return: np.float64,
+        risk_free: np.float64 = np.float64(0.0001)) -> np.float64:
+        """Returns daily AUM Sortino ratio, the Sharpe ratio of 14. with
+        the deviation of negative daily returns only"""
+        downside_sd = np.sqrt(np.mean(np.minimum(returns, 0) ** 2))
+        if downside_sd == 0:
+            return np.nan
+        return (avg_daily_aum_return - risk_free) / downside_sd
+
+    def get_calmar_ratio(self,
+        annualized_ror: np.float64,
+        max_drawdown: np.float64) -> np.float64:
+        """Returns annualized RoR over the maximum drawdown"""
+        if max_drawdown == 0:
+            return np.nan
+        return annualized_ror / abs(max_drawdown)
+
+    def get_hit_rate(self, returns: np.ndarray) -> np.float64:
+        """Returns fraction of days that the AUM rose"""
+        return (returns > 0).mean()
+
+    def get_turnover(self) -> np.float64:
+        """Returns average fraction of AUM traded at each rebalance after
+        the first, from the change of the target equal weights"""
+        n_held = self.holdings.sum(axis = 1, keepdims = True)
+        weights = self.holdings / np.maximum(n_held, 1)
+        return np.abs(np.diff(weights, axis = 0)).sum(axis = 1).mean() / 2
+
+    def get_skew_kurtosis(self,
+        returns: np.ndarray) -> "tuple[np.float64, np.float64]":
+        """Returns skewness and excess kurtosis of daily returns"""
+        deviations = returns - returns.mean()
+        variance = np.mean(deviations ** 2)
+        if variance == 0:
+            return np.nan, np.nan
+        skewness = np.mean(deviations ** 3) / variance ** 1.5
+        kurtosis = np.mean(deviations ** 4) / variance ** 2 - 3
+        return skewness, kurtosis
+
     def plot_graph(self):
-        """Graphs both culminative IC and AUM on same pyplot.
+        """Graphs culminative IC, rank IC and AUM on same pyplot.
 
-        This function takes both IC, AUM pandas series and
+        This function takes the IC, rank IC and AUM pandas series and
         plots them. However, some care is taken to re-scale the
         axis to make both graphs prominent and also implementing
-        appropriate legends.
+        appropriate legends. Long histories are decimated with LTTB
+        before being plotted.
         """
+        plt = load_pyplot()
+        # pylint: disable=import-outside-toplevel
+        import matplotlib.lines as mlines
         plt.style.use("fivethirtyeight")
         fig, ax = plt.subplots(figsize = (16, 10))
         # plot daily aum hist first
-        ax.plot(self.daily_aum_hist, color = "red")
+        ax.plot(decimate_series(self.daily_aum_hist), color = "red")
         ax.set_xlabel("Date by Year and Month", fontsize = 14)
         ax.set_ylabel("AUM over time", color = "red", fontsize = 14)
 
         # then plot culminative information coefficient
         ax2 = ax.twinx()
-        ax2.plot(self.cul_info_coef, color = "blue")
+        ax2.plot(decimate_series(self.cul_info_coef), color = "blue")
+        # and the culminative rank IC of the signal over all tickers
+        ax2.plot(decimate_series(self.cul_rank_ic.dropna()), color = "green")
         ax2.set_ylabel("Culminative information coefficient",
             color = "blue", fontsize = 14)
 
         # make x labels slightly smaller to minimize overlap
         for tick in ax.xaxis.get_major_ticks():
-            tick.label.set_fontsize(10)
+            tick.label1.set_fontsize(10)
 
         # make legend via brute force
         reds_line = mlines.Line2D([], [],
             color = 'red', label = 'AUM over time')
         blue_line = mlines.Line2D([], [],
             color = 'blue', label='Culminative Information Coefficient')
-        plt.legend(handles = [blue_line, reds_line])
+        green_line = mlines.Line2D([], [],
+            color = 'green', label = 'Culminative Rank IC (all tickers)')
+        plt.legend(handles = [blue_line, green_line, reds_line])
 
         # Once done, save the figure
-        fig.savefig(
+        save_figure(plt, fig,
             "./graphs/plot_aum_and_ic.jpg",
+            self.plot_async,
             format = "jpeg",
         )
-        plt.show()
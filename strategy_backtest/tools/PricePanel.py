@@ -0,0 +1,172 @@
+"""Module containing the PricePanel class, which holds the adjusted
+closes of every ticker in one aligned (trading dates x tickers) array,
+so that the backtest reads whole rows and columns instead of looking
+up each ticker's DataFrame by date."""
+
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from tools.Calendar import Calendar
+
+class PricePanel:
+    """Adjusted closes of a universe of tickers on a shared date index
+
+    Row i of prices holds the adjusted close of every ticker on dates[i].
+    The dates are the union of the tickers' trading days. A ticker that
+    did not trade on a date carries its last price forward, and is
+    marked as not traded in the mask. Before its first trading day, its
+    prices are NaN.
+
+    A panel built with dividends holds the unadjusted closes instead,
+    so that backtests fetched from different start dates can each get
+    their own adjusted panel from it, see adjusted.
+
+    Attributes:
+        tickers: tickers of the columns, in order
+        dates: shared trading dates of the rows
+        prices: 2-D array of adjusted closes, dates x tickers
+        mask: 2-D boolean array of whether the ticker traded on the date
+        begin_date: first date positions can be taken on
+        end_date: last date positions can be taken on
+        frequency: rebalance frequency, one of Calendar.FREQUENCIES
+        calendar: Calendar of the dates
+        rebalance_rows: rows of the last trading day of each period of
+            the frequency between the begin and end dates, in order
+        dividends: 2-D array of the dividends paid on each date, dates x
+            tickers, if prices are unadjusted closes, else None
+    """
+    def __init__(self,
+        tickers: "list[str]",
+        dates: pd.DatetimeIndex,
+        prices: np.ndarray,
+        mask: np.ndarray,
+        begin_date: datetime,
+        end_date: datetime,
+        frequency: str = "M",
+        dividends: np.ndarray = None) -> None:
+        self.tickers = list(tickers)
+        self.dates = dates
+        self.prices = prices
+        self.mask = mask
+        self.begin_date = begin_date
+        self.end_date = end_date
+        self.frequency = frequency
+        self.dividends = dividends
+        self.calendar = Calendar(dates)
+        self.rebalance_rows = self.period_end_rows(frequency)
+
+    @classmethod
+    def from_series(cls,
+        series: "list[pd.Series]",
+        begin_date: datetime,
+        end_date: datetime,
+        dtype: type = np.float64,
+        frequency: str = "M",
+        dividends: "list[pd.Series]" = None) -> "PricePanel":
+        """Aligns the adjusted closes of each ticker into one panel
+
+        Args:
+            series: adjusted closes of each ticker, indexed by date and
+                named after the ticker
+            begin_date: first date positions can be taken on
+            end_date: last date positions can be taken on
+            dtype: dtype the prices are stored as
+            frequency: rebalance frequency, one of Calendar.FREQUENCIES
+            dividends: dividends of each ticker, on the dates of series,
+                if series are unadjusted closes
+
+        Returns:
+            PricePanel of the tickers
+        """
+        # Dates are compared in the exchange's local time
+        indexes = [s.index.tz_localize(None) if s.index.tz is not None
+            else s.index for s in series]
+        calendar = Calendar.from_union(indexes)
+        n_days = len(calendar.dates)
+        prices = np.full((n_days, len(series)), np.nan, dtype = dtype)
+        mask = np.zeros((n_days, len(series)), dtype = bool)
+        paid = None if dividends is None \
+            else np.zeros((n_days, len(series)))
+        for j, (s, index) in enumerate(zip(series, indexes)):
+            rows = calendar.rows_of(index)
+            prices[rows, j] = s.to_numpy()
+            mask[rows, j] = True
+            if paid is not None:
+                paid[rows, j] = dividends[j].to_numpy()
+        # Carry the last price forward over days the ticker did not trade
+        last_row = np.where(mask, np.arange(n_days)[:, None], 0)
+        last_row = np.maximum.accumulate(last_row, axis = 0)
+        prices = np.take_along_axis(prices, last_row, axis = 0)
+        return cls([s.name for s in series], calendar.dates,
+            prices, mask, begin_date, end_date, frequency, paid)
+
+    def adjusted(self, start_date: datetime, dtype: type) -> "PricePanel":
+        """Adjusts a panel of unadjusted closes from a start date on
+
+        The result is the panel a backtest fetching its data from
+        start_date gets: only the dates from start_date on, with the
+        dividends accumulated from there. Dividends are added in the
+        same order as when fetching, so the prices match exactly.
+
+        Args:
+            start_date: first date the backtest fetches data from
+            dtype: dtype the adjusted prices are stored as
+
+        Returns:
+            PricePanel of the adjusted closes, without dividends
+        """
+        start_row = np.searchsorted(self.dates.values,
+            np.datetime64(start_date, "ns"))
+        mask = self.mask[start_row:]
+        prices = self.prices[start_row:] \
+            + np.cumsum(self.dividends[start_row:], axis = 0)
+        prices = prices.astype(dtype, copy = False)
+        # Tickers have no price before they first trade from start_date
+        prices[~np.logical_or.accumulate(mask, axis = 0)] = np.nan
+        return PricePanel(self.tickers, self.dates[start_row:], prices,
+            mask, self.begin_date, self.end_date, self.frequency)
+
+    def period_end_rows(self, frequency: str) -> np.ndarray:
+        """Finds the rows of the last trading day of every period
+
+        Args:
+            frequency: D(ay), W(eek), M(onth) or Q(uarter)
+
+        Returns:
+            Array of rows whose date is the last of its period, and
+            between the begin and end dates
+        """
+        return self.calendar.period_end_rows(frequency,
+            self.begin_date, self.end_date)
+
+    def lookback_returns(self, days: int) -> np.ndarray:
+        """Computes the return of every ticker up to every rebalance
+
+        A ticker only has a return in the periods it can be ranked in:
+        it traded on the rebalance date, and it had a price days trading
+        days before it. Its return is NaN in the other periods, e.g.
+        before it listed or after it stopped trading.
+
+        Args:
+            days: number of trading days the returns are taken over
+
+        Returns:
+            2-D array of returns, periods x tickers
+        """
+        end_rows = self.rebalance_rows
+        start_rows = end_rows - days
+        end_prices = self.prices[end_rows].astype(float)
+        start_prices = self.prices[np.maximum(start_rows, 0)].astype(float)
+        start_prices[start_rows < 0] = np.nan
+        end_prices[~self.mask[end_rows]] = np.nan
+        return (end_prices - start_prices) / start_prices
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes taken by the prices, the mask and the dividends"""
+        return self.prices.nbytes + self.mask.nbytes \
+            + (self.dividends.nbytes if self.dividends is not None else 0)
+
+    def column(self, ticker: str) -> int:
+        """Column of a ticker in the panel"""
+        return self.tickers.index(ticker)
@@ -0,0 +1,299 @@
+"""Module containing the Significance class, which tests whether the
+statistics of a backtest could be noise, by comparing them against
+thousands of randomized replicates computed from the same price panel,
+in parallel across processes."""
+
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import time
+import numpy as np
+import pandas as pd
+
+# Shared by the chunks run in a worker process, see _init_worker
+_WORKER_STATE = {}
+
+def _init_worker(significance: "Significance") -> None:
+    """Keeps the arrays of the significance test in the worker"""
+    _WORKER_STATE["significance"] = significance
+
+def _run_chunk(task: "tuple[np.random.SeedSequence, int]") -> pd.DataFrame:
+    """Runs one chunk of replicates in a worker process
+
+    Args:
+        task: seed of the chunk and number of replicates in it
+
+    Returns:
+        Dataframe with the statistics of each replicate
+    """
+    seed, n_replicates = task
+    return _WORKER_STATE["significance"].replicate(n_replicates,
+        np.random.default_rng(seed))
+
+class Significance:
+    """Class that tests the significance of a backtest's statistics
+
+    Two null hypotheses can be tested:
+
+    - random: every period, the strategy holds as many tickers as it
+      did, but picked at random among the tickers it could rank. The
+      replicates reuse the price panel and the lookback returns.
+    - bootstrap: the strategy's daily returns and ICs have no edge.
+      Replicates resample the demeaned daily returns and period ICs
+      with the stationary bootstrap, in blocks of random, geometrically
+      distributed lengths, which keeps their short-term dependence.
+
+    The replicates are split in chunks of CHUNK_SIZE, each with its own
+    seed spawned from the seed of the test, so the results only depend
+    on the seed and not on the number of workers.
+
+    Attributes:
+        method: null hypothesis, one of METHODS
+        n_replicates: number of randomized replicates
+        n_workers: number of worker processes
+        seed: seed the chunks' seeds are spawned from
+        block_length: mean block length of the bootstrap, in days
+        prices: adjusted closes of the panel, dates x tickers
+        rebalance_rows: rows of the panel's rebalance dates
+        is_ranked: whether each ticker was ranked, periods x tickers
+        n_held: number of tickers held after each rebalance
+        initial_aum: AUM on the first rebalance date
+        daily_returns: daily returns of the strategy
+        ic: IC of the strategy for every period
+        observed: statistics of the strategy
+        elapsed: seconds taken by the last run
+        METHODS: supported null hypotheses
+        STATISTICS: statistics computed for every replicate
+        CHUNK_SIZE: number of replicates run at once by a worker
+        RISK_FREE: daily risk free rate of the Sharpe ratio
+    """
+    METHODS = ["random", "bootstrap"]
+    STATISTICS = ["Daily Sharpe Ratio", "Total AUM Return", "Mean IC"]
+    CHUNK_SIZE = 250
+    RISK_FREE = 0.0001
+
+    def __init__(self,
+        portfolio,
+        n_replicates: int,
+        method: str = "random",
+        n_workers: int = None,
+        seed: int = 4228,
+        block_length: float = None) -> None:
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown method {method}, "
+                f"choose one of {', '.join(self.METHODS)}.")
+        if n_replicates < 1:
+            raise ValueError("Need at least 1 replicate.")
+        self.method = method
+        self.n_replicates = n_replicates
+        self.n_workers = n_workers or os.cpu_count() or 1
+        if self.n_workers < 1:
+            raise ValueError("Need at least 1 worker.")
+        self.seed = seed
+        # Only arrays are kept, so that workers can receive them
+        self.prices = portfolio.panel.prices
+        self.rebalance_rows = portfolio.panel.rebalance_rows
+        self.is_ranked = np.isfinite(portfolio.lookback_returns)
+        self.n_held = portfolio.holdings.sum(axis = 1)
+        aum = portfolio.daily_aum_hist.to_numpy()
+        self.initial_aum = aum[0]
+        self.daily_returns = aum[1:] / aum[:-1] - 1
+        self.ic = portfolio.evaluate_ic().to_numpy()
+        self.block_length = block_length \
+            or max(1.0, len(self.daily_returns) ** (1 / 3))
+        self.observed = self.statistics(aum[:, None], self.ic[:, None]) \
+            .iloc[0]
+        self.elapsed = None
+
+    def statistics(self, aum: np.ndarray, ic: np.ndarray) -> pd.DataFrame:
+        """Computes the statistics of replicates, as Portfolio does
+
+        Args:
+            aum: daily AUM, days x replicates
+            ic: IC of every period, periods x replicates
+
+        Returns:
+            Dataframe with the STATISTICS of each replicate
+        """
+        total_return = aum[-1] / aum[0] - 1
+        avg_daily_return = total_return / len(aum)
+        daily_sd = np.std(aum[1:] / aum[:-1] - 1, axis = 0, ddof = 1)
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            sharpe = (avg_daily_return - self.RISK_FREE) / daily_sd
+        return pd.DataFrame(dict(zip(self.STATISTICS,
+            [sharpe, total_return, ic.mean(axis = 0)])))
+
+    def replicate(self, n_replicates: int,
+        rng: np.random.Generator) -> pd.DataFrame:
+        """Computes the statistics of randomized replicates
+
+        Args:
+            n_replicates: number of replicates
+            rng: random generator of the replicates
+
+        Returns:
+            Dataframe with the STATISTICS of each replicate
+        """
+        if self.method == "random":
+            return self.statistics(*self.random_portfolios(n_replicates, rng))
+        return self.statistics(*self.bootstrap(n_replicates, rng))
+
+    def random_portfolios(self, n_replicates: int,
+        rng: np.random.Generator) -> "tuple[np.ndarray, np.ndarray]":
+        """Backtests portfolios of tickers picked at random
+
+        Every period, the daily growth of all replicates is one matrix
+        product of the tickers' growth since the rebalance with the
+        replicates' weights, so the cost does not depend on how many
+        tickers are held.
+
+        Args:
+            n_replicates: number of replicates
+            rng: random generator of the picks
+
+        Returns:
+            Daily AUM, days x replicates, and IC of every period,
+            periods x replicates
+        """
+        end_rows = self.rebalance_rows
+        first = end_rows[0]
+        growth = np.ones((end_rows[-1] - first, n_replicates))
+        ic = np.zeros((len(end_rows) - 1, n_replicates))
+        for i in range(len(end_rows) - 1):
+            n_held = self.n_held[i]
+            if n_held == 0:
+                continue
+            # Random keys, with the tickers not ranked never picked
+            keys = rng.random((n_replicates, self.prices.shape[1]))
+            keys[:, ~self.is_ranked[i]] = np.inf
+            picks = np.argpartition(keys, n_held - 1, axis = 1)[:, :n_held]
+            weights = np.zeros(keys.shape)
+            np.put_along_axis(weights, picks, 1 / n_held, axis = 1)
+            start, end = end_rows[i], end_rows[i + 1]
+            ratios = self.prices[start + 1:end + 1] \
+                / self.prices[start].astype(float)
+            # Tickers not ranked may have no price, but have no weight
+            ratios = np.nan_to_num(ratios, nan = 0.0)
+            growth[start - first:end - first] = ratios @ weights.T
+            ic[i] = (ratios[-1] > 1) @ weights.T * 2 - 1
+        period_growth = growth[end_rows[1:] - first - 1]
+        period_start_aum = self.initial_aum * np.cumprod(np.concatenate(
+            (np.ones((1, n_replicates)), period_growth[:-1])), axis = 0)
+        period = np.searchsorted(end_rows,
+            np.arange(first + 1, end_rows[-1] + 1)) - 1
+        aum = np.concatenate((np.full((1, n_replicates), self.initial_aum),
+            period_start_aum[period] * growth))
+        return aum, ic
+
+    def bootstrap(self, n_replicates: int,
+        rng: np.random.Generator) -> "tuple[np.ndarray, np.ndarray]":
+        """Resamples the strategy's demeaned returns and ICs
+
+        Args:
+            n_replicates: number of replicates
+            rng: random generator of the blocks
+
+        Returns:
+            Daily AUM, days x replicates, and IC of every period,
+            periods x replicates
+        """
+        returns = self.daily_returns - self.daily_returns.mean()
+        indices = self.stationary_indices(len(returns), n_replicates,
+            self.block_length, rng)
+        aum = self.initial_aum * np.cumprod(np.concatenate(
+            (np.ones((1, n_replicates)), 1 + returns[indices])), axis = 0)
+        # Periods are much fewer than days, so their blocks are shorter
+        ic_block = max(1.0, self.block_length * len(self.ic)
+            / max(len(returns), 1))
+        ic = self.ic - self.ic.mean()
+        ic_indices = self.stationary_indices(len(ic), n_replicates,
+            ic_block, rng)
+        return aum, ic[ic_indices]
+
+    @staticmethod
+    def stationary_indices(length: int,
+        n_replicates: int,
+        block_length: float,
+        rng: np.random.Generator) -> np.ndarray:
+        """Draws the indices of stationary bootstrap resamples
+
+        Each index follows the previous one, wrapping around, except
+        that a new block starts at a random index with probability
+        1 / block_length.
+
+        Args:
+            length: length of the resampled series
+            n_replicates: number of resamples
+            block_length: mean length of the blocks
+            rng: random generator of the blocks
+
+        Returns:
+            2-D array of indices, length x replicates
+        """
+        starts = rng.integers(0, length, (length, n_replicates))
+        is_new_block = rng.random((length, n_replicates)) < 1 / block_length
+        is_new_block[0] = True
+        steps = np.arange(length)[:, None]
+        block_start = np.maximum.accumulate(
+            np.where(is_new_block, steps, 0), axis = 0)
+        return (np.take_along_axis(starts, block_start, axis = 0)
+            + steps - block_start) % length
+
+    def run(self) -> pd.DataFrame:
+        """Runs every replicate, in chunks across the worker processes
+
+        Returns:
+            Dataframe with the STATISTICS of each replicate
+        """
+        start = time.perf_counter()
+        n_chunks = -(-self.n_replicates // self.CHUNK_SIZE)
+        seeds = np.random.SeedSequence(self.seed).spawn(n_chunks)
+        sizes = [min(self.CHUNK_SIZE,
+            self.n_replicates - i * self.CHUNK_SIZE) for i in range(n_chunks)]
+        if self.n_workers == 1 or n_chunks == 1:
+            _init_worker(self)
+            chunks = [_run_chunk(task) for task in zip(seeds, sizes)]
+        else:
+            # Workers are spawned, like the parameter sweep's
+            with ProcessPoolExecutor(
+                max_workers = min(self.n_workers, n_chunks),
+                mp_context = multiprocessing.get_context("spawn"),
+                initializer = _init_worker,
+                initargs = (self,)) as pool:
+                chunks = list(pool.map(_run_chunk, zip(seeds, sizes)))
+        self.elapsed = time.perf_counter() - start
+        return pd.concat(chunks, ignore_index = True)
+
+    def p_values(self, results: pd.DataFrame) -> pd.Series:
+        """Fraction of replicates at least as good as the strategy
+
+        One is added to both counts, so that the p-value is never 0.
+
+        Args:
+            results: Dataframe returned by run
+
+        Returns:
+            Empirical p-value of every statistic
+        """
+        n_better = (results >= self.observed).sum()
+        return (n_better + 1) / (len(results) + 1)
+
+    def print_results(self, results: pd.DataFrame) -> None:
+        """Prints the p-values and distributions of the statistics
+
+        Args:
+            results: Dataframe returned by run
+        """
+        line_separator = "*" * 50
+        summary = pd.DataFrame({
+            "Observed": self.observed,
+            "p-value": self.p_values(results),
+            "5%": results.quantile(0.05),
+            "Median": results.median(),
+            "95%": results.quantile(0.95)
+        })
+        print(line_separator)
+        print(f"Significance against {len(results)} {self.method} "
+            f"replicates ({self.elapsed:.2f} seconds):")
+        print(summary.to_string())
+        print(line_separator)
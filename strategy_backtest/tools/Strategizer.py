@@ -1,13 +1,15 @@
 """Module containing the Strategizer class, which takes data
 taken from the Fetcher class and applies either the Reversal
 or Momentum Strategy to invest. This class also calculates the
-monthly IC, which is then converted to culminative IC.
+IC of every rebalance period, which is then converted to culminative
+IC.
 """
 
 from math import ceil
-from functools import reduce
+import numpy as np
 import pandas as pd
 from tools.Fetcher import Fetcher
+from tools.PricePanel import PricePanel
 
 class Strategizer(Fetcher):
     """Class that performs reversal/ momentum strategy and calcualtes IC
@@ -17,18 +19,26 @@ class Strategizer(Fetcher):
     of relevant statistics.
 
     Attributes:
-        curr_aum: current assets under management, based on month
-        n_top_tickers: number of top tickers to allocate AUM to
+        curr_aum: current assets under management, based on period
+        top_pct: percentage of the ranked tickers to allocate AUM to
+        n_top_tickers: number of top tickers to allocate AUM to, when
+            every ticker can be ranked
         cul_info_coef: Culminative information coefficient
+        cul_rank_ic: Culminative rank IC of the signal over all tickers
         daily_aum_hist: Daily AUM history of stocks
+        lookback_returns: returns ranked on, periods x tickers
+        holdings: tickers held after each rebalance, periods x tickers
     """
-    def __init__(self, args: dict) -> None:
-        super().__init__(args)
+    def __init__(self, args: dict, panel: PricePanel = None) -> None:
+        super().__init__(args, panel)
         self.curr_aum = args["initial_aum"]
+        self.top_pct = args["top_pct"]
         self.n_top_tickers = self.find_n_top_tickers(args)
         self.cul_info_coef: pd.Series = None
+        self.cul_rank_ic: pd.Series = None
         self.daily_aum_hist: pd.Series = None
-
+        self.lookback_returns: np.ndarray = None
+        self.holdings: np.ndarray = None
 
     def find_n_top_tickers(self, args: dict) -> int:
         """Find number of top tickers to invest on, based on strategy
@@ -41,119 +51,247 @@ class Strategizer(Fetcher):
         """
         return ceil(args["top_pct"] / 100 * len(args["tickers"]))
 
-    def strategize(self) -> None:
-        """Overall Function that performs the strategizing"""
-        # Raw AUM and IC, later converted to Pandas Series
-        monthly_ic = {}
-        daily_aum = []
-        top_tickers_hist = []
+    def find_n_held(self, returns: np.ndarray) -> np.ndarray:
+        """Finds the number of tickers to invest on, every period
+
+        Only tickers with a lookback return that period can be ranked,
+        so the top percentage is taken of those tickers.
 
+        Args:
+            returns: 2-D array of returns, periods x tickers
+
+        Returns:
+            Array of the number of tickers to hold after each rebalance
+        """
+        n_ranked = np.isfinite(returns).sum(axis = 1)
+        return np.ceil(self.top_pct / 100 * n_ranked).astype(int)
+
+    def strategize(self, lookback_returns: np.ndarray = None) -> None:
+        """Overall Function that performs the strategizing
+
+        Args:
+            lookback_returns: returns to rank on, periods x tickers, if
+                already computed from the panel for the days parameter
+        """
         # Specifying which strategy to use
         strat = 'Reversal' if self.strat == 'R' else 'Momentum'
         print(self.LINE_SEPARATOR)
         print(f"Executing {strat} strategy")
-        for i in range(self.n_months):
-            top_tickers_hist.append(self.find_top_tickers(i))
-            # Only evaluate first set of tickers 1 month after allocating
-            if i != 0:
-                self.track_aum(top_tickers_hist, daily_aum, monthly_ic)
+        # Tickers of every period are picked at once
+        self.lookback_returns = lookback_returns \
+            if lookback_returns is not None \
+            else self.compute_lookback_returns()
+        self.holdings = self.select_holdings(self.lookback_returns,
+            self.find_n_held(self.lookback_returns))
+        self.daily_aum_hist = self.track_aum()
+        # Cuminative information coefficient, so we take cumsum
+        self.cul_info_coef = self.evaluate_ic().cumsum()
+        self.cul_rank_ic = self.evaluate_rank_ic().cumsum()
         print("Infomation coefficient and daily AUM change recorded.")
-        print("Tidying up IC and AUM Data.")
         print(self.LINE_SEPARATOR)
-        # Cuminative information coefficient, so we take cumsum
-        self.cul_info_coef = pd.Series(monthly_ic).cumsum()
-        self.daily_aum_hist = \
-            pd.concat(daily_aum).drop_duplicates(keep = "first")
 
-    def find_top_tickers(self, month: int) -> "list[dict]":
-        """Finds the top tickers based on strategy to allocate AUM to
+    def compute_lookback_returns(self) -> np.ndarray:
+        """Computes the returns every ticker is ranked on, every period
 
-        Params:
-            month: the nth-time (in terms of month) for portfolio reallocation.
+        The return of period i is taken over the days trading days up to
+        the rebalance date, the last trading day of the period.
 
         Returns:
-            List of dictionaries of tickers to invest with relevant data
+            2-D array of returns, periods x tickers
         """
-        monthly_returns = []
-        for ticker, data in self.data.items():
-            # Get indexes for start and end date
-            end_window = data["last_days"][month]
-            end_idx = data["df"].index.get_loc(end_window)
-            start_idx = end_idx - self.days
-            start_window = data["df"].index[start_idx]
-
-            # Get Returns then append to array
-            start_price = data["df"].at[start_window, "Close_Adjusted"]
-            end_price = data["df"].at[end_window, "Close_Adjusted"]
-            returns = (end_price - start_price) / start_price
-            monthly_returns.append({
-                "ticker": ticker,
-                "returns": returns,
-                "start": start_window,
-                "end": end_window
-            })
+        return self.panel.lookback_returns(self.days)
+
+    def select_holdings(self,
+        returns: np.ndarray,
+        n_held: np.ndarray) -> np.ndarray:
+        """Picks the top tickers of every period to allocate AUM to
+
+        Reversal picks the n_held highest returns, and momentum the
+        lowest. Each period only needs a partial sort (argpartition) to
+        find the largest n_held best returns. Tickers tied with the last
+        one are picked in ticker order, which gives the same picks as a
+        stable sort. Tickers without a return (NaN) are ranked last, and
+        never picked since n_held is at most the number of returns.
 
+        Args:
+            returns: 2-D array of returns, periods x tickers
+            n_held: number of tickers to pick each period
+
+        Returns:
+            2-D boolean array of the tickers held after each rebalance
+        """
         # Whether to take firms with lowest/ highest returns
         is_descending = self.strat == 'R'
+        # Best returns have the smallest keys
+        keys = -returns if is_descending else returns.copy()
+        keys[np.isnan(keys)] = np.inf
+        n_top = min(int(n_held.max(initial = 0)), keys.shape[1])
+        if n_top == 0:
+            return np.zeros(keys.shape, dtype = bool)
+        nth = np.argpartition(keys, n_top - 1, axis = 1)[:, n_top - 1:n_top]
+        nth_key = np.take_along_axis(keys, nth, axis = 1)
+        is_better = keys < nth_key
+        is_tied = keys == nth_key
+        n_tied_needed = n_top - is_better.sum(axis = 1, keepdims = True)
+        top = is_better | (is_tied
+            & (np.cumsum(is_tied, axis = 1) <= n_tied_needed))
+        if (n_held == n_top).all():
+            return top
+        # Periods holding fewer tickers keep the best of their n_top,
+        # ranked by a stable sort of those n_top only
+        columns = np.nonzero(top)[1].reshape(len(keys), n_top)
+        order = np.argsort(np.take_along_axis(keys, columns, axis = 1),
+            axis = 1, kind = "stable")
+        is_kept = np.zeros(columns.shape, dtype = bool)
+        np.put_along_axis(is_kept, order,
+            np.arange(n_top) < n_held[:, None], axis = 1)
+        holdings = np.zeros(keys.shape, dtype = bool)
+        np.put_along_axis(holdings, columns, is_kept, axis = 1)
+        return holdings
 
-        # Filter based on returns, and take the top n tickers
-        sorted_returns = sorted(monthly_returns,
-            key = lambda x: x["returns"],
-            reverse = is_descending
-        )
-        return sorted_returns[:self.n_top_tickers]
+    def held_columns(self) -> "tuple[np.ndarray, np.ndarray]":
+        """Columns of the tickers held after each rebalance
 
-    def track_aum(self,
-        top_tickers_hist: "list[list[dict]]",
-        daily_aum: "list[pd.Series]",
-        monthly_ic: dict) -> None:
-        """Tracks the AUM change (and IC) of the selected top tickers
+        Periods holding fewer tickers than the others are padded with
+        columns that are not held.
 
-        Args:
-            top_tickers_hist: History of top tickers chosen
-            daily_aum: Daily AUM, as a list of pandas series
-            monthly_ic: Monthly IC, as a dictionary
+        Returns:
+            2-D array of panel columns, periods x most tickers held, and
+            2-D boolean array of whether each column is held
         """
-        # Assume all tickers have have last trading day of month
-        end: pd.Timestamp = top_tickers_hist[-1][0]["end"]
-        # Start of the last month to track from
-        start: pd.Timestamp = top_tickers_hist[-2][0]["end"]
-        asset_per_ticker = self.curr_aum / self.n_top_tickers
-        aum_by_ticker = []
-        # Take second last entry because that's the entry to track
-        for packet in top_tickers_hist[-2]:
-            ticker_df = self.data[packet["ticker"]]["df"]
-            filter_df = ticker_df.loc[start:end, "Close_Adjusted"]
-            # find AUM change for the asset
-            aum_change = filter_df / filter_df[0] * asset_per_ticker
-            aum_by_ticker.append(aum_change)
-
-        # Pointwise addition of series in an array
-        gross_aum_change = reduce(lambda a, b: a + b, aum_by_ticker)
-        daily_aum.append(gross_aum_change)
+        n_max = int(self.holdings.sum(axis = 1).max(initial = 0))
+        # Held columns first, each in ticker order
+        columns = np.argsort(~self.holdings, axis = 1,
+            kind = "stable")[:, :n_max]
+        return columns, np.take_along_axis(self.holdings, columns, axis = 1)
+
+    def track_aum(self) -> pd.Series:
+        """Computes the daily AUM of the strategy in one vectorized pass
 
+        At each rebalance, the AUM is split evenly among the tickers
+        picked, which are held until the next rebalance. A ticker that
+        stops trading within the period keeps its last price, so its
+        position is effectively sold then and held as cash until the
+        rebalance, when it can no longer be picked. A period without any
+        ticker to pick is held in cash. Within a period, the AUM is
+        therefore the period's starting AUM times the average growth of
+        the held tickers' prices since the rebalance. The starting AUM
+        of each period is the initial AUM times the cumulative product
+        of the growth of the previous periods. The work grows linearly
+        with the number of trading days and tickers held, whatever the
+        rebalance frequency.
+
+        Returns:
+            Daily AUM, indexed by the trading dates from the first to
+            the last rebalance
+        """
+        end_rows = self.panel.rebalance_rows
+        first, last = end_rows[0], end_rows[-1]
+        rows = np.arange(first + 1, last + 1)
+        # Each day is held with the tickers picked at the previous rebalance
+        period = np.searchsorted(end_rows, rows) - 1
+        columns, is_held = self.held_columns()
+        columns, is_held = columns[period], is_held[period]
+        n_held = self.holdings.sum(axis = 1)[period]
+        # AUM is tracked in float64, even if prices are float32
+        start_prices = self.panel.prices[end_rows[period][:, None], columns]
+        prices = self.panel.prices[rows[:, None], columns]
+        # Padding columns may not have prices, so they are masked out
+        ratios = np.where(is_held, prices / start_prices.astype(float), 0)
+        growth = np.where(n_held > 0,
+            ratios.sum(axis = 1) / np.maximum(n_held, 1), 1.0)
+        period_growth = growth[end_rows[1:] - first - 1]
+        period_start_aum = self.curr_aum * np.concatenate(
+            ([1.0], np.cumprod(period_growth)))
+        aum = np.concatenate(([self.curr_aum],
+            period_start_aum[period] * growth))
         # Current AUM should be updated to the last trading day
-        self.curr_aum = gross_aum_change[-1]
-        self.evaluate_ic(aum_by_ticker, end, monthly_ic)
+        self.curr_aum = aum[-1]
+        return pd.Series(aum, index = self.panel.dates[first:last + 1])
 
+    def evaluate_ic(self) -> pd.Series:
+        """Calculates Information coefficient for every period
 
-    def evaluate_ic(self,
-        aum_by_ticker: "list",
-        day: pd.Timestamp,
-        monthly_ic: dict) -> None:
-        """Calculates Information coefficient for the given month
+        The IC of a period is the fraction of held tickers whose price
+        rose over the period, rescaled from [0, 1] to [-1, 1]. It is 0
+        in periods without any ticker held.
 
-        However, IC is passed unto the parameter monthly_ic by reference,
-        so this function is a void function (returns None)
+        Returns:
+            IC of every period, indexed by the rebalance date ending it
+        """
+        end_rows = self.panel.rebalance_rows
+        columns, is_held = self.held_columns()
+        columns, is_held = columns[:-1], is_held[:-1]
+        n_held = is_held.sum(axis = 1)
+        start_prices = self.panel.prices[end_rows[:-1, None], columns]
+        end_prices = self.panel.prices[end_rows[1:, None], columns]
+        n_increase = ((end_prices > start_prices) & is_held).sum(axis = 1)
+        ic = np.where(n_held > 0,
+            n_increase / np.maximum(n_held, 1) * 2 - 1, 0.0)
+        return pd.Series(ic, index = self.panel.dates[end_rows[1:]])
 
-        Args:
-            aum_by_ticker: AUM of the ticker in the given month
-            day: The last day of the month that maps to the IC
-            monthly_ic: dictionary, with date as keys, IC as values
+    def evaluate_rank_ic(self) -> pd.Series:
+        """Calculates the rank IC of the signal for every period
+
+        The rank IC of a period is the Spearman correlation, across all
+        tickers ranked at its start, between the signal and the return
+        over the period. The signal is the lookback return, negated for
+        momentum, so that tickers with a higher signal are picked first
+        and a positive rank IC means the picks beat the rest. It is NaN
+        in periods with fewer than 2 tickers ranked.
+
+        Returns:
+            Rank IC of every period, indexed by the rebalance date
+            ending it
         """
-        n_increase = 0
-        for ticker_df in aum_by_ticker:
-            n_increase += 1 if ticker_df[-1] > ticker_df[0] else 0
+        end_rows = self.panel.rebalance_rows
+        signal = self.lookback_returns[:-1]
+        signal = signal if self.strat == 'R' else -signal
+        start_prices = self.panel.prices[end_rows[:-1]].astype(float)
+        forward = self.panel.prices[end_rows[1:]] / start_prices - 1
+        is_ranked = np.isfinite(signal) & np.isfinite(forward)
+        signal_ranks = self.rank_rows(np.where(is_ranked, signal, np.nan))
+        forward_ranks = self.rank_rows(np.where(is_ranked, forward, np.nan))
+        # Pearson correlation of the ranks, over the ranked tickers only
+        n_ranked = is_ranked.sum(axis = 1, keepdims = True)
+        signal_dev = np.where(is_ranked, signal_ranks
+            - np.nansum(signal_ranks, axis = 1, keepdims = True)
+            / np.maximum(n_ranked, 1), 0)
+        forward_dev = np.where(is_ranked, forward_ranks
+            - np.nansum(forward_ranks, axis = 1, keepdims = True)
+            / np.maximum(n_ranked, 1), 0)
+        covariance = (signal_dev * forward_dev).sum(axis = 1)
+        scale = np.sqrt((signal_dev ** 2).sum(axis = 1)
+            * (forward_dev ** 2).sum(axis = 1))
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            rank_ic = np.where(scale > 0, covariance / scale, np.nan)
+        return pd.Series(rank_ic, index = self.panel.dates[end_rows[1:]])
+
+    @staticmethod
+    def rank_rows(values: np.ndarray) -> np.ndarray:
+        """Ranks every row of a matrix in one sort, averaging ties
 
-        ic = (n_increase / self.n_top_tickers * 2) - 1
-        monthly_ic[day] = ic
+        Args:
+            values: 2-D array, with NaN for values not to be ranked
+
+        Returns:
+            2-D array of the rank of each value within its row, from 1,
+            with NaN where values is NaN
+        """
+        order = np.argsort(values, axis = 1, kind = "stable")
+        ordered = np.take_along_axis(values, order, axis = 1)
+        n_columns = values.shape[1]
+        positions = np.broadcast_to(np.arange(n_columns), values.shape)
+        # Tied values share the average of their positions in the order
+        is_first = np.ones(values.shape, dtype = bool)
+        is_first[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+        is_last = np.ones(values.shape, dtype = bool)
+        is_last[:, :-1] = is_first[:, 1:]
+        first = np.maximum.accumulate(
+            np.where(is_first, positions, 0), axis = 1)
+        last = np.minimum.accumulate(
+            np.where(is_last, positions, n_columns)[:, ::-1], axis = 1)[:, ::-1]
+        ranks = np.empty(values.shape)
+        np.put_along_axis(ranks, order, (first + last) / 2 + 1, axis = 1)
+        ranks[np.isnan(values)] = np.nan
+        return ranks
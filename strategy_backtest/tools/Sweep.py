@@ -0,0 +1,276 @@
+"""Module containing the Sweep class, which backtests a whole grid of
+strategy parameters on a universe fetched only once, in parallel across
+processes, and collects the statistics of every configuration."""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from datetime import datetime
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import time
+import pandas as pd
+from tools.Fetcher import Fetcher
+from tools.PricePanel import PricePanel
+from tools.Portfolio import Portfolio
+
+# Shared by the configurations run in a worker process, see _init_worker
+_WORKER_STATE = {}
+
+def _init_worker(args: dict, panel: PricePanel) -> None:
+    """Keeps the unadjusted panel of the sweep in the worker"""
+    _WORKER_STATE.update(args = args, panel = panel, adjusted = None)
+
+def _run_config(config: "tuple[str, int, int]") -> dict:
+    """Backtests one configuration in a worker process
+
+    The adjusted panel and lookback returns of the last (strategy_type,
+    days) are kept, since consecutive configurations of the grid mostly
+    only differ in top_pct.
+
+    Args:
+        config: (strategy_type, days, top_pct) of the configuration
+
+    Returns:
+        Dictionary of the configuration and its statistics, or its error
+    """
+    strategy_type, days, top_pct = config
+    row = {"strategy_type": strategy_type, "days": days, "top_pct": top_pct}
+    args = dict(_WORKER_STATE["args"], strategy_type = strategy_type,
+        days = days, top_pct = top_pct)
+    try:
+        # The backtest's progress messages are not printed for each run
+        with redirect_stdout(io.StringIO()):
+            panel, lookback = _WORKER_STATE["panel"], None
+            adjusted = _WORKER_STATE["adjusted"]
+            if adjusted is not None and adjusted[0] == config[:2]:
+                _, panel, lookback = adjusted
+            portfolio = Portfolio(args, panel)
+            portfolio.strategize(lookback)
+            _WORKER_STATE["adjusted"] = (config[:2], portfolio.panel,
+                portfolio.lookback_returns)
+            statistics = portfolio.get_stats()
+        for category, number in statistics:
+            row[Sweep.column_name(category)] = number
+        row["Error"] = None
+    # One bad configuration should not abort the rest of the sweep
+    except Exception as err: # pylint: disable=broad-except
+        row["Error"] = f"{type(err).__name__}: {err}"
+    return row
+
+class Sweep:
+    """Class that backtests every (strategy_type, days, top_pct) of a grid
+
+    The universe is fetched once, for the longest lookback of the grid,
+    without adjusting the closes for dividends. The configurations are
+    then run by a pool of worker processes, which each receive the panel
+    once. Every configuration adjusts it from its own fetch start, so
+    its statistics are those of a single backtest.
+
+    Finished configurations are saved to the output CSV as they
+    complete, so an interrupted sweep keeps its partial results. When
+    it is run again with the same output, configurations already in the
+    file are skipped, except those that failed. The arguments shared by
+    the configurations are saved next to the CSV, and a sweep refuses to
+    resume results saved with different arguments.
+
+    Attributes:
+        args: CLI arguments shared by all configurations
+        configs: (strategy_type, days, top_pct) of every configuration
+        output: CSV file the results are saved to
+        n_workers: number of worker processes
+        panel: unadjusted PricePanel of the universe, once fetched
+        elapsed: seconds taken by the last run
+        CONFIG_COLUMNS: columns identifying a configuration
+        SAVE_INTERVAL: minimum seconds between two saves of the results
+        UNSAVED_ARGS: arguments that do not change the results, left
+            out of the saved arguments
+    """
+    CONFIG_COLUMNS = ["strategy_type", "days", "top_pct"]
+    SAVE_INTERVAL = 1.0
+    UNSAVED_ARGS = ["strategy_types", "workers", "output", "record",
+        "fetch_concurrency", "fetch_rate", "fetch_retries", "fetch_timeout"]
+
+    def __init__(self,
+        args: dict,
+        strategy_types: "list[str]",
+        days: "list[int]",
+        top_pcts: "list[int]",
+        output: str,
+        n_workers: int = None) -> None:
+        self.args = args
+        self.configs = list(itertools.product(strategy_types, days, top_pcts))
+        if len(self.configs) == 0:
+            raise ValueError("No configurations given for the sweep.")
+        self.output = output
+        self.n_workers = n_workers or os.cpu_count() or 1
+        if self.n_workers < 1:
+            raise ValueError("Need at least 1 worker.")
+        self.panel: PricePanel = None
+        self.elapsed = None
+
+    @staticmethod
+    def column_name(category: str) -> str:
+        """Column name of a statistic printed by Portfolio.print_stats"""
+        return category.split(". ", 1)[-1].strip().rstrip(":")
+
+    def fetch(self) -> None:
+        """Fetches the universe once, for every configuration
+
+        The data is fetched for the configuration that needs the most
+        history before --b: momentum with the most days if the grid
+        has momentum configurations, else reversal with the most days.
+        The closes are kept unadjusted, with the dividends, since the
+        adjusted closes depend on the start date of each configuration.
+        """
+        strategy_types = {config[0] for config in self.configs}
+        fetch_args = dict(self.args,
+            strategy_type = "M" if "M" in strategy_types else "R",
+            days = max(config[1] for config in self.configs))
+        self.panel = Fetcher(fetch_args, adjust = False).panel
+
+    @property
+    def args_file(self) -> str:
+        """JSON file of the arguments the results were computed with"""
+        return f"{self.output}.args.json"
+
+    def shared_args(self) -> dict:
+        """Arguments of the sweep that change the results
+
+        Dates are kept to the day, since without --e the end date is
+        the current time, which would differ on every run.
+
+        Returns:
+            Dictionary of the arguments, as saved in the JSON file
+        """
+        shared = {key: value.strftime("%Y%m%d")
+            if isinstance(value, datetime) else value
+            for key, value in self.args.items()
+            if key not in self.UNSAVED_ARGS + self.CONFIG_COLUMNS}
+        return json.loads(json.dumps(shared, default = str))
+
+    def load_results(self) -> pd.DataFrame:
+        """Loads the results saved by an earlier run of the sweep
+
+        Only the configurations that did not fail are kept, so that the
+        failed ones are run again.
+
+        Returns:
+            Dataframe of the saved results, empty if there are none
+        """
+        if not os.path.exists(self.output):
+            return pd.DataFrame(columns = self.CONFIG_COLUMNS)
+        saved_args = None
+        if os.path.exists(self.args_file):
+            with open(self.args_file, encoding = "utf-8") as file:
+                saved_args = json.load(file)
+        shared_args = self.shared_args()
+        if saved_args != shared_args:
+            changed = sorted(key for key in shared_args.keys()
+                | (saved_args or {}).keys()
+                if (saved_args or {}).get(key) != shared_args.get(key))
+            raise ValueError(f"{self.output} holds results of other "
+                f"arguments ({', '.join(changed)} differ), delete it or "
+                "choose another --output.")
+        results = pd.read_csv(self.output)
+        if "Error" in results.columns:
+            results = results[results["Error"].isna()]
+        return results.reset_index(drop = True)
+
+    def save_results(self, results: pd.DataFrame) -> None:
+        """Writes the results and their arguments, replacing the old
+        files atomically"""
+        with open(f"{self.args_file}.tmp", "w", encoding = "utf-8") as file:
+            json.dump(self.shared_args(), file, indent = 4)
+        os.replace(f"{self.args_file}.tmp", self.args_file)
+        results.to_csv(f"{self.output}.tmp", index = False)
+        os.replace(f"{self.output}.tmp", self.output)
+
+    def run(self) -> pd.DataFrame:
+        """Backtests every configuration not saved yet, in parallel
+
+        Returns:
+            Dataframe with a row of statistics per configuration, in
+            the order of the grid
+        """
+        start = time.perf_counter()
+        saved = self.load_results()
+        done = set(zip(saved["strategy_type"], saved["days"],
+            saved["top_pct"]))
+        todo = [config for config in self.configs if config not in done]
+        print(f"{len(self.configs)} configurations, "
+            f"{len(self.configs) - len(todo)} already in {self.output}")
+        rows = saved.to_dict("records")
+        if len(todo) > 0:
+            if self.panel is None:
+                self.fetch()
+            rows += self._run_pool(todo, rows)
+        self.elapsed = time.perf_counter() - start
+
+        results = pd.DataFrame(rows)
+        order = {config: i for i, config in enumerate(self.configs)}
+        results["order"] = [order.get(config, len(order)) for config in
+            zip(results["strategy_type"], results["days"],
+            results["top_pct"])]
+        results = results.sort_values("order", kind = "stable") \
+            .drop(columns = "order").reset_index(drop = True)
+        self.save_results(results)
+        return results
+
+    def _run_pool(self, todo: "list[tuple]",
+        saved_rows: "list[dict]") -> "list[dict]":
+        """Runs configurations in the worker pool, saving as they finish
+
+        Args:
+            todo: configurations to run
+            saved_rows: result rows saved by an earlier run, kept in the
+                saved results
+
+        Returns:
+            List of the result rows of the configurations
+        """
+        rows = []
+        start = last_save = time.perf_counter()
+        # Workers are spawned, since forking the threads of the fetch
+        # layer and of yfinance's HTTP sessions is unsafe
+        with ProcessPoolExecutor(max_workers = self.n_workers,
+            mp_context = multiprocessing.get_context("spawn"),
+            initializer = _init_worker,
+            initargs = (self.args, self.panel)) as pool:
+            futures = [pool.submit(_run_config, config) for config in todo]
+            for n_done, future in enumerate(as_completed(futures), 1):
+                rows.append(future.result())
+                now = time.perf_counter()
+                if now - last_save >= self.SAVE_INTERVAL \
+                    or n_done == len(todo):
+                    self.save_results(pd.DataFrame(saved_rows + rows))
+                    last_save = now
+                    rate = n_done / (now - start)
+                    print(f"[{n_done}/{len(todo)}] "
+                        f"{rate:.1f} configurations/sec, "
+                        f"{(len(todo) - n_done) / rate:.0f} sec left")
+        return rows
+
+    def print_best(self, results: pd.DataFrame, n_best: int = 10) -> None:
+        """Prints the configurations with the best daily Sharpe ratio
+
+        Args:
+            results: Dataframe returned by run
+            n_best: number of configurations to print
+        """
+        line_separator = "*" * 50
+        sharpe = self.column_name("14. Daily Sharpe Ratio of portfolio")
+        failed = results[results["Error"].notna()]
+        print(line_separator)
+        for _, row in failed.iterrows():
+            print(f"Failed {row['strategy_type']} days={row['days']} "
+                f"top_pct={row['top_pct']}: {row['Error']}")
+        if sharpe in results.columns:
+            best = results.dropna(subset = [sharpe]).nlargest(n_best, sharpe)
+            print(best[self.CONFIG_COLUMNS + [sharpe]].to_string(
+                index = False))
+        print(f"Swept {len(results)} configurations ({len(failed)} failed) "
+            f"in {self.elapsed:.2f} seconds")
+        print(line_separator)